@@ -4,6 +4,8 @@ from discord.ext import commands
 from discord import app_commands
 from datetime import timedelta, datetime, timezone
 from utils.config import get_bot_config
+from utils.dm_outbox import send_dm
+from utils.log_sink import LOW, send_log
 
 _BOT_CFG = get_bot_config()
 COMMAND_LOG_CHANNEL_ID = _BOT_CFG.get("COMMAND_LOG_CHANNEL_ID")
@@ -32,10 +34,8 @@ def parse_duration(duration_str: str) -> timedelta | None:
 
 
 async def send_dm_safe(user: discord.User, embed: discord.Embed):
-    try:
-        await user.send(embed=embed)
-    except Exception:
-        pass
+    # Mis en file : la commande n'attend pas le MP
+    await send_dm(user, embed)
 
 
 async def log_command(bot, title: str, description: str, moderator: discord.User | None = None, color=discord.Color.blue()):
@@ -46,7 +46,7 @@ async def log_command(bot, title: str, description: str, moderator: discord.User
         embed = discord.Embed(title=title, description=description, color=color, timestamp=datetime.now(timezone.utc))
         if moderator:
             embed.add_field(name="Modérateur", value=f"{moderator} ({moderator.id})", inline=True)
-        await ch.send(embed=embed)
+        await send_log(COMMAND_LOG_CHANNEL_ID, embed, LOW)
     except Exception:
         pass
 
@@ -1,8 +1,14 @@
 import discord
 from discord.ext import commands
+import io
 import os
 import sys
-from utils.config import get_bot_config
+from utils.cog_loader import get_cog_loader
+from utils.config import flush as flush_json_cache, get_bot_config
+from utils.dm_outbox import get_dm_outbox
+from utils.log_sink import close_log_sink
+from utils.logger import recent_logs, stop_logging
+from utils.tree_sync import dev_guild_ids, sync_tree
 
 _BOT_CFG = get_bot_config()
 EXTRA_OWNER_IDS = set(_BOT_CFG.get("EXTRA_OWNER_IDS", []))
@@ -26,6 +32,8 @@ class Admin(commands.Cog):
     @is_owner_or_specific_user()
     async def off(self, ctx):
         await ctx.send("🛑 Extinction du bot...")
+        await get_dm_outbox().stop()
+        await close_log_sink()
         await self.bot.close()
 
     # Commande pour redémarrer le bot
@@ -33,7 +41,13 @@ class Admin(commands.Cog):
     @is_owner_or_specific_user()
     async def reboot(self, ctx):
         await ctx.send("🔄 Redémarrage du bot...")
+        # Envoie les DM et logs encore en file avant de couper la connexion
+        await get_dm_outbox().stop()
+        await close_log_sink()
         await self.bot.close()
+        # os.execv ne déclenche pas atexit : on vide le cache JSON et la file de logs à la main
+        flush_json_cache()
+        stop_logging()
         os.execv(sys.executable, [sys.executable] + sys.argv)
 
     # Commande pour afficher l’état des cogs
@@ -41,6 +55,7 @@ class Admin(commands.Cog):
     async def list_cogs(self, ctx):
         loaded = []
         unloaded = []
+        loader = get_cog_loader()
 
         # Parcourir récursivement ./cogs
         for root, _, files in os.walk("./cogs"):
@@ -52,6 +67,8 @@ class Admin(commands.Cog):
 
                     if full_name in self.bot.extensions:
                         loaded.append(f"✅ {full_name}")
+                    elif loader and full_name in loader.pending:
+                        unloaded.append(f"⏳ {full_name} (différé)")
                     else:
                         unloaded.append(f"❌ {full_name}")
 
@@ -84,5 +101,45 @@ class Admin(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erreur lors du reload de `{cog}` : {e}")
 
+    # Commande pour récupérer les derniers logs (tampon mémoire)
+    @commands.command(name="logs")
+    @is_owner_or_specific_user()
+    async def dump_logs(self, ctx, lines: int = 200):
+        """Envoie les dernières lignes de log en fichier (ex: +logs 500)"""
+        records = recent_logs(max(1, lines))
+        if not records:
+            return await ctx.send("Aucun log en mémoire.")
+        data = ("\n".join(records) + "\n").encode("utf-8")
+        await ctx.send(
+            f"📜 {len(records)} dernière(s) ligne(s) de log",
+            file=discord.File(io.BytesIO(data), filename="tokibot_logs.txt"),
+        )
+
+    # Commande pour forcer la synchronisation des commandes slash
+    @commands.command(name="sync")
+    @is_owner_or_specific_user()
+    async def sync_slash(self, ctx, cible: str = "global"):
+        """Force la synchronisation des commandes slash (ex: +sync, +sync ici, +sync dev)"""
+        dev_ids = dev_guild_ids()
+        if cible == "ici":
+            # Copier les commandes globales dans un serveur de production les doublerait
+            if ctx.guild is None or ctx.guild.id not in dev_ids:
+                return await ctx.send(
+                    "❌ `+sync ici` n'est possible que dans un serveur de développement "
+                    "(`DEV_GUILD_IDS`)."
+                )
+            guild_ids = [ctx.guild.id]
+        elif cible == "dev":
+            guild_ids = dev_ids
+            if not guild_ids:
+                return await ctx.send(
+                    "❌ Aucun serveur de développement (`DEV_GUILD_IDS`) configuré."
+                )
+        else:
+            guild_ids = []
+        async with ctx.typing():
+            lines = await sync_tree(self.bot, force=True, guild_ids=guild_ids)
+        await ctx.send("🔄 " + "\n".join(lines))
+
 async def setup(bot):
     await bot.add_cog(Admin(bot))
\ No newline at end of file
@@ -5,9 +5,12 @@ import json
 import os
 from datetime import datetime, timezone
 from utils.config import get_bot_config
+from utils.delayed_actions import get_action_queue
+from utils.log_sink import LOW, send_log
 from utils.logger import get_logger
-from utils.config import read_json, write_json
+from utils.persistence import read_json_async, write_json_async
 from utils.permissions import is_admin_or_role
+from utils.user_cache import get_user_resolver
 
 _BOT_CFG = get_bot_config()
 MODERATOR_ROLE_ID = _BOT_CFG.get("MODERATOR_ROLE_ID")
@@ -21,7 +24,10 @@ logger = get_logger(__name__)
 class ExtraCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data = load_data()
+        self.data = {"messages": {}}
+
+    async def cog_load(self):
+        self.data = await load_data()
 
     async def log_command(self, ctx, reason: str = None):
         """Log la commande dans le salon de log avec raison si fournie"""
@@ -39,7 +45,7 @@ class ExtraCommands(commands.Cog):
             if reason:
                 embed.add_field(name="Raison", value=reason, inline=False)
             try:
-                await log_channel.send(embed=embed)
+                await send_log(log_channel.id, embed, LOW)
             except Exception as e:
                 logger.warning(f"Impossible d'envoyer le log de commande: {e}")
 
@@ -58,8 +64,8 @@ class ExtraCommands(commands.Cog):
         member = member or ctx.author
         banner_url = None
         try:
-            # Tente via fetch_user pour obtenir la bannière si absente
-            user = await self.bot.fetch_user(member.id)
+            # Utilisateur issu de fetch_user (mis en cache) : seul à porter la bannière
+            user = await get_user_resolver().resolve(self.bot, member.id, fetched=True)
             if user and user.banner:
                 banner_url = user.banner.url
             elif member.banner:
@@ -219,7 +225,7 @@ class ExtraCommands(commands.Cog):
         try:
             await channel.purge()
             msg = await channel.send("⚠️ Ce salon a été réinitialisé.")
-            await msg.delete(delay=5)
+            await get_action_queue().delete_message_later(msg, 5)
         except discord.Forbidden:
             await ctx.send("❌ Je n'ai pas la permission nécessaire pour réinitialiser ce salon.")
         except Exception as e:
@@ -253,7 +259,7 @@ class ExtraCommands(commands.Cog):
             "author_id": ctx.author.id,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
-        if not save_data(self.data):
+        if not await save_data(self.data):
             logger.warning("Échec de sauvegarde de say_messages.json après +parler")
 
         # Log
@@ -284,7 +290,7 @@ class ExtraCommands(commands.Cog):
         # Mettre à jour persistance
         self.data.setdefault("messages", {}).setdefault(str(message_id), {})["content"] = new_content
         self.data["messages"][str(message_id)]["edited_at"] = datetime.now(timezone.utc).isoformat()
-        if not save_data(self.data):
+        if not await save_data(self.data):
             logger.warning("Échec de sauvegarde de say_messages.json après modif_say")
 
         await ctx.send(f"✅ Message `{message_id}` modifié avec succès.")
@@ -292,11 +298,11 @@ class ExtraCommands(commands.Cog):
         # Log
         await self.log_command(ctx, reason=f"+modif_say ID {message_id}")
 
-def load_data():
-    return read_json(DATA_FILE, {"messages": {}})
+async def load_data():
+    return await read_json_async(DATA_FILE, {"messages": {}})
 
-def save_data(data):
-    return write_json(DATA_FILE, data)
+async def save_data(data):
+    return await write_json_async(DATA_FILE, data)
 
 async def setup(bot):
     await bot.add_cog(ExtraCommands(bot))
\ No newline at end of file
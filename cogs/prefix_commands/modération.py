@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import json
 import re
@@ -8,19 +8,26 @@ import time
 from datetime import datetime, timedelta, timezone
 from utils.config import get_bot_config
 from utils.logger import get_logger
-from utils.config import read_json, write_json
+from utils.dm_outbox import HIGH, PRE_SANCTION_WAIT, send_dm
+from utils.log_sink import send_log
+from utils.persistence import read_json_async, write_json_async
+from utils.delayed_actions import get_action_queue
+from utils.ban_cache import get_ban_cache
+from utils.member_index import get_member_index
 
 # === CONFIG ===
 _BOT_CFG = get_bot_config()
 LOG_CHANNEL_ID = _BOT_CFG.get("COMMAND_LOG_CHANNEL_ID")
 MODERATOR_ROLE_ID = _BOT_CFG.get("MODERATOR_ROLE_ID")
 DATA_FILE = "mod_data.json"
+SCHEDULE_FILE = "mod_schedule.json"  # ancienne file propre au cog, absorbée par la file partagée
+REBAN_REASON = "Reban temporaire"
 MAX_TIMEOUT_SECONDS = 28 * 24 * 3600  # 28 jours en secondes
 
 # === UTILS PERSISTENCE ===
 
-def load_mod_data():
-    data = read_json(DATA_FILE, {"temp_mutes": [], "temp_bans": []})
+async def load_mod_data():
+    data = await read_json_async(DATA_FILE, {"temp_mutes": [], "temp_bans": []})
     # Validation basique
     if not isinstance(data, dict):
         return {"temp_mutes": [], "temp_bans": []}
@@ -28,8 +35,8 @@ def load_mod_data():
     data.setdefault("temp_bans", [])
     return data
 
-def save_mod_data(data):
-    ok = write_json(DATA_FILE, data)
+async def save_mod_data(data):
+    ok = await write_json_async(DATA_FILE, data)
     if not ok:
         logger = get_logger(__name__)
         logger.warning("Échec de sauvegarde de mod_data.json")
@@ -49,31 +56,44 @@ def parse_duration(duration_str):
 # === RESOLUTION MEMBRE ===
 
 async def resolve_member(ctx, arg):
+    """Retourne (membre ou None, NameMatch ou None si la recherche n'a pas porté sur un nom)."""
     # Mention
     if ctx.message.mentions:
-        return ctx.message.mentions[0]
+        return ctx.message.mentions[0], None
     # ID
     try:
         member = ctx.guild.get_member(int(arg))
         if member:
-            return member
+            return member, None
     except (ValueError, TypeError):
         pass
-    # Pseudo / Surnom
-    arg = arg.lower()
-    for m in ctx.guild.members:
-        if m.name.lower() == arg or m.display_name.lower() == arg:
-            return m
-    return None
+    # Pseudo / Surnom (index par serveur, sans parcourir tous les membres)
+    match = get_member_index().find(ctx.guild, arg)
+    if match.unique is not None:
+        return ctx.guild.get_member(match.unique), match
+    return None, match
+
+def not_found_message(guild, match):
+    """Message d'échec de resolve_member, avec les membres possibles s'il y en a."""
+    if match is None:
+        return "Membre cible introuvable."
+    ids = match.exact or match.prefix
+    names = [str(m) for m in (guild.get_member(i) for i in ids[:5]) if m]
+    if match.ambiguous:
+        return f"Plusieurs membres portent ce nom, précise avec une mention ou un ID : {', '.join(names)}"
+    if names:
+        return f"Membre cible introuvable. Tu voulais dire : {', '.join(names)} ?"
+    return "Membre cible introuvable."
 
 # === EMBED DM ===
 
-async def notify_dm(user, title, description, color):
+async def notify_dm(user, title, description, color, before_sanction=False):
     embed = discord.Embed(title=title, description=description, color=color)
-    try:
-        await user.send(embed=embed)
-    except Exception:
-        pass  # DM fermé ou impossible
+    if before_sanction:
+        # Avant un ban/kick, le membre doit encore partager le serveur : attente bornée
+        await send_dm(user, embed, priority=HIGH, wait=PRE_SANCTION_WAIT)
+    else:
+        await send_dm(user, embed)  # DM fermé ou impossible : géré par la file
 
 # === EMBED LOGS ===
 
@@ -92,7 +112,7 @@ async def log_action(guild, action, moderator, target, reason):
     except Exception:
         mod_text = str(moderator)
     embed.set_footer(text=f"Par {mod_text}")
-    await log_channel.send(embed=embed)
+    await send_log(log_channel.id, embed)
 
 # === DROITS MODÉRATEUR ===
 
@@ -130,41 +150,132 @@ def role_hierarchy_check(ctx, target: discord.Member):
 # === COG PRINCIPAL ===
 logger = get_logger(__name__)
 
+def unban_key(guild_id, user_id):
+    return f"unban:{guild_id or 0}:{user_id}"
+
+def reban_key(guild_id, user_id):
+    return f"reban:{guild_id or 0}:{user_id}"
+
 class Moderation_prefix(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.mod_data = load_mod_data()
-        self.temp_bans = self.mod_data.get("temp_bans", [])
+        self.mod_data = {"temp_mutes": [], "temp_bans": []}
+        self.temp_mutes = []
+
+    async def cog_load(self):
+        self.mod_data = await load_mod_data()
         # Initialise également temp_mutes pour éviter les erreurs futures
         self.temp_mutes = self.mod_data.get("temp_mutes", [])
-        self.check_temps.start()
+        # Échéances dans la file d'actions différées partagée
+        self.actions = get_action_queue()
+        self.actions.register("unban", self.expire_ban)
+        self.actions.register("reban", self.apply_reban)
+        moved = await self.actions.absorb(SCHEDULE_FILE)
+        if moved:
+            logger.info(f"{moved} échéance(s) importée(s) depuis {SCHEDULE_FILE}")
+        await self.migrate_temp_bans()
 
     def cog_unload(self):
-        self.check_temps.cancel()
-
-    # === BOUCLE CHECK TEMPORAIRES ===
-    @tasks.loop(seconds=10)
-    async def check_temps(self):
-        now = time.time()
-        guilds = self.bot.guilds
-        changed = False
-
-        # BANS
-        for ban in self.temp_bans[:]:
-            if ban["end_time"] and now >= ban["end_time"]:
-                for guild in guilds:
-                    try:
-                        await guild.unban(discord.Object(id=ban["user_id"]))
-                        await log_action(guild, "Unban (auto)", "Système", f"<@{ban['user_id']}>", "Ban expiré")
-                    except Exception:
-                        pass
-                self.temp_bans.remove(ban)
-                changed = True
-
-        if changed:
-            self.mod_data["temp_mutes"] = self.temp_mutes
-            self.mod_data["temp_bans"] = self.temp_bans
-            save_mod_data(self.mod_data)
+        # Les actions en attente restent persistées et reprennent au rechargement du cog
+        self.actions.unregister("unban")
+        self.actions.unregister("reban")
+
+    async def migrate_temp_bans(self):
+        """Transfère une seule fois les anciens temp_bans (sans serveur) vers la file d'actions."""
+        legacy = self.mod_data.get("temp_bans") or []
+        if not legacy:
+            return
+        for ban in legacy:
+            if not ban.get("end_time"):
+                continue
+            guild_id = ban.get("guild_id")
+            # Les entrées "Reban temporaire" étaient par erreur traitées comme des débans
+            kind, key = ("reban", reban_key) if ban.get("reason") == REBAN_REASON else ("unban", unban_key)
+            if kind == "reban" and not guild_id:
+                # Sans serveur, impossible de savoir où rebannir : jamais de ban sur tous les serveurs
+                logger.warning(f"Reban de l'utilisateur {ban['user_id']} ignoré à la migration : serveur inconnu")
+                continue
+            await self.actions.schedule(
+                kind, ban["end_time"], key(guild_id, ban["user_id"]), guild_id=guild_id,
+                user_id=ban["user_id"], reason=ban.get("reason"), moderator_id=ban.get("moderator_id"),
+            )
+        self.mod_data["temp_bans"] = []
+        await save_mod_data(self.mod_data)
+        logger.info(f"{len(legacy)} ban(s) temporaire(s) migré(s) vers la file d'actions différées")
+
+    def _job_guilds(self, job):
+        if job["guild_id"]:
+            return [self.bot.get_guild(job["guild_id"])]
+        # Ancien ban sans guild_id : seul cas où l'on débannit de tous les serveurs (jamais pour un ban)
+        return self.bot.guilds
+
+    # === ÉCHÉANCES ===
+    async def expire_ban(self, job):
+        """Lève un ban temporaire arrivé à échéance, dans le serveur où il a été posé."""
+        await self.bot.wait_until_ready()
+        user_id = job["payload"]["user_id"]
+        for guild in self._job_guilds(job):
+            if guild is None:
+                continue
+            try:
+                await guild.unban(discord.Object(id=user_id), reason="Ban temporaire expiré")
+            except discord.NotFound:
+                continue  # déjà débanni
+            except discord.HTTPException as e:
+                logger.error(f"Unban automatique de {user_id} impossible sur {guild.id}: {e}")
+                continue
+            await log_action(guild, "Unban (auto)", "Système", f"<@{user_id}>", "Ban expiré")
+
+    async def apply_reban(self, job):
+        """Rebannit un utilisateur débanni temporairement (+unban <user> <durée>)."""
+        await self.bot.wait_until_ready()
+        user_id = job["payload"]["user_id"]
+        if not job["guild_id"]:
+            # Un reban n'est appliqué que dans le serveur qui a débanni, jamais partout
+            logger.warning(f"Reban de l'utilisateur {user_id} ignoré : aucun serveur associé")
+            return
+        guild = self.bot.get_guild(job["guild_id"])
+        if guild is None:
+            return
+        try:
+            await guild.ban(discord.Object(id=user_id), reason=REBAN_REASON)
+        except discord.HTTPException as e:
+            logger.error(f"Reban automatique de {user_id} impossible sur {guild.id}: {e}")
+            return
+        await log_action(guild, "Reban (auto)", "Système", f"<@{user_id}>", "Fin du débannissement temporaire")
+
+    # === INDEX DES NOMS DE MEMBRES ===
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        get_member_index().add(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        get_member_index().remove(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.nick != after.nick or before.name != after.name:
+            get_member_index().add(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        if before.name != after.name or getattr(before, "global_name", None) != getattr(after, "global_name", None):
+            get_member_index().refresh_user(after, self.bot.guilds)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        get_member_index().drop(guild.id)
+        get_ban_cache().drop(guild.id)
+
+    # === CACHE DES BANS ===
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild, user):
+        get_ban_cache().add(guild.id, user)
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild, user):
+        get_ban_cache().remove(guild.id, user.id)
 
     # === Ban ===
     @commands.command()
@@ -175,15 +286,16 @@ class Moderation_prefix(commands.Cog):
         if not bot_has_permissions(ctx, ["ban_members"]):
             await ctx.send("Le bot n'a pas la permission de bannir.")
             return
-        member = await resolve_member(ctx, member_arg)
+        member, match = await resolve_member(ctx, member_arg)
         if not member:
-            await ctx.send("Membre cible introuvable.")
+            await ctx.send(not_found_message(ctx.guild, match))
             return
         if not role_hierarchy_check(ctx, member):
             await ctx.send("Impossible : cible trop haut dans la hiérarchie.")
             return
         # Remove ban existant
-        self.temp_bans = [b for b in self.temp_bans if b["user_id"] != member.id]
+        await self.actions.cancel(unban_key(ctx.guild.id, member.id))
+        await self.actions.cancel(reban_key(ctx.guild.id, member.id))
         end_time = None
         if duration:
             seconds = parse_duration(duration)
@@ -194,15 +306,11 @@ class Moderation_prefix(commands.Cog):
                 seconds = MAX_TIMEOUT_SECONDS
                 await ctx.send("⏱️ Durée trop longue, limitée à 28 jours.")
             end_time = time.time() + seconds
-            self.temp_bans.append({
-                "user_id": member.id,
-                "end_time": end_time,
-                "reason": reason,
-                "moderator_id": ctx.author.id
-            })
-            self.mod_data["temp_bans"] = self.temp_bans
-            save_mod_data(self.mod_data)
-        await notify_dm(member, "Ban", f"Vous êtes banni pour : {reason}\nDurée : {duration if duration else 'définitif'}", discord.Color.red())
+            await self.actions.schedule(
+                "unban", end_time, unban_key(ctx.guild.id, member.id), guild_id=ctx.guild.id,
+                user_id=member.id, reason=reason, moderator_id=ctx.author.id,
+            )
+        await notify_dm(member, "Ban", f"Vous êtes banni pour : {reason}\nDurée : {duration if duration else 'définitif'}", discord.Color.red(), before_sanction=True)
         try:
             await ctx.guild.ban(member, reason=reason)
         except Exception:
@@ -221,28 +329,22 @@ class Moderation_prefix(commands.Cog):
         if not bot_has_permissions(ctx, ["ban_members"]):
             await ctx.send("Le bot n'a pas la permission de débannir.")
             return
-        # Trouver user
-        user_id = None
+        # Trouver user (cache des bans du serveur, téléchargé une seule fois)
         try:
-            user_id = int(user_arg)
-        except ValueError:
-            pass
-        bans = await ctx.guild.bans()
-        user = None
-        for ban_entry in bans:
-            if user_id and ban_entry.user.id == user_id:
-                user = ban_entry.user
-                break
-            if ban_entry.user.name.lower() == user_arg.lower():
-                user = ban_entry.user
-                break
-        if not user:
+            matches = await get_ban_cache().find(ctx.guild, user_arg)
+        except discord.HTTPException:
+            await ctx.send("Impossible de récupérer la liste des bans.")
+            return
+        if not matches:
             await ctx.send("Utilisateur non banni dans ce serveur.")
             return
+        if len(matches) > 1:
+            names = ", ".join(f"{u} ({u.id})" for u in matches[:5])
+            await ctx.send(f"Plusieurs utilisateurs bannis portent ce nom, précise avec un ID : {names}")
+            return
+        user = matches[0]
         # Remove ban
-        self.temp_bans = [b for b in self.temp_bans if b["user_id"] != user.id]
-        self.mod_data["temp_bans"] = self.temp_bans
-        save_mod_data(self.mod_data)
+        await self.actions.cancel(unban_key(ctx.guild.id, user.id))
         try:
             await ctx.guild.unban(user)
         except Exception:
@@ -262,14 +364,10 @@ class Moderation_prefix(commands.Cog):
                 seconds = MAX_TIMEOUT_SECONDS
                 await ctx.send("⏱️ Durée trop longue, limitée à 28 jours pour reban.")
             end_time = time.time() + seconds
-            self.temp_bans.append({
-                "user_id": user.id,
-                "end_time": end_time,
-                "reason": "Reban temporaire",
-                "moderator_id": ctx.author.id
-            })
-            self.mod_data["temp_bans"] = self.temp_bans
-            save_mod_data(self.mod_data)
+            await self.actions.schedule(
+                "reban", end_time, reban_key(ctx.guild.id, user.id), guild_id=ctx.guild.id,
+                user_id=user.id, reason=REBAN_REASON, moderator_id=ctx.author.id,
+            )
 
     # === Kick ===
     @commands.command()
@@ -280,14 +378,14 @@ class Moderation_prefix(commands.Cog):
         if not bot_has_permissions(ctx, ["kick_members"]):
             await ctx.send("Le bot n'a pas la permission d'expulser (kick).")
             return
-        member = await resolve_member(ctx, member_arg)
+        member, match = await resolve_member(ctx, member_arg)
         if not member:
-            await ctx.send("Membre cible introuvable.")
+            await ctx.send(not_found_message(ctx.guild, match))
             return
         if not role_hierarchy_check(ctx, member):
             await ctx.send("Impossible : cible trop haut dans la hiérarchie.")
             return
-        await notify_dm(member, "Kick", f"Vous êtes expulsé du serveur pour : {reason}", discord.Color.orange())
+        await notify_dm(member, "Kick", f"Vous êtes expulsé du serveur pour : {reason}", discord.Color.orange(), before_sanction=True)
         try:
             await member.kick(reason=reason)
         except Exception:
@@ -1,26 +1,37 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
-import json
-import os
+from discord.ext import commands, tasks
 from datetime import datetime, timezone
 from utils.datetime_utils import format_iso_str
-from utils.config import get_bot_config
+from utils.config import get_bot_config, write_json
+from utils.persistence import read_json_async, run_io, write_json_async
+from utils.confession_store import LOCATION_MISSING, LOCATION_OK, ConfessionIndex, ConfessionStore
+from utils.journal import ActionJournal
 from utils.logger import get_logger
+from utils.metrics import STORAGE_LATENCY
+from utils.dm_outbox import send_dm
+from utils.log_sink import HIGH, LOW, send_log
+from utils.rate_limiter import SlidingWindowLimiter
+from utils.ban_index import BanIndex
+from utils.transcript import TranscriptWriter, send_transcript
+from utils.user_cache import get_user_resolver
 import asyncio
-import threading
 from typing import Optional, Dict, Any, Tuple
 import time
 import io
+import os
 import re
 # -------------------------
 # Constantes
 # -------------------------
-CONFESSION_FILE = "confessions.json"
+CONFESSION_FILE = "confessions.json"  # ancien format, migré une seule fois vers CONFESSION_DB
+CONFESSION_DB = "confessions.db"
 BANS_FILE = "confession_bans.json"
 CONFIG_FILE = "confession_config.json"
 REPORTS_FILE = "confession_reports.json"
-ACTIONS_FILE = "confession_actions.json"
+ACTIONS_FILE = "confession_actions.json"  # ancien format, migré une seule fois vers ACTIONS_DIR
+ACTIONS_DIR = "confession_actions"
+ACTIONS_SEGMENT_BYTES = 4 * 1024 * 1024
 
 # Centralized configuration
 _BOT_CFG = get_bot_config()
@@ -28,156 +39,197 @@ ADMIN_LOG_CHANNEL_ID = _BOT_CFG.get("ADMIN_LOG_CHANNEL_ID")
 COMMAND_LOG_CHANNEL_ID = _BOT_CFG.get("COMMAND_LOG_CHANNEL_ID")
 REPORT_LOG_CHANNEL_ID = _BOT_CFG.get("REPORT_LOG_CHANNEL_ID")
 
-# Rate limiting: max confessions per user per hour
+# Rate limiting: max confessions per user per hour (quota par défaut, ajustable par serveur)
 RATE_LIMIT_CONFESSIONS = 5
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+RATE_LIMIT_SNAPSHOT_SECONDS = 60  # sauvegarde périodique de l'état du limiteur
 
-# File locks for thread safety
-_file_locks = {
-    CONFESSION_FILE: threading.Lock(),
-    BANS_FILE: threading.Lock(),
-    CONFIG_FILE: threading.Lock(),
-    REPORTS_FILE: threading.Lock(),
-    ACTIONS_FILE: threading.Lock(),
-}
+# Réparation en arrière-plan des emplacements de messages inconnus (anciennes données)
+LOCATION_REPAIR_MINUTES = 10
+LOCATION_REPAIR_BATCH = 100  # entrées examinées par passage
+LOCATION_REPAIR_REST_BUDGET = 25  # requêtes REST max par passage
+LOCATION_REPAIR_CONCURRENCY = 3
 
 # Setup logging (centralized)
 logger = get_logger(__name__)
 
 # -------------------------
-# Utilitaires fichiers JSON avec verrouillage
+# Utilitaires fichiers JSON (verrou asyncio par fichier, E/S hors de la boucle)
 # -------------------------
-def ensure_file(path: str, default: Dict[str, Any]) -> None:
-    """Assure qu'un fichier existe avec des données par défaut."""
-    if not os.path.exists(path):
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(default, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Erreur lors de la création du fichier {path}: {e}")
-            raise
-
-def load_json_safe(filepath: str, default: Dict[str, Any]) -> Dict[str, Any]:
-    """Charge un fichier JSON de manière sécurisée avec verrouillage."""
-    lock = _file_locks.get(filepath)
-    if not lock:
-        logger.warning(f"Aucun verrou trouvé pour {filepath}")
-        lock = threading.Lock()
-    
-    with lock:
-        try:
-            ensure_file(filepath, default)
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Validation basique de la structure
-                if not isinstance(data, dict):
-                    logger.warning(f"Structure invalide dans {filepath}, utilisation des valeurs par défaut")
-                    return default.copy()
-                return data
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logger.error(f"Erreur lors du chargement de {filepath}: {e}")
-            return default.copy()
-        except Exception as e:
-            logger.error(f"Erreur inattendue lors du chargement de {filepath}: {e}")
-            return default.copy()
-
-def save_json_safe(filepath: str, data: Dict[str, Any]) -> bool:
-    """Sauvegarde un fichier JSON de manière sécurisée avec verrouillage."""
-    lock = _file_locks.get(filepath)
-    if not lock:
-        logger.warning(f"Aucun verrou trouvé pour {filepath}")
-        lock = threading.Lock()
-    
-    with lock:
-        try:
-            # Sauvegarde temporaire pour éviter la corruption
-            temp_file = f"{filepath}.tmp"
-            with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            # Remplace le fichier original seulement si la sauvegarde temporaire réussit
-            os.replace(temp_file, filepath)
-            return True
-        except Exception as e:
-            logger.error(f"Erreur lors de la sauvegarde de {filepath}: {e}")
-            # Nettoie le fichier temporaire en cas d'erreur
-            try:
-                if os.path.exists(f"{filepath}.tmp"):
-                    os.remove(f"{filepath}.tmp")
-            except Exception:
-                pass
-            return False
-
-def load_confessions() -> Dict[str, Any]:
-    """Charge les confessions avec gestion d'erreurs."""
+async def load_json_safe(filepath: str, default: Dict[str, Any]) -> Dict[str, Any]:
+    """Charge un fichier JSON hors de la boucle, avec validation basique de la structure."""
+    try:
+        data = await read_json_async(filepath, default)
+    except Exception as e:
+        logger.error(f"Erreur inattendue lors du chargement de {filepath}: {e}")
+        return default.copy()
+    if not isinstance(data, dict):
+        logger.warning(f"Structure invalide dans {filepath}, utilisation des valeurs par défaut")
+        return default.copy()
+    return data
+
+async def save_json_safe(filepath: str, data: Dict[str, Any]) -> bool:
+    """Sauvegarde un fichier JSON hors de la boucle (écriture atomique différée)."""
+    try:
+        # Attente du verrou de fichier et de l'exécuteur comprises
+        with STORAGE_LATENCY.time(op="save_json_safe", file=os.path.basename(filepath)):
+            ok = await write_json_async(filepath, data)
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde de {filepath}: {e}")
+        return False
+    if not ok:
+        logger.error(f"Erreur lors de la sauvegarde de {filepath}")
+    return ok
+
+_store: Optional[ConfessionStore] = None
+# Index mémoire (id, message, thread, auteur) : toutes les lectures du cog passent par lui
+_index = ConfessionIndex()
+
+def get_store() -> ConfessionStore:
+    """Retourne le stockage SQLite des confessions (migre confessions.json au premier accès)."""
+    global _store
+    if _store is None:
+        _store = ConfessionStore(CONFESSION_DB)
+        _store.migrate_from_json(CONFESSION_FILE)
+        _store.backfill_locations()
+    return _store
+
+def get_index() -> ConfessionIndex:
+    return _index
+
+def rebuild_index() -> int:
+    """Reconstruit l'index mémoire depuis le stockage (bloquant : à lancer via run_io)."""
+    index = ConfessionIndex()
+    index.rebuild(get_store().iter_all())
+    global _index
+    _index = index
+    return len(index)
+
+def close_store() -> None:
+    global _store, _index
+    if _store is not None:
+        _store.close()
+        _store = None
+    _index = ConfessionIndex()
+
+async def load_confessions() -> Dict[str, Any]:
+    """Instantané complet au format de l'ancien confessions.json (export uniquement, coût O(n))."""
     # next_id: prochain ID unique
     # user_counts: {user_id: nb confessions}
     # total_count: nb total de confessions
-    default = {"confessions": [], "message_channels": {}, "next_id": 1, "user_counts": {}, "total_count": 0}
-    return load_json_safe(CONFESSION_FILE, default)
+    return await run_io(get_store().export_snapshot)
+
+async def save_confessions(data: Dict[str, Any]) -> bool:
+    """Remplace tout le stockage par un instantané complet (import uniquement, coût O(n))."""
+    try:
+        await run_io(get_store().import_snapshot, data)
+        await run_io(get_store().backfill_locations)
+        await run_io(rebuild_index)
+        return True
+    except Exception as e:
+        logger.error(f"Erreur lors de l'import des confessions: {e}")
+        return False
+
+def get_confession(confession_id: int) -> Optional[Dict[str, Any]]:
+    """Retourne une confession par id (index mémoire, O(1))."""
+    try:
+        return _index.get(confession_id)
+    except (TypeError, ValueError):
+        return None
 
-def save_confessions(data: Dict[str, Any]) -> bool:
-    """Sauvegarde les confessions avec gestion d'erreurs."""
-    return save_json_safe(CONFESSION_FILE, data)
+async def create_confession(author: discord.User, text: str, timestamp: str, channel_id: Optional[int], reply_to: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Alloue un ID unique persistant, incrémente les compteurs et enregistre la confession."""
+    try:
+        record = await run_io(get_store().create, author.id, str(author), text, timestamp, channel_id=channel_id, reply_to=reply_to)
+        _index.add(record)
+        return record
+    except Exception as e:
+        logger.error(f"Erreur lors de l'enregistrement d'une confession de {author.id}: {e}")
+        return None
 
-def load_bans() -> Dict[str, Any]:
+async def update_confession(confession_id: int, **fields: Any) -> bool:
+    """Met à jour une seule ligne (message_id, channel_id, thread_id...)."""
+    try:
+        ok = await run_io(get_store().update, confession_id, **fields)
+        if ok:
+            _index.update(confession_id, **fields)
+        return ok
+    except Exception as e:
+        logger.error(f"Erreur lors de la mise à jour de la confession {confession_id}: {e}")
+        return False
+
+async def record_location(message: discord.Message, thread_id: Optional[int] = None) -> None:
+    """Mémorise l'emplacement exact d'un message publié (serveur, salon/fil, fil créé dessus)."""
+    try:
+        guild_id = message.guild.id if message.guild else None
+        await run_io(get_store().set_location, message.id, guild_id, message.channel.id, thread_id, LOCATION_OK, time.time())
+    except Exception as e:
+        logger.warning(f"Impossible d'enregistrer l'emplacement du message {message.id}: {e}")
+
+async def delete_confession(confession_id: int) -> Optional[Dict[str, Any]]:
+    """Retire une confession et décrémente les compteurs de son auteur."""
+    try:
+        record = await run_io(get_store().delete, confession_id)
+        _index.remove(confession_id)
+        return record
+    except Exception as e:
+        logger.error(f"Erreur lors de la suppression de la confession {confession_id}: {e}")
+        return None
+
+async def load_bans() -> Dict[str, Any]:
     """Charge les bannissements avec gestion d'erreurs."""
-    return load_json_safe(BANS_FILE, {"banned": []})
+    return await load_json_safe(BANS_FILE, {"banned": []})
 
-def save_bans(data: Dict[str, Any]) -> bool:
+async def save_bans(data: Dict[str, Any]) -> bool:
     """Sauvegarde les bannissements avec gestion d'erreurs."""
-    return save_json_safe(BANS_FILE, data)
+    return await save_json_safe(BANS_FILE, data)
 
-def load_config() -> Dict[str, Any]:
+async def load_config() -> Dict[str, Any]:
     """Charge la configuration avec gestion d'erreurs."""
-    return load_json_safe(CONFIG_FILE, {"rate_limits": {}})
+    return await load_json_safe(CONFIG_FILE, {"rate_limiter": {}})
 
-def save_config(data: Dict[str, Any]) -> bool:
+async def save_config(data: Dict[str, Any]) -> bool:
     """Sauvegarde la configuration avec gestion d'erreurs."""
-    return save_json_safe(CONFIG_FILE, data)
+    return await save_json_safe(CONFIG_FILE, data)
 
-def load_reports() -> Dict[str, Any]:
+async def load_reports() -> Dict[str, Any]:
     """Charge les signalements persistants."""
-    return load_json_safe(REPORTS_FILE, {"reports": []})
+    return await load_json_safe(REPORTS_FILE, {"reports": []})
 
-def save_reports(data: Dict[str, Any]) -> bool:
+async def save_reports(data: Dict[str, Any]) -> bool:
     """Sauvegarde les signalements persistants."""
-    return save_json_safe(REPORTS_FILE, data)
-
-def load_actions() -> Dict[str, Any]:
-    """Charge le journal d'actions persistantes (création, réponse, suppression, ban, unban)."""
-    return load_json_safe(ACTIONS_FILE, {"actions": []})
-
-def save_actions(data: Dict[str, Any]) -> bool:
-    """Sauvegarde le journal d'actions."""
-    return save_json_safe(ACTIONS_FILE, data)
-
-def _allocate_id_and_increment(data: Dict[str, Any], author_id: int) -> int:
-    """Alloue un ID unique persistant et incrémente les compteurs (total et par utilisateur)."""
-    nid = int(data.get("next_id", 1))
-    data["next_id"] = nid + 1
-    counts = data.get("user_counts", {})
-    key = str(author_id)
-    counts[key] = int(counts.get(key, 0)) + 1
-    data["user_counts"] = counts
-    data["total_count"] = int(data.get("total_count", 0)) + 1
-    return nid
-
-def user_conf_count(data: Dict[str, Any], user_id: int) -> int:
-    """Retourne le nombre de confessions d'un utilisateur (persistant)."""
-    return int(data.get("user_counts", {}).get(str(user_id), 0))
+    return await save_json_safe(REPORTS_FILE, data)
 
-def _decrement_counters(data: Dict[str, Any], author_id: int) -> None:
+_journal: Optional[ActionJournal] = None
+
+def get_journal() -> ActionJournal:
+    """Journal d'actions persistant (création, réponse, suppression, ban, unban), en segments JSONL."""
+    global _journal
+    if _journal is None:
+        _journal = ActionJournal(ACTIONS_DIR, max_segment_bytes=ACTIONS_SEGMENT_BYTES, compress=True)
+        _journal.migrate_from_json(ACTIONS_FILE)
+    return _journal
+
+async def record_action(action: Dict[str, Any]) -> bool:
+    """Ajoute une action en fin de journal (O(1), sans relire l'historique)."""
+    try:
+        return await run_io(get_journal().append, action)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'écriture du journal d'actions: {e}")
+        return False
+
+def close_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+async def user_conf_count(user_id: int) -> int:
+    """Retourne le nombre de confessions d'un utilisateur (persistant)."""
     try:
-        counts = data.get("user_counts", {})
-        key = str(author_id)
-        if key in counts and counts[key] > 0:
-            counts[key] -= 1
-        data["user_counts"] = counts
-        if int(data.get("total_count", 0)) > 0:
-            data["total_count"] = int(data["total_count"]) - 1
+        return await run_io(get_store().user_count, user_id)
     except Exception:
-        pass
+        return 0
 
 def validate_confession_text(text: str) -> Tuple[bool, str]:
     """Valide le texte d'une confession."""
@@ -199,39 +251,94 @@ def validate_confession_text(text: str) -> Tuple[bool, str]:
     
     return True, "Valide"
 
-def check_rate_limit(user_id: int, increment: bool = True) -> Tuple[bool, int]:
-    """Vérifie si l'utilisateur respecte la limite de taux.
+# Index des bannissements, chargé dans cog_load puis tenu à jour par add_ban/remove_ban
+_bans = BanIndex()
+
+# Limiteur en mémoire : aucune E/S sur le chemin critique, état sauvegardé périodiquement
+_rate_limiter = SlidingWindowLimiter(RATE_LIMIT_CONFESSIONS, RATE_LIMIT_WINDOW, idle_ttl=RATE_LIMIT_WINDOW)
+
+def check_rate_limit(user_id: int, increment: bool = True, guild_id: Optional[int] = None) -> Tuple[bool, int]:
+    """Vérifie si l'utilisateur respecte la limite de taux (fenêtre glissante, quota du serveur).
     Si increment=False, ne consomme pas de quota (mode aperçu).
     Retourne (autorisé, secondes_restant_avant_reset).
     """
-    config = load_config()
-    rate_limits = config.get("rate_limits", {})
-    user_key = str(user_id)
-    
-    current_time = int(time.time())
-    
-    if user_key not in rate_limits:
-        rate_limits[user_key] = {"count": 0, "reset_time": current_time + RATE_LIMIT_WINDOW}
-    
-    user_limit = rate_limits[user_key]
-    
-    # Réinitialise si la fenêtre de temps est écoulée
-    if current_time >= user_limit["reset_time"]:
-        user_limit["count"] = 0
-        user_limit["reset_time"] = current_time + RATE_LIMIT_WINDOW
-    
-    # Vérifie la limite
-    if user_limit["count"] >= RATE_LIMIT_CONFESSIONS:
-        time_left = user_limit["reset_time"] - current_time
-        return False, time_left
-    
-    # Incrémente le compteur uniquement si demandé
-    if increment:
-        user_limit["count"] += 1
-        config["rate_limits"] = rate_limits
-        save_config(config)
-    
-    return True, 0
+    return _rate_limiter.check(user_id, guild_id, consume=increment)
+
+def rate_limit_label(guild_id: Optional[int]) -> str:
+    """Décrit le quota du serveur, p.ex. '5 confessions par heure'."""
+    limit, window = _rate_limiter.quota(guild_id)
+    if window == 3600:
+        return f"{limit} confessions par heure"
+    return f"{limit} confessions par {max(1, window // 60)} minute(s)"
+
+def restore_rate_limiter(config: Dict[str, Any]) -> None:
+    """Recharge l'état sauvegardé du limiteur et migre l'ancien format 'rate_limits'.
+    L'ancien limiteur était global : son historique est rangé sous le serveur 0, puis
+    repris par le limiteur au premier contrôle de l'utilisateur dans un serveur.
+    """
+    _rate_limiter.restore(config.get("rate_limiter", {}))
+    now = time.time()
+    for user_key, entry in (config.get("rate_limits") or {}).items():
+        try:
+            count = int(entry.get("count", 0))
+            reset_time = int(entry.get("reset_time", 0))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if reset_time > now:
+            for _ in range(min(count, RATE_LIMIT_CONFESSIONS)):
+                _rate_limiter.check(int(user_key), consume=True, now=reset_time - RATE_LIMIT_WINDOW)
+
+def rate_limiter_snapshot() -> Dict[str, Any]:
+    return {"rate_limiter": _rate_limiter.snapshot()}
+
+# -------------------------
+# Boutons persistants (résolus par leur custom_id, sans rechargement au démarrage)
+# -------------------------
+_BUTTON_STYLES = {
+    "report": (discord.ButtonStyle.danger, "Signaler"),
+    "reply": (discord.ButtonStyle.primary, "Répondre"),
+    "delete": (discord.ButtonStyle.secondary, "Supprimer"),
+}
+
+class ConfessButton(discord.ui.DynamicItem[discord.ui.Button], template=r"confess_(?P<action>report|reply|delete):(?P<id>\d+)"):
+    """Bouton d'une confession publiée. discord.py reconstruit l'objet à partir du custom_id
+    de chaque clic : le coût au démarrage est constant et rien n'est gardé en mémoire par message.
+    """
+    def __init__(self, action: str, confession_id: int):
+        style, label = _BUTTON_STYLES[action]
+        super().__init__(discord.ui.Button(style=style, label=label, custom_id=f"confess_{action}:{confession_id}"))
+        self.action = action
+        self.confession_id = confession_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: "re.Match[str]"):
+        return cls(match["action"], int(match["id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("Confessions")
+        if cog is None:
+            return await interaction.response.send_message("❌ Le système de confessions est indisponible.", ephemeral=True)
+        conf = get_confession(self.confession_id)
+        if self.action == "delete":
+            # Only the original author can delete
+            if not conf:
+                return await interaction.response.send_message("❌ Confession introuvable.", ephemeral=True)
+            if conf.get("author_id") != interaction.user.id:
+                return await interaction.response.send_message("❌ Seul l'auteur de la confession peut la supprimer.", ephemeral=True)
+            return await interaction.response.send_modal(cog.DeleteModal(cog, self.confession_id, interaction.user))
+        # check ban
+        if cog.is_banned(interaction.user.id):
+            return await interaction.response.send_message("🚫 Tu es banni du système de confessions.", ephemeral=True)
+        if self.action == "report":
+            # prevent reporting own confession
+            if conf and conf.get("author_id") == interaction.user.id:
+                return await interaction.response.send_message("❌ Tu ne peux pas signaler ta propre confession.", ephemeral=True)
+            await interaction.response.send_modal(cog.ReportModal(cog, self.confession_id, interaction.user))
+        else:
+            # prevent replying to own confession
+            if conf and conf.get("author_id") == interaction.user.id:
+                return await interaction.response.send_message("❌ Tu ne peux pas répondre à ta propre confession.", ephemeral=True)
+            await interaction.response.send_modal(cog.ReplyModal(cog, self.confession_id, interaction.user))
 
 # -------------------------
 # Cog
@@ -240,40 +347,141 @@ class Confessions(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Ouverture (et migration éventuelle) hors de la boucle
+        await run_io(get_store)
+        await run_io(get_journal)
+        count = await run_io(rebuild_index)
+        logger.info(f"Index des confessions reconstruit: {count} entrée(s)")
+        # Les boutons des confessions déjà publiées sont résolus par leur custom_id
+        self.bot.add_dynamic_items(ConfessButton)
+        restore_rate_limiter(await load_config())
+        if _bans.load(await load_bans()):
+            # Migration unique des anciennes entrées (entiers) et purge des bans expirés
+            await save_bans(_bans.to_document())
+        self.snapshot_rate_limits.start()
+        self.repair_locations.start()
+
+    def cog_unload(self):
+        self.bot.remove_dynamic_items(ConfessButton)
+        self.snapshot_rate_limits.cancel()
+        self.repair_locations.cancel()
+        # write_json ne fait que mettre le document en cache (écriture différée)
+        write_json(CONFIG_FILE, rate_limiter_snapshot())
+        close_store()
+        close_journal()
+
+    @tasks.loop(seconds=RATE_LIMIT_SNAPSHOT_SECONDS)
+    async def snapshot_rate_limits(self):
+        """Évince les utilisateurs inactifs et sauvegarde l'état du limiteur."""
+        await save_config(rate_limiter_snapshot())
+
+    @tasks.loop(minutes=LOCATION_REPAIR_MINUTES)
+    async def repair_locations(self):
+        """Confirme l'emplacement des messages hérités des anciennes données, par petits lots.
+        Un message n'est confirmé que s'il existe encore dans son salon.
+        Utilise d'abord le cache du bot, puis au plus LOCATION_REPAIR_REST_BUDGET requêtes
+        REST par passage ; s'arrête quand plus rien n'est à réparer.
+        """
+        store = get_store()
+        rows = await run_io(store.locations_to_repair, LOCATION_REPAIR_BATCH)
+        if not rows:
+            logger.info("Emplacements des confessions à jour, arrêt du job de réparation")
+            self.repair_locations.stop()
+            return
+        candidates = await run_io(store.known_location_channels)
+        cached = {m.id for m in self.bot.cached_messages}  # vérifiés sans requête
+        budget = LOCATION_REPAIR_REST_BUDGET
+        sem = asyncio.Semaphore(LOCATION_REPAIR_CONCURRENCY)
+        repaired = missing = 0
+
+        def take_budget() -> bool:
+            nonlocal budget
+            if budget <= 0:
+                return False
+            budget -= 1
+            return True
+
+        fetched: Dict[int, Any] = {}  # salons récupérés pendant ce passage (False = introuvable)
+
+        async def resolve_channel(channel_id: int):
+            """Salon, False s'il est supprimé ou inaccessible, None si le budget est épuisé."""
+            channel = self.bot.get_channel(channel_id) or fetched.get(channel_id)
+            if channel is None and take_budget():
+                try:
+                    channel = await self.bot.fetch_channel(channel_id)
+                except (discord.NotFound, discord.Forbidden):
+                    channel = False
+                fetched[channel_id] = channel
+            return channel
+
+        async def repair(row: Dict[str, Any]) -> None:
+            nonlocal repaired, missing
+            async with sem:
+                message_id = row["message_id"]
+                now = time.time()
+                try:
+                    channel_ids = [row["channel_id"]] if row["channel_id"] else []
+                    if not channel_ids and row["reply_to"]:
+                        parent = get_confession(row["reply_to"])
+                        if parent and parent.get("thread_id"):
+                            channel_ids = [parent["thread_id"]]
+                    if channel_ids:
+                        channel = await resolve_channel(channel_ids[0])
+                        if channel is None:
+                            return  # budget épuisé, nouvel essai au prochain passage
+                        if channel is not False and message_id not in cached:
+                            # Le salon existe : encore faut-il que le message n'ait pas été supprimé
+                            if not take_budget():
+                                return  # nouvel essai au prochain passage
+                            try:
+                                await channel.fetch_message(message_id)
+                            except (discord.NotFound, discord.Forbidden):
+                                channel = False
+                        if channel is False:
+                            missing += 1
+                            await run_io(store.set_location, message_id, None, None, None, LOCATION_MISSING, now)
+                            return
+                        await run_io(store.set_location, message_id, channel.guild.id, channel.id, row["thread_id"], LOCATION_OK, now)
+                        repaired += 1
+                        return
+                    # Salon inconnu : on ne cherche que dans les salons de confessions déjà connus
+                    # MISSING seulement si chaque salon a vraiment été vérifié
+                    checked_all = True
+                    for channel_id in candidates:
+                        channel = await resolve_channel(channel_id)
+                        if channel is False:
+                            continue  # salon supprimé : le message n'y est pas
+                        if channel is None or not take_budget():
+                            checked_all = False
+                            continue
+                        try:
+                            msg = await channel.fetch_message(message_id)
+                        except (discord.NotFound, discord.Forbidden):
+                            continue
+                        await run_io(store.set_location, message_id, msg.guild.id if msg.guild else None, channel.id, row["thread_id"], LOCATION_OK, now)
+                        await update_confession(row["confession_id"], channel_id=channel.id)
+                        repaired += 1
+                        return
+                    if checked_all:
+                        missing += 1
+                        await run_io(store.set_location, message_id, None, None, None, LOCATION_MISSING, now)
+                except discord.HTTPException as e:
+                    logger.warning(f"Réparation de l'emplacement du message {message_id} reportée: {e}")
+
+        await asyncio.gather(*(repair(row) for row in rows))
+        logger.info(f"Emplacements des confessions: {repaired} réparé(s), {missing} introuvable(s), {LOCATION_REPAIR_REST_BUDGET - budget} requête(s) REST")
+
+    @repair_locations.before_loop
+    async def before_repair_locations(self):
+        await self.bot.wait_until_ready()
+
     # ------ helpers ------
     def is_banned(self, user_id: int) -> bool:
-        """Vérifie si un utilisateur est banni (supporte anciens et nouveaux formats).
-        Nouveaux formats: banned: [user_id, {"user_id": int, "until": int|None}]
-        Expire automatiquement les bans dont "until" est passé.
+        """Vérifie si un utilisateur est banni (index en mémoire, sans E/S).
+        Les bans dont "until" est passé sont retirés à la volée.
         """
-        try:
-            bans = load_bans()
-            banned_list = bans.get("banned", [])
-            changed = False
-            now = int(time.time())
-            result = False
-            new_list = []
-            for entry in banned_list:
-                if isinstance(entry, int):
-                    if entry == user_id:
-                        result = True
-                    new_list.append(entry)
-                else:
-                    uid = entry.get("user_id")
-                    until = entry.get("until")  # epoch seconds or None
-                    if until is not None and now >= int(until):
-                        changed = True  # expired
-                        continue
-                    if uid == user_id:
-                        result = True
-                    new_list.append({"user_id": uid, "until": until})
-            if changed:
-                bans["banned"] = new_list
-                save_bans(bans)
-            return result
-        except Exception as e:
-            logger.error(f"Erreur lors de la vérification du ban pour {user_id}: {e}")
-            return False
+        return _bans.is_banned(user_id)
 
     # --- Ban helpers ---
     def _parse_duration_seconds(self, s: Optional[str]) -> Optional[int]:
@@ -286,23 +494,15 @@ class Confessions(commands.Cog):
         mult = {"s":1, "m":60, "h":3600, "j":86400}
         return int(num) * mult[unit]
 
-    def add_ban(self, user_id: int, duration_seconds: Optional[int] = None) -> bool:
-        bans = load_bans()
-        banned = bans.get("banned", [])
-        now = int(time.time())
-        until = (now + int(duration_seconds)) if duration_seconds else None
-        # Remove existing
-        banned = [e for e in banned if (e if isinstance(e,int) else e.get("user_id")) != user_id]
-        banned.append({"user_id": user_id, "until": until})
-        bans["banned"] = banned
-        return save_bans(bans)
-
-    def remove_ban(self, user_id: int) -> bool:
-        bans = load_bans()
-        banned = bans.get("banned", [])
-        banned = [e for e in banned if (e if isinstance(e,int) else e.get("user_id")) != user_id]
-        bans["banned"] = banned
-        return save_bans(bans)
+    async def add_ban(self, user_id: int, duration_seconds: Optional[int] = None) -> bool:
+        until = (int(time.time()) + int(duration_seconds)) if duration_seconds else None
+        _bans.ban(user_id, until)
+        return await save_bans(_bans.to_document())
+
+    async def remove_ban(self, user_id: int) -> bool:
+        if not _bans.unban(user_id):
+            return True
+        return await save_bans(_bans.to_document())
     
     def has_admin_permissions(self, user: discord.User, guild: discord.Guild) -> bool:
         """Vérifie si l'utilisateur a les permissions d'administration."""
@@ -341,8 +541,8 @@ class Confessions(commands.Cog):
                     except Exception as e:
                         logger.warning(f"Erreur lors de l'ajout du champ {name}: {e}")
             
-            await ch.send(embed=embed)
-            return True
+            # Envoi groupé par salon (voir utils/log_sink.py)
+            return await send_log(ADMIN_LOG_CHANNEL_ID, embed)
         except discord.HTTPException as e:
             logger.error(f"Erreur HTTP lors du log admin: {e}")
             return False
@@ -366,8 +566,7 @@ class Confessions(commands.Cog):
                 except Exception as e:
                     logger.warning(f"Erreur lors de l'ajout du modérateur au log: {e}")
             
-            await ch.send(embed=embed)
-            return True
+            return await send_log(COMMAND_LOG_CHANNEL_ID, embed, LOW)
         except discord.HTTPException as e:
             logger.error(f"Erreur HTTP lors du log de commande: {e}")
             return False
@@ -376,18 +575,11 @@ class Confessions(commands.Cog):
             return False
 
     async def send_dm_safe(self, user: discord.User, embed: discord.Embed) -> bool:
-        """Envoie un DM de manière sécurisée avec gestion d'erreurs."""
+        """Met un DM dans la file d'envoi (non bloquant). False si DMs connus fermés ou file pleine."""
         try:
-            await user.send(embed=embed)
-            return True
-        except discord.Forbidden:
-            logger.info(f"Impossible d'envoyer un DM à {user.id} (DMs fermés)")
-            return False
-        except discord.HTTPException as e:
-            logger.warning(f"Erreur HTTP lors de l'envoi DM à {user.id}: {e}")
-            return False
+            return await send_dm(user, embed)
         except Exception as e:
-            logger.error(f"Erreur inattendue lors de l'envoi DM à {user.id}: {e}")
+            logger.error(f"Erreur inattendue lors de la mise en file du DM pour {user.id}: {e}")
             return False
 
     # -------------------------
@@ -405,8 +597,7 @@ class Confessions(commands.Cog):
         async def on_submit(self, interaction: discord.Interaction):
             await interaction.response.defer(ephemeral=True)
             try:
-                data = load_confessions()
-                conf = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
+                conf = get_confession(self.confession_id)
                 if not conf:
                     return await interaction.followup.send("❌ Confession introuvable.", ephemeral=True)
                 if conf.get("author_id") != self.author.id:
@@ -415,20 +606,22 @@ class Confessions(commands.Cog):
                 channel_id = conf.get("channel_id")
                 message_id = conf.get("message_id")
                 thread_id = conf.get("thread_id")
-                transcript_text = None
+                transcript = None
+                if message_id and not channel_id:
+                    loc = await run_io(get_store().location, message_id)
+                    channel_id = loc.get("channel_id") if loc else None
 
                 # Transcript si thread
                 if thread_id:
                     try:
                         thread = self.cog.bot.get_channel(thread_id)
                         if thread and isinstance(thread, discord.Thread):
-                            lines = []
-                            async for m in thread.history(limit=None, oldest_first=True):
-                                ts = m.created_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-                                author = f"{m.author} ({m.author.id})"
-                                content = m.content or ""
-                                lines.append(f"[{ts}] {author}: {content}")
-                            transcript_text = "\n".join(lines) if lines else "(Aucun message)"
+                            # Écrite au fil des pages d'historique, découpée selon la limite d'upload
+                            transcript = TranscriptWriter(
+                                f"transcript_confession_{self.confession_id}",
+                                getattr(thread.guild, "filesize_limit", None),
+                            )
+                            await transcript.write_history(thread)
                     except Exception as e:
                         logger.warning(f"Impossible de générer la transcription du thread {thread_id}: {e}")
 
@@ -452,16 +645,8 @@ class Confessions(commands.Cog):
                 except Exception:
                     pass
 
-                # Retrait du stockage
-                try:
-                    # décrémente les compteurs puis retire l'entrée
-                    author_id = int(conf.get("author_id")) if conf.get("author_id") is not None else None
-                    if author_id is not None:
-                        _decrement_counters(data, author_id)
-                    data["confessions"] = [c for c in data.get("confessions", []) if c.get("id") != self.confession_id]
-                    save_confessions(data)
-                except Exception:
-                    pass
+                # Retrait du stockage (décrémente aussi les compteurs de l'auteur)
+                await delete_confession(self.confession_id)
 
                 # Log admin + transcript
                 extra = {
@@ -469,14 +654,15 @@ class Confessions(commands.Cog):
                     "Auteur": f"{self.author} ({self.author.id})",
                     "Raison": self.reason.value,
                 }
-                if transcript_text is not None:
+                if transcript is not None:
                     try:
-                        file = discord.File(io.BytesIO(transcript_text.encode("utf-8")), filename=f"transcript_confession_{self.confession_id}.txt")
                         ch = self.cog.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
                         if ch:
-                            await ch.send(content=f"🗑️ Suppression de la confession #{self.confession_id}", file=file)
+                            await send_transcript(ch, transcript, f"🗑️ Suppression de la confession #{self.confession_id}")
                     except Exception as e:
                         logger.warning(f"Impossible d'envoyer la transcription: {e}")
+                    finally:
+                        transcript.close()
                 await self.cog.log_admin(
                     title=f"Suppression Confession #{self.confession_id}",
                     description="La confession a été supprimée par son auteur.",
@@ -488,21 +674,14 @@ class Confessions(commands.Cog):
                 await interaction.followup.send("✅ Ta confession a été supprimée.", ephemeral=True)
 
                 # Journal d'action persistant (suppression)
-                try:
-                    actions = load_actions()
-                    al = actions.get("actions", [])
-                    al.append({
-                        "type": "delete",
-                        "confession_id": int(self.confession_id),
-                        "author_id": int(self.author.id),
-                        "author_tag": str(self.author),
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "thread_id": int(thread_id) if thread_id else None,
-                    })
-                    actions["actions"] = al
-                    save_actions(actions)
-                except Exception:
-                    pass
+                await record_action({
+                    "type": "delete",
+                    "confession_id": int(self.confession_id),
+                    "author_id": int(self.author.id),
+                    "author_tag": str(self.author),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "thread_id": int(thread_id) if thread_id else None,
+                })
             except Exception as e:
                 logger.error(f"Erreur dans DeleteModal.on_submit: {e}")
                 try:
@@ -517,6 +696,7 @@ class Confessions(commands.Cog):
         """
         View dynamique : construit des boutons 'Signaler' et 'Répondre' selon reply_enabled.
         Les custom_id sont stables pour persistance : 'confess_report:{id}', 'confess_reply:{id}'
+        Après un redémarrage, les clics sont pris en charge par ConfessButton (aucune vue à recharger).
         """
         def __init__(self, cog: "Confessions", confession_id: int, reply_enabled: bool = True):
             super().__init__(timeout=None)
@@ -525,56 +705,12 @@ class Confessions(commands.Cog):
             self.reply_enabled = reply_enabled
 
             # Bouton Signaler (toujours présent)
-            report_id = f"confess_report:{confession_id}"
-            btn_report = discord.ui.Button(style=discord.ButtonStyle.danger, label="Signaler", custom_id=report_id)
-            btn_report.callback = self._report_callback
-            self.add_item(btn_report)
-
+            self.add_item(ConfessButton("report", confession_id))
             # Bouton Répondre (optionnel)
             if reply_enabled:
-                reply_id = f"confess_reply:{confession_id}"
-                btn_reply = discord.ui.Button(style=discord.ButtonStyle.primary, label="Répondre", custom_id=reply_id)
-                btn_reply.callback = self._reply_callback
-                self.add_item(btn_reply)
-
+                self.add_item(ConfessButton("reply", confession_id))
             # Bouton Supprimer (propriétaire uniquement)
-            delete_id = f"confess_delete:{confession_id}"
-            btn_delete = discord.ui.Button(style=discord.ButtonStyle.secondary, label="Supprimer", custom_id=delete_id)
-            btn_delete.callback = self._delete_callback
-            self.add_item(btn_delete)
-
-        async def _report_callback(self, interaction: discord.Interaction):
-            # check ban
-            if self.cog.is_banned(interaction.user.id):
-                return await interaction.response.send_message("🚫 Tu es banni du système de confessions.", ephemeral=True)
-            # prevent reporting own confession
-            data = load_confessions()
-            conf = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
-            if conf and conf.get("author_id") == interaction.user.id:
-                return await interaction.response.send_message("❌ Tu ne peux pas signaler ta propre confession.", ephemeral=True)
-            # open Report modal
-            await interaction.response.send_modal(self.cog.ReportModal(self.cog, self.confession_id, interaction.user))
-
-        async def _reply_callback(self, interaction: discord.Interaction):
-            if self.cog.is_banned(interaction.user.id):
-                return await interaction.response.send_message("🚫 Tu es banni du système de confessions.", ephemeral=True)
-            # prevent replying to own confession
-            data = load_confessions()
-            conf = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
-            if conf and conf.get("author_id") == interaction.user.id:
-                return await interaction.response.send_message("❌ Tu ne peux pas répondre à ta propre confession.", ephemeral=True)
-            # open Reply modal
-            await interaction.response.send_modal(self.cog.ReplyModal(self.cog, self.confession_id, interaction.user))
-
-        async def _delete_callback(self, interaction: discord.Interaction):
-            # Only the original author can delete
-            data = load_confessions()
-            conf = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
-            if not conf:
-                return await interaction.response.send_message("❌ Confession introuvable.", ephemeral=True)
-            if conf.get("author_id") != interaction.user.id:
-                return await interaction.response.send_message("❌ Seul l'auteur de la confession peut la supprimer.", ephemeral=True)
-            await interaction.response.send_modal(self.cog.DeleteModal(self.cog, self.confession_id, interaction.user))
+            self.add_item(ConfessButton("delete", confession_id))
 
     # -------------------------
     # Modal: Confess (slash)
@@ -605,41 +741,26 @@ class Confessions(commands.Cog):
                     return
 
                 # Vérification du rate limiting
-                can_post, time_left = check_rate_limit(self.author.id)
+                can_post, time_left = check_rate_limit(self.author.id, guild_id=interaction.guild_id)
                 if not can_post:
                     minutes_left = max(1, time_left // 60)
                     await interaction.followup.send(
-                        f"⏰ Tu as atteint la limite de {RATE_LIMIT_CONFESSIONS} confessions par heure. "
+                        f"⏰ Tu as atteint la limite de {rate_limit_label(interaction.guild_id)}. "
                         f"Réessaie dans {minutes_left} minute(s).", ephemeral=True
                     )
                     return
 
-                # Chargement et sauvegarde des données
-                data = load_confessions()
-                cid = _allocate_id_and_increment(data, self.author.id)
                 now = datetime.now(timezone.utc).isoformat()
                 
                 # Stockage du channel_id pour optimiser le rechargement des vues
                 channel_id = interaction.channel.id if interaction.channel else None
-                
-                conf_obj = {
-                    "id": cid,
-                    "author_id": self.author.id,
-                    "author_tag": str(self.author),
-                    "text": self.confession.value.strip(),
-                    "responses": [],
-                    "timestamp": now,
-                    "message_id": None,
-                    "channel_id": channel_id,
-                    "reply_to": None
-                }
-                
-                data["confessions"].append(conf_obj)
 
-                # Sauvegarde avec vérification d'erreur (incluant compteurs et next_id)
-                if not save_confessions(data):
+                # Enregistrement (ID unique, compteurs et ligne en une transaction)
+                conf_obj = await create_confession(self.author, self.confession.value.strip(), now, channel_id)
+                if not conf_obj:
                     await interaction.followup.send("❌ Erreur lors de la sauvegarde. Réessaie plus tard.", ephemeral=True)
                     return
+                cid = conf_obj["id"]
 
                 # Détermination du type de canal
                 channel = interaction.channel
@@ -664,9 +785,9 @@ class Confessions(commands.Cog):
                     public_msg = await channel.send(embed=embed, view=view)
                     
                     # Mise à jour avec l'ID du message
-                    conf_obj["message_id"] = public_msg.id
-                    if not save_confessions(data):
+                    if not await update_confession(cid, message_id=public_msg.id):
                         logger.warning(f"Impossible de sauvegarder l'ID du message pour la confession {cid}")
+                    await record_location(public_msg)
                         
                 except discord.Forbidden:
                     await interaction.followup.send("❌ Je n'ai pas les permissions pour envoyer des messages dans ce canal.", ephemeral=True)
@@ -696,31 +817,24 @@ class Confessions(commands.Cog):
                 )
 
                 # Confirmation par DM (non-bloquant)
-                total = user_conf_count(data, self.author.id)
+                total = await user_conf_count(self.author.id)
                 dm_embed = discord.Embed(
                     title="✅ Confession publiée !",
                     description=f"Ta confession #{cid} a été publiée.\nTu as maintenant {total} confession(s) au total.",
                     color=discord.Color.green(),
                     timestamp=datetime.now(timezone.utc)
                 )
-                asyncio.create_task(self.cog.send_dm_safe(self.author, dm_embed))
+                await self.cog.send_dm_safe(self.author, dm_embed)
 
                 # Journal d'action persistant
-                try:
-                    actions = load_actions()
-                    actions_list = actions.get("actions", [])
-                    actions_list.append({
-                        "type": "create",
-                        "confession_id": int(cid),
-                        "author_id": int(self.author.id),
-                        "author_tag": str(self.author),
-                        "timestamp": now,
-                        "channel_id": int(channel.id) if channel else None,
-                    })
-                    actions["actions"] = actions_list
-                    save_actions(actions)
-                except Exception:
-                    pass
+                await record_action({
+                    "type": "create",
+                    "confession_id": int(cid),
+                    "author_id": int(self.author.id),
+                    "author_tag": str(self.author),
+                    "timestamp": now,
+                    "channel_id": int(channel.id) if channel else None,
+                })
                 
             except Exception as e:
                 logger.error(f"Erreur critique dans ConfessModal.on_submit: {e}")
@@ -758,8 +872,7 @@ class Confessions(commands.Cog):
                     return
 
                 # Récupération de la confession
-                data = load_confessions()
-                confession = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
+                confession = get_confession(self.confession_id)
                 if not confession:
                     await interaction.followup.send("❌ Confession introuvable.", ephemeral=True)
                     return
@@ -774,7 +887,7 @@ class Confessions(commands.Cog):
 
                 # Persistance du signalement
                 try:
-                    rpt = load_reports()
+                    rpt = await load_reports()
                     reports = rpt.get("reports", [])
                     reports.append({
                         "confession_id": int(self.confession_id),
@@ -784,7 +897,7 @@ class Confessions(commands.Cog):
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                     })
                     rpt["reports"] = reports
-                    save_reports(rpt)
+                    await save_reports(rpt)
                 except Exception as e:
                     logger.warning(f"Impossible d'enregistrer le signalement: {e}")
 
@@ -829,9 +942,8 @@ class Confessions(commands.Cog):
                 ch = self.cog.bot.get_channel(REPORT_LOG_CHANNEL_ID)
                 if ch:
                     try:
-                        await ch.send(embed=report_embed)
-                    except discord.HTTPException as e:
-                        logger.error(f"Erreur lors de l'envoi du log de signalement: {e}")
+                        # Priorité haute : jamais évincé au profit des logs de commande
+                        await send_log(REPORT_LOG_CHANNEL_ID, report_embed, HIGH)
                     except Exception as e:
                         logger.error(f"Erreur inattendue lors du log de signalement: {e}")
                 else:
@@ -873,18 +985,17 @@ class Confessions(commands.Cog):
                     return
 
                 # Vérification du rate limiting
-                can_post, time_left = check_rate_limit(self.replier.id)
+                can_post, time_left = check_rate_limit(self.replier.id, guild_id=interaction.guild_id)
                 if not can_post:
                     minutes_left = max(1, time_left // 60)
                     await interaction.followup.send(
-                        f"⏰ Tu as atteint la limite de {RATE_LIMIT_CONFESSIONS} confessions par heure. "
+                        f"⏰ Tu as atteint la limite de {rate_limit_label(interaction.guild_id)}. "
                         f"Réessaie dans {minutes_left} minute(s).", ephemeral=True
                     )
                     return
 
-                # Chargement des données
-                data = load_confessions()
-                parent = next((c for c in data.get("confessions", []) if c.get("id") == self.confession_id), None)
+                # Chargement de la confession parente
+                parent = get_confession(self.confession_id)
                 if not parent:
                     await interaction.followup.send("❌ Confession introuvable.", ephemeral=True)
                     return
@@ -894,29 +1005,14 @@ class Confessions(commands.Cog):
                     await interaction.followup.send("❌ Tu ne peux pas répondre à ta propre confession.", ephemeral=True)
                     return
 
-                # Création de la nouvelle entrée de réponse
-                new_id = _allocate_id_and_increment(data, self.replier.id)
+                # Création de la nouvelle entrée de réponse (liée au parent dans la même transaction)
                 now = datetime.now(timezone.utc).isoformat()
                 channel_id = interaction.channel.id if interaction.channel else None
-                resp_obj = {
-                    "id": new_id,
-                    "author_id": self.replier.id,
-                    "author_tag": str(self.replier),
-                    "text": self.response.value.strip(),
-                    "responses": [],
-                    "timestamp": now,
-                    "message_id": None,
-                    "channel_id": channel_id,
-                    "reply_to": self.confession_id
-                }
-                data["confessions"].append(resp_obj)
-                # Lien dans le parent
-                parent.setdefault("responses", []).append(new_id)
-                
-                # Sauvegarde avec vérification d'erreur
-                if not save_confessions(data):
+                resp_obj = await create_confession(self.replier, self.response.value.strip(), now, channel_id, reply_to=self.confession_id)
+                if not resp_obj:
                     await interaction.followup.send("❌ Erreur lors de la sauvegarde. Réessaie plus tard.", ephemeral=True)
                     return
+                new_id = resp_obj["id"]
 
                 # Construction de l'embed pour la réponse
                 embed = discord.Embed(
@@ -934,8 +1030,8 @@ class Confessions(commands.Cog):
                     view = self.cog.DynamicConfessView(self.cog, new_id, reply_enabled=False)
                     try:
                         msg = await channel.send(embed=embed, view=view)
-                        resp_obj["message_id"] = msg.id
-                        save_confessions(data)
+                        await update_confession(new_id, message_id=msg.id)
+                        await record_location(msg)
                     except Exception:
                         await interaction.followup.send("❌ Erreur lors de la publication dans le fil.", ephemeral=True)
                         return
@@ -950,7 +1046,9 @@ class Confessions(commands.Cog):
                     )
                     # notify original author by DM if possible
                     try:
-                        orig_user = await self.cog.bot.fetch_user(parent["author_id"])
+                        orig_user = await get_user_resolver().resolve(self.cog.bot, parent["author_id"])
+                        if orig_user is None:
+                            raise LookupError(parent["author_id"])
                         link = None
                         try:
                             link = f"https://discord.com/channels/{channel.guild.id}/{channel.id}"
@@ -964,22 +1062,15 @@ class Confessions(commands.Cog):
                         pass
 
                     # Journal d'action persistant (réponse dans thread)
-                    try:
-                        actions = load_actions()
-                        al = actions.get("actions", [])
-                        al.append({
-                            "type": "reply",
-                            "confession_id": int(self.confession_id),
-                            "reply_id": int(new_id),
-                            "author_id": int(self.replier.id),
-                            "author_tag": str(self.replier),
-                            "timestamp": now,
-                            "thread_id": int(channel.id) if isinstance(channel, discord.Thread) else None,
-                        })
-                        actions["actions"] = al
-                        save_actions(actions)
-                    except Exception:
-                        pass
+                    await record_action({
+                        "type": "reply",
+                        "confession_id": int(self.confession_id),
+                        "reply_id": int(new_id),
+                        "author_id": int(self.replier.id),
+                        "author_tag": str(self.replier),
+                        "timestamp": now,
+                        "thread_id": int(channel.id) if isinstance(channel, discord.Thread) else None,
+                    })
                 else:
                     try:
                         # not in a thread: find parent message by parent['message_id'] and create a thread
@@ -999,15 +1090,12 @@ class Confessions(commands.Cog):
                         thread = await parent_msg.create_thread(name=f"Réponses Confession #{self.confession_id}", auto_archive_duration=60)
                         view = self.cog.DynamicConfessView(self.cog, new_id, reply_enabled=False)
                         thread_msg = await thread.send(embed=embed, view=view)
-                        resp_obj["message_id"] = thread_msg.id
-                        save_confessions(data)
+                        await update_confession(new_id, message_id=thread_msg.id, channel_id=thread.id)
 
                         # Store thread id in parent for management (delete transcripts, etc.)
-                        try:
-                            parent["thread_id"] = thread.id
-                            save_confessions(data)
-                        except Exception:
-                            pass
+                        await update_confession(self.confession_id, thread_id=thread.id)
+                        await record_location(thread_msg)
+                        await record_location(parent_msg, thread_id=thread.id)
 
                         # remove buttons from original parent message (so no more replies there)
                         try:
@@ -1026,7 +1114,9 @@ class Confessions(commands.Cog):
 
                         # DM original author with link to thread
                         try:
-                            orig_user = await self.cog.bot.fetch_user(parent["author_id"])
+                            orig_user = await get_user_resolver().resolve(self.cog.bot, parent["author_id"])
+                            if orig_user is None:
+                                raise LookupError(parent["author_id"])
                             link = f"https://discord.com/channels/{parent_msg.guild.id}/{thread.id}"
                             dm_embed = discord.Embed(title="Tu as reçu une réponse !",
                                                      description=f"Ta confession #{self.confession_id} a reçu une réponse.\n[Voir le fil]({link})",
@@ -1036,22 +1126,15 @@ class Confessions(commands.Cog):
                             pass
 
                         # Journal d'action persistant (réponse créant thread)
-                        try:
-                            actions = load_actions()
-                            al = actions.get("actions", [])
-                            al.append({
-                                "type": "reply",
-                                "confession_id": int(self.confession_id),
-                                "reply_id": int(new_id),
-                                "author_id": int(self.replier.id),
-                                "author_tag": str(self.replier),
-                                "timestamp": now,
-                                "thread_id": int(thread.id),
-                            })
-                            actions["actions"] = al
-                            save_actions(actions)
-                        except Exception:
-                            pass
+                        await record_action({
+                            "type": "reply",
+                            "confession_id": int(self.confession_id),
+                            "reply_id": int(new_id),
+                            "author_id": int(self.replier.id),
+                            "author_tag": str(self.replier),
+                            "timestamp": now,
+                            "thread_id": int(thread.id),
+                        })
 
                     except Exception:
                         await interaction.followup.send("❌ Erreur lors de la création du fil.", ephemeral=True)
@@ -1067,7 +1150,7 @@ class Confessions(commands.Cog):
                         color=discord.Color.green(),
                         timestamp=datetime.now(timezone.utc)
                     )
-                    asyncio.create_task(self.cog.send_dm_safe(self.replier, dm_embed))
+                    await self.cog.send_dm_safe(self.replier, dm_embed)
                 
             except Exception as e:
                 logger.error(f"Erreur critique dans ReplyModal.on_submit: {e}")
@@ -1093,12 +1176,12 @@ class Confessions(commands.Cog):
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Vérification du rate limiting avant d'ouvrir le modal (sans consommer de quota)
-            can_post, time_left = check_rate_limit(interaction.user.id, increment=False)
+            can_post, time_left = check_rate_limit(interaction.user.id, increment=False, guild_id=interaction.guild_id)
             if not can_post:
                 minutes_left = max(1, time_left // 60)
                 embed = discord.Embed(
                     title="⏰ Limite atteinte",
-                    description=f"Tu as atteint la limite de {RATE_LIMIT_CONFESSIONS} confessions par heure.\nRéessaie dans {minutes_left} minute(s).",
+                    description=f"Tu as atteint la limite de {rate_limit_label(interaction.guild_id)}.\nRéessaie dans {minutes_left} minute(s).",
                     color=discord.Color.orange()
                 )
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1128,31 +1211,24 @@ class Confessions(commands.Cog):
         seconds = self._parse_duration_seconds(duration)
         if duration and seconds is None:
             return await interaction.response.send_message("❌ Durée invalide. Utilise p.ex. 10s, 5m, 2h, 1j.", ephemeral=True)
-        ok = self.add_ban(user.id, seconds)
+        ok = await self.add_ban(user.id, seconds)
         if not ok:
             return await interaction.response.send_message("❌ Erreur lors de l'enregistrement du ban.", ephemeral=True)
-        # DM notify (non bloquant)
+        # DM notify (mis en file, non bloquant)
         dm = discord.Embed(title="🚫 Bannissement - Confessions", description=f"Tu es banni du système de confessions.{f' Durée: {duration}' if seconds else ''}\nRaison: {reason or 'Aucune'}", color=discord.Color.red(), timestamp=datetime.now(timezone.utc))
-        asyncio.create_task(self.send_dm_safe(user, dm))
+        await self.send_dm_safe(user, dm)
         await interaction.response.send_message(f"✅ {user} banni du système de confessions{f' pour {duration}' if seconds else ''}.")
         await self.log_command("Ban Confession (slash)", f"{interaction.user} a banni {user} ({user.id}){f' pour {duration}' if seconds else ''}. Raison: {reason or 'Aucune'}", moderator=interaction.user, color=discord.Color.orange())
         # Journal d'action persistant
-        try:
-            actions = load_actions()
-            al = actions.get("actions", [])
-            al.append({
-                "type": "ban",
-                "target_id": int(user.id),
-                "moderator_id": int(interaction.user.id),
-                "moderator_tag": str(interaction.user),
-                "duration": seconds,
-                "reason": reason or "",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            })
-            actions["actions"] = al
-            save_actions(actions)
-        except Exception:
-            pass
+        await record_action({
+            "type": "ban",
+            "target_id": int(user.id),
+            "moderator_id": int(interaction.user.id),
+            "moderator_tag": str(interaction.user),
+            "duration": seconds,
+            "reason": reason or "",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
 
     @app_commands.command(name="confession_unban", description="Débannir un utilisateur du système de confessions")
     @app_commands.default_permissions(manage_messages=True)
@@ -1160,51 +1236,37 @@ class Confessions(commands.Cog):
     async def confession_unban(self, interaction: discord.Interaction, user: discord.User):
         if not interaction.user.guild_permissions.manage_messages and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("❌ Permission insuffisante.", ephemeral=True)
-        ok = self.remove_ban(user.id)
+        ok = await self.remove_ban(user.id)
         if not ok:
             return await interaction.response.send_message("❌ Erreur lors de la suppression du ban.", ephemeral=True)
         dm = discord.Embed(title="✅ Débannissement - Confessions", description="Tu peux de nouveau utiliser les confessions.", color=discord.Color.green(), timestamp=datetime.now(timezone.utc))
-        asyncio.create_task(self.send_dm_safe(user, dm))
+        await self.send_dm_safe(user, dm)
         await interaction.response.send_message(f"✅ {user} débanni du système de confessions.")
         await self.log_command("Unban Confession (slash)", f"{interaction.user} a débanni {user} ({user.id})", moderator=interaction.user, color=discord.Color.green())
         # Journal d'action persistant
-        try:
-            actions = load_actions()
-            al = actions.get("actions", [])
-            al.append({
-                "type": "unban",
-                "target_id": int(user.id),
-                "moderator_id": int(interaction.user.id),
-                "moderator_tag": str(interaction.user),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            })
-            actions["actions"] = al
-            save_actions(actions)
-        except Exception:
-            pass
+        await record_action({
+            "type": "unban",
+            "target_id": int(user.id),
+            "moderator_id": int(interaction.user.id),
+            "moderator_tag": str(interaction.user),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
 
     @app_commands.command(name="confession_bans", description="Lister les bannissements du système de confessions")
     @app_commands.default_permissions(manage_messages=True)
     async def confession_bans(self, interaction: discord.Interaction):
         if not interaction.user.guild_permissions.manage_messages and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("❌ Permission insuffisante.", ephemeral=True)
-        bans = load_bans()
         now = int(time.time())
-        entries = []
-        for e in bans.get("banned", []):
-            if isinstance(e, int):
-                entries.append((e, None))
-            else:
-                entries.append((e.get("user_id"), e.get("until")))
+        entries = _bans.entries()
         if not entries:
             return await interaction.response.send_message("Aucun utilisateur banni.", ephemeral=True)
+        # Résolution groupée : caches d'abord, puis requêtes en parallèle
+        users = await get_user_resolver().resolve_many(self.bot, [uid for uid, _ in entries])
         lines = []
         for uid, until in entries:
-            try:
-                user = await self.bot.fetch_user(uid)
-                name = str(user)
-            except Exception:
-                name = f"ID {uid}"
+            user = users.get(uid)
+            name = str(user) if user is not None else f"ID {uid}"
             if until:
                 remain = max(0, int(until) - now)
                 mins = remain // 60
@@ -1214,6 +1276,22 @@ class Confessions(commands.Cog):
         desc = "\n".join(lines)
         await interaction.response.send_message(embed=discord.Embed(title="🚫 Bannissements Confessions", description=desc[:4096], color=discord.Color.orange(), timestamp=datetime.now(timezone.utc)), ephemeral=True)
 
+    @app_commands.command(name="confession_quota", description="Régler le quota de confessions de ce serveur")
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.describe(limit="Confessions max par fenêtre (vide = défaut)", minutes="Durée de la fenêtre en minutes")
+    async def confession_quota(self, interaction: discord.Interaction, limit: Optional[int] = None, minutes: Optional[int] = 60):
+        if not interaction.guild or not (interaction.user.guild_permissions.manage_guild or interaction.user.guild_permissions.administrator):
+            return await interaction.response.send_message("❌ Permission insuffisante.", ephemeral=True)
+        if limit is None:
+            _rate_limiter.reset_quota(interaction.guild.id)
+        elif limit < 1 or not minutes or minutes < 1:
+            return await interaction.response.send_message("❌ Le quota et la durée doivent être positifs.", ephemeral=True)
+        else:
+            _rate_limiter.set_quota(interaction.guild.id, limit, minutes * 60)
+        await save_config(rate_limiter_snapshot())
+        await interaction.response.send_message(f"✅ Quota de ce serveur : {rate_limit_label(interaction.guild.id)}.", ephemeral=True)
+        await self.log_command("Quota Confessions (slash)", f"{interaction.user} a réglé le quota: {rate_limit_label(interaction.guild.id)}", moderator=interaction.user)
+
     # -------------------------
     # Admin slash: export journal d'actions (persistant)
     # -------------------------
@@ -1224,24 +1302,16 @@ class Confessions(commands.Cog):
         if not interaction.user.guild_permissions.manage_messages and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("❌ Permission insuffisante.", ephemeral=True)
         try:
-            data = load_actions()
-            actions = data.get("actions", [])
-            # tri par timestamp
-            def _key(a):
-                try:
-                    return a.get("timestamp") or ""
-                except Exception:
-                    return ""
-            actions = sorted(actions, key=_key, reverse=True)
-            total = len(actions)
+            journal = get_journal()
+            total = journal.count()
             if total == 0:
                 return await interaction.response.send_message("Aucune action enregistrée.", ephemeral=True)
 
+            # Lecture inverse en flux (hors de la boucle) : seules les entrées affichées sont lues
+            entries = await run_io(journal.latest, max(1, int(limit)) if limit else None)
             lines = []
             count = 0
-            for a in actions:
-                if limit and count >= max(1, int(limit)):
-                    break
+            for a in entries:
                 count += 1
                 t = a.get("type")
                 ts = a.get("timestamp", "")
@@ -1297,12 +1367,10 @@ class Confessions(commands.Cog):
             return await ctx.send("❌ Tu ne peux pas bannir un administrateur.")
         
         try:
-            bans = load_bans()
-            if member.id in bans.get("banned", []):
+            if self.is_banned(member.id):
                 return await ctx.send(f"⚠️ {member.mention} est déjà banni du système de confessions.")
             
-            bans.setdefault("banned", []).append(member.id)
-            if not save_bans(bans):
+            if not await self.add_ban(member.id):
                 return await ctx.send("❌ Erreur lors de la sauvegarde du bannissement.")
 
             # Notification par DM
@@ -1312,7 +1380,7 @@ class Confessions(commands.Cog):
                 color=discord.Color.red(),
                 timestamp=datetime.now(timezone.utc)
             )
-            asyncio.create_task(self.send_dm_safe(member, dm_embed))
+            await self.send_dm_safe(member, dm_embed)
 
             await ctx.send(f"✅ {member.mention} a été banni du système de confessions.")
             await self.log_command(
@@ -1334,12 +1402,10 @@ class Confessions(commands.Cog):
             return await ctx.send("❌ Tu n'as pas les permissions nécessaires pour utiliser cette commande.")
         
         try:
-            bans = load_bans()
-            if member.id not in bans.get("banned", []):
+            if not self.is_banned(member.id):
                 return await ctx.send(f"⚠️ {member.mention} n'était pas banni du système de confessions.")
             
-            bans["banned"].remove(member.id)
-            if not save_bans(bans):
+            if not await self.remove_ban(member.id):
                 return await ctx.send("❌ Erreur lors de la sauvegarde du débannissement.")
 
             # Notification par DM
@@ -1349,7 +1415,7 @@ class Confessions(commands.Cog):
                 color=discord.Color.green(),
                 timestamp=datetime.now(timezone.utc)
             )
-            asyncio.create_task(self.send_dm_safe(member, dm_embed))
+            await self.send_dm_safe(member, dm_embed)
 
             await ctx.send(f"✅ {member.mention} a été débanni du système de confessions.")
             await self.log_command(
@@ -1371,8 +1437,7 @@ class Confessions(commands.Cog):
             return await ctx.send("❌ Tu n'as pas les permissions nécessaires pour utiliser cette commande.")
         
         try:
-            bans = load_bans()
-            banned = bans.get("banned", [])
+            banned = [uid for uid, _ in _bans.entries()]
             
             if not banned:
                 embed = discord.Embed(
@@ -1384,16 +1449,14 @@ class Confessions(commands.Cog):
                 return await ctx.send(embed=embed)
             
             # Construction de la liste avec gestion des erreurs
+            users = await get_user_resolver().resolve_many(self.bot, banned)
             lines = []
             for uid in banned:
-                try:
-                    user = await self.bot.fetch_user(uid)
-                    lines.append(f"• {user} (`{uid}`)") 
-                except discord.NotFound:
-                    lines.append(f"• Utilisateur introuvable (`{uid}`)") 
-                except Exception as e:
-                    logger.warning(f"Erreur lors de la récupération de l'utilisateur {uid}: {e}")
-                    lines.append(f"• ID: `{uid}` (erreur de récupération)")
+                user = users.get(uid)
+                if user is not None:
+                    lines.append(f"• {user} (`{uid}`)")
+                else:
+                    lines.append(f"• Utilisateur introuvable (`{uid}`)")
             
             # Pagination si nécessaire
             description = "\n".join(lines)
@@ -1414,121 +1477,6 @@ class Confessions(commands.Cog):
             logger.error(f"Erreur lors de l'affichage de la liste des bannis: {e}")
             await ctx.send("❌ Une erreur s'est produite lors de la récupération de la liste.")
 
-    # -------------------------
-    # on_ready: re-register dynamic persistent views for every confession message
-    # -------------------------
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Recharge les vues persistantes au démarrage du bot avec optimisations."""
-        logger.info("Rechargement des vues persistantes pour les confessions...")
-        
-        try:
-            data = load_confessions()
-            confessions = data.get("confessions", [])
-            
-            if not confessions:
-                logger.info("Aucune confession trouvée, pas de vues à recharger.")
-                return
-            
-            count = 0
-            errors = 0
-            
-            # Optimisation: utilise channel_id si disponible
-            for conf in confessions:
-                msg_id = conf.get("message_id")
-                if not msg_id:
-                    continue
-                
-                try:
-                    found = False
-                    channel_id = conf.get("channel_id")
-                    
-                    # Essaie d'abord avec l'ID de canal stocké (plus rapide)
-                    if channel_id:
-                        try:
-                            channel = self.bot.get_channel(channel_id)
-                            if channel:
-                                msg = await channel.fetch_message(msg_id)
-                                reply_enabled = not isinstance(channel, discord.Thread)
-                                view = self.DynamicConfessView(self, conf["id"], reply_enabled=reply_enabled)
-                                self.bot.add_view(view)
-                                found = True
-                                count += 1
-                        except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-                            # Message supprimé ou permissions insuffisantes
-                            pass
-                        except Exception as e:
-                            logger.warning(f"Erreur lors de la récupération du message {msg_id} dans le canal {channel_id}: {e}")
-                    
-                    # Si pas trouvé avec l'ID de canal, recherche dans tous les canaux (fallback)
-                    if not found:
-                        for guild in self.bot.guilds:
-                            if found:
-                                break
-                            try:
-                                # Parcourt les salons texte puis leurs threads actifs
-                                for tchan in guild.text_channels:
-                                    if found:
-                                        break
-                                    # 1) tenter dans le salon texte
-                                    try:
-                                        msg = await tchan.fetch_message(msg_id)
-                                        reply_enabled = not isinstance(tchan, discord.Thread)
-                                        view = self.DynamicConfessView(self, conf["id"], reply_enabled=reply_enabled)
-                                        self.bot.add_view(view)
-
-                                        if not conf.get("channel_id"):
-                                            conf["channel_id"] = tchan.id
-                                            save_confessions(data)
-                                        found = True
-                                        count += 1
-                                        break
-                                    except (discord.NotFound, discord.Forbidden):
-                                        pass
-                                    except Exception:
-                                        pass
-
-                                    # 2) tenter dans les threads actifs de ce salon
-                                    try:
-                                        for th in getattr(tchan, "threads", []):
-                                            if found:
-                                                break
-                                            try:
-                                                msg = await th.fetch_message(msg_id)
-                                                reply_enabled = not isinstance(th, discord.Thread)
-                                                view = self.DynamicConfessView(self, conf["id"], reply_enabled=reply_enabled)
-                                                self.bot.add_view(view)
-
-                                                if not conf.get("channel_id"):
-                                                    conf["channel_id"] = th.id
-                                                    save_confessions(data)
-                                                found = True
-                                                count += 1
-                                                break
-                                            except (discord.NotFound, discord.Forbidden):
-                                                continue
-                                            except Exception:
-                                                continue
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                continue
-                    
-                    if not found:
-                        errors += 1
-                        
-                except Exception as e:
-                    logger.error(f"Erreur lors du traitement de la confession {conf.get('id', 'inconnue')}: {e}")
-                    errors += 1
-            
-            # Résumé du rechargement
-            logger.info(f"Rechargement terminé: {count} vues rechargées, {errors} erreurs")
-            if errors > 0:
-                logger.warning(f"{errors} confessions n'ont pas pu être rechargées (messages supprimés ou inaccessibles)")
-                
-        except Exception as e:
-            logger.error(f"Erreur critique lors du rechargement des vues: {e}")
-
 async def setup(bot):
     """Configure le cog Confessions."""
     try:
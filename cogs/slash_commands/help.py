@@ -21,6 +21,7 @@ COMMAND_REGISTRY: list[dict] = [
     {"type": "slash", "name": "confession_ban", "qname": "confession_ban", "category": "Confessions", "description": "Bannir un utilisateur du système de confessions.", "usage": "/confession_ban user [duration] [reason]", "permissions": "Gérer les messages"},
     {"type": "slash", "name": "confession_unban", "qname": "confession_unban", "category": "Confessions", "description": "Débannir un utilisateur du système de confessions.", "usage": "/confession_unban user", "permissions": "Gérer les messages"},
     {"type": "slash", "name": "confession_bans", "qname": "confession_bans", "category": "Confessions", "description": "Lister les bannissements du système de confessions.", "usage": "/confession_bans", "permissions": "Gérer les messages"},
+    {"type": "slash", "name": "confession_quota", "qname": "confession_quota", "category": "Confessions", "description": "Régler le quota de confessions du serveur.", "usage": "/confession_quota [limit] [minutes]", "permissions": "Gérer le serveur"},
 
     # Moderation (slash)
     {"type": "slash", "name": "ban", "qname": "ban", "category": "Modération", "description": "Bannir un membre.", "usage": "/ban member [reason]", "permissions": "Bannir des membres"},
@@ -36,6 +37,8 @@ COMMAND_REGISTRY: list[dict] = [
     {"type": "prefix", "name": "reboot", "qname": "reboot", "category": "Admin", "description": "Redémarrer le bot (owner/EXTRA_OWNER_IDS).", "usage": "+reboot", "permissions": "Propriétaire"},
     {"type": "prefix", "name": "cogs", "qname": "cogs", "category": "Admin", "description": "Lister les cogs chargés/non chargés.", "usage": "+cogs", "permissions": "Aucune (affichage)"},
     {"type": "prefix", "name": "reload", "qname": "reload", "category": "Admin", "description": "(Re)charger un cog.", "usage": "+reload <cog> (ex: slash_commands.info)", "permissions": "Propriétaire"},
+    {"type": "prefix", "name": "logs", "qname": "logs", "category": "Admin", "description": "Récupérer les derniers logs en mémoire.", "usage": "+logs [lignes]", "permissions": "Propriétaire"},
+    {"type": "prefix", "name": "sync", "qname": "sync", "category": "Admin", "description": "Forcer la synchronisation des commandes slash.", "usage": "+sync [global|ici|dev]", "permissions": "Propriétaire"},
 
     {"type": "prefix", "name": "avatar", "qname": "avatar", "category": "Utilitaires", "description": "Afficher l'avatar d'un membre.", "usage": "+avatar [membre]", "permissions": "Aucune"},
     {"type": "prefix", "name": "banner", "qname": "banner", "category": "Utilitaires", "description": "Afficher la bannière d'un membre (si disponible).", "usage": "+banner [membre]", "permissions": "Aucune"},
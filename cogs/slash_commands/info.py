@@ -5,6 +5,8 @@ from datetime import datetime, timezone
 from utils.embed_utils import brand_embed, add_kv_fields, format_platform
 from utils.uptime import format_uptime
 from utils.config import get_bot_config
+from utils.metrics import command_summary, error_summary, storage_summary
+from utils.user_cache import get_user_resolver
 
 class Info(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -38,6 +40,14 @@ class Info(commands.Cog):
             },
             inline=True,
         )
+        # Résumé du registre de métriques (depuis le démarrage)
+        for title, lines in (
+            ("Commandes (temps cumulé)", command_summary()),
+            ("Erreurs", error_summary()),
+            ("Stockage", storage_summary()),
+        ):
+            if lines:
+                emb.add_field(name=title, value="```" + "\n".join(lines)[:1000] + "```", inline=False)
         await interaction.response.send_message(embed=emb, ephemeral=bool(ephemeral))
 
     @app_commands.command(name="botinfo", description="Informations sur le bot")
@@ -69,14 +79,9 @@ class Info(commands.Cog):
             inline=False,
         )
         try:
-            owners = []
-            cfg_ids = self._cfg.get("EXTRA_OWNER_IDS", []) or []
-            for oid in cfg_ids:
-                try:
-                    user = await self.bot.fetch_user(int(oid))
-                    owners.append(str(user))
-                except Exception:
-                    owners.append(str(oid))
+            cfg_ids = [int(oid) for oid in self._cfg.get("EXTRA_OWNER_IDS", []) or []]
+            users = await get_user_resolver().resolve_many(self.bot, cfg_ids)
+            owners = [str(users.get(oid) or oid) for oid in cfg_ids]
             if owners:
                 emb.add_field(name="Propriétaires", value=", ".join(owners)[:1024], inline=False)
         except Exception:
@@ -3,6 +3,9 @@ from discord import app_commands
 from discord.ext import commands
 from datetime import timedelta, datetime, timezone
 from utils.config import get_bot_config
+from utils.dm_outbox import HIGH, PRE_SANCTION_WAIT, send_dm
+from utils.log_sink import send_log
+from utils.user_cache import get_user_resolver
 
 _BOT_CFG = get_bot_config()
 LOG_CHANNEL_ID = _BOT_CFG.get("COMMAND_LOG_CHANNEL_ID")
@@ -14,13 +17,14 @@ class ModerationSlash(commands.Cog):
     # ======================
     # Utils
     # ======================
-    async def dm_user(self, user: discord.User, title: str, description: str, color=discord.Color.blue()):
-        """Envoie un embed simple en DM au membre"""
+    async def dm_user(self, user: discord.User, title: str, description: str, color=discord.Color.blue(), before_sanction: bool = False):
+        """Envoie un embed simple en DM au membre (via la file des DM)"""
         embed = discord.Embed(title=title, description=description, color=color)
-        try:
-            await user.send(embed=embed)
-        except:
-            pass  # Si DM impossible, on ignore
+        if before_sanction:
+            # Le membre doit encore partager le serveur : attente courte et bornée
+            await send_dm(user, embed, priority=HIGH, wait=PRE_SANCTION_WAIT)
+        else:
+            await send_dm(user, embed)
 
     async def log_action(self, interaction: discord.Interaction, action: str, target: discord.User, reason: str = None):
         log_channel = interaction.guild.get_channel(LOG_CHANNEL_ID)
@@ -33,7 +37,7 @@ class ModerationSlash(commands.Cog):
             embed.add_field(name="Modérateur", value=f"{interaction.user} ({interaction.user.id})", inline=False)
             embed.add_field(name="Cible", value=f"{target} ({target.id})", inline=False)
             embed.add_field(name="Raison", value=reason or "Aucune raison fournie", inline=False)
-            await log_channel.send(embed=embed)
+            await send_log(log_channel.id, embed)
 
     # ======================
     # BAN / UNBAN
@@ -56,7 +60,8 @@ class ModerationSlash(commands.Cog):
             member,
             "🚫 Vous avez été banni",
             f"Raison : {reason or 'Aucune'}",
-            discord.Color.red()
+            discord.Color.red(),
+            before_sanction=True
         )
 
         try:
@@ -79,7 +84,12 @@ class ModerationSlash(commands.Cog):
         bot_perms = interaction.channel.permissions_for(interaction.guild.me)
         if not bot_perms.ban_members:
             return await interaction.response.send_message("❌ Je n'ai pas la permission de débannir ici.", ephemeral=True)
-        user = await self.bot.fetch_user(int(user_id))
+        try:
+            user = await get_user_resolver().resolve(self.bot, int(user_id))
+        except ValueError:
+            user = None
+        if user is None:
+            return await interaction.response.send_message("❌ Utilisateur introuvable.", ephemeral=True)
         try:
             await interaction.guild.unban(user, reason="Unban manuel")
         except discord.NotFound:
@@ -118,7 +128,8 @@ class ModerationSlash(commands.Cog):
             member,
             "👢 Vous avez été expulsé",
             f"Raison : {reason or 'Aucune'}",
-            discord.Color.orange()
+            discord.Color.orange(),
+            before_sanction=True
         )
 
         try:
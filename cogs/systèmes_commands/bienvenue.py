@@ -1,35 +1,44 @@
 import discord
 from discord.ext import commands
-import json
-import asyncio
 from datetime import datetime as dt, timezone
-from utils.config import get_bot_config, read_json, write_json
+from utils.config import get_bot_config
+from utils.delayed_actions import get_action_queue
+from utils.invite_tracker import InviteTracker
+from utils.log_sink import LOW, send_log
+from utils.warmup import get_warmup
+from utils.logger import get_logger
+from utils.persistence import read_json_async, write_json_async
 
 CONFIG_FILE = "welcome_config.json"
 _BOT_CFG = get_bot_config()
 LOG_CHANNEL_ID = _BOT_CFG.get("COMMAND_LOG_CHANNEL_ID")
 
+logger = get_logger(__name__)
+
 class WelcomeSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.config = self.load_config()
-        self.invites = {}
+        self.config = {"active": False, "channel_id": _BOT_CFG.get("WELCOME_CHANNEL_ID")}
+        self.invites = InviteTracker()
+
+    async def cog_load(self):
+        self.config = await self.load_config()
+        # Instantané des invitations au démarrage, un par serveur, en parallèle
+        get_warmup().register("invites", self.invites.snapshot, priority=50, rest_cost=1, per_guild=True)
+
+    def cog_unload(self):
+        get_warmup().unregister("invites")
 
     # Charger la config
-    def load_config(self):
+    async def load_config(self):
         default = {"active": False, "channel_id": _BOT_CFG.get("WELCOME_CHANNEL_ID")}
-        return read_json(CONFIG_FILE, default)
+        return await read_json_async(CONFIG_FILE, default)
 
     # Sauvegarder la config
-    def save_config(self):
-        ok = write_json(CONFIG_FILE, self.config)
+    async def save_config(self):
+        ok = await write_json_async(CONFIG_FILE, self.config)
         if not ok:
-            # fallback minimal to avoid silent failure
-            try:
-                with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                    json.dump(self.config, f, indent=4)
-            except Exception:
-                pass
+            logger.warning(f"Échec de sauvegarde de {CONFIG_FILE}")
 
     # Logs d’exécution de commande
     async def log_command(self, ctx):
@@ -43,17 +52,16 @@ class WelcomeSystem(commands.Cog):
             embed.add_field(name="Utilisateur", value=f"{ctx.author} ({ctx.author.id})", inline=False)
             embed.add_field(name="Commande", value=ctx.message.content, inline=False)
             embed.add_field(name="Salon", value=f"{ctx.channel} ({ctx.channel.id})", inline=False)
-            await log_channel.send(embed=embed)
+            await send_log(log_channel.id, embed, LOW)
 
     # Commande pour définir le salon de bienvenue
     @commands.command(name="c_welcome")
     @commands.has_permissions(administrator=True)
     async def set_welcome_channel(self, ctx, channel_id: int):
         self.config["channel_id"] = channel_id
-        self.save_config()
+        await self.save_config()
         msg = await ctx.send(f"✅ Salon de bienvenue défini sur <#{channel_id}>")
-        await asyncio.sleep(5)
-        await msg.delete()
+        await get_action_queue().delete_message_later(msg, 5)
         await self.log_command(ctx)
 
     # Commande pour activer
@@ -61,10 +69,9 @@ class WelcomeSystem(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def activate_welcome(self, ctx):
         self.config["active"] = True
-        self.save_config()
+        await self.save_config()
         msg = await ctx.send("✅ Système de bienvenue activé")
-        await asyncio.sleep(5)
-        await msg.delete()
+        await get_action_queue().delete_message_later(msg, 5)
         await self.log_command(ctx)
 
     # Commande pour désactiver
@@ -72,10 +79,9 @@ class WelcomeSystem(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def deactivate_welcome(self, ctx):
         self.config["active"] = False
-        self.save_config()
+        await self.save_config()
         msg = await ctx.send("🛑 Système de bienvenue désactivé")
-        await asyncio.sleep(5)
-        await msg.delete()
+        await get_action_queue().delete_message_later(msg, 5)
         await self.log_command(ctx)
 
     # Ignorer les erreurs de permission pour éviter les crashs
@@ -86,15 +92,21 @@ class WelcomeSystem(commands.Cog):
         if isinstance(error, commands.MissingPermissions):
             return  # Ne rien répondre si pas admin
 
-    # Stocker les invites au démarrage
     @commands.Cog.listener()
-    async def on_ready(self):
-        for guild in self.bot.guilds:
-            try:
-                self.invites[guild.id] = await guild.invites()
-            except Exception:
-                # Permissions manquantes ou API indisponible
-                self.invites[guild.id] = []
+    async def on_guild_join(self, guild):
+        await self.invites.snapshot(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.invites.drop(guild.id)
+
+    @commands.Cog.listener()
+    async def on_invite_create(self, invite):
+        self.invites.on_create(invite)
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite):
+        self.invites.on_delete(invite)
 
     # Détecter l’inviteur lors d’un join
     @commands.Cog.listener()
@@ -128,19 +140,13 @@ class WelcomeSystem(commands.Cog):
         import random
         title = random.choice(titles)
 
-        # Chercher qui a invité
+        # Chercher qui a invité (une seule récupération pour les joins rapprochés)
         inviter = "via un lien vanity"
-        try:
-            new_invites = await guild.invites()
-            old_invites = self.invites.get(guild.id, [])
-            for invite in new_invites:
-                old_invite = discord.utils.get(old_invites, code=invite.code)
-                if old_invite and invite.uses > old_invite.uses:
-                    inviter = f"invité par {invite.inviter}"
-                    break
-            self.invites[guild.id] = new_invites
-        except:
-            pass
+        inviters, certain = await self.invites.attribute(member)
+        if inviters:
+            # Attribution déduite d'une invitation disparue : présentée comme probable
+            prefix = "invité" if certain else "probablement invité"
+            inviter = f"{prefix} par {' ou '.join(inviters[:3])}"
 
         # Nombre de membres
         member_count = guild.member_count
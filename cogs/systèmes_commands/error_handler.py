@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from utils.cog_loader import get_cog_loader
+from utils.command_metrics import record_command_error
 from utils.logger import get_logger
 from datetime import datetime, timezone
 
@@ -18,6 +20,15 @@ class GlobalErrorHandler(commands.Cog):
         try:
             # Unwrap original
             err = getattr(error, "original", error)
+            record_command_error(ctx.command, err)
+
+            # Commande d'un cog différé pas encore chargé : on le charge et on relance
+            if isinstance(err, commands.CommandNotFound):
+                loader = get_cog_loader()
+                extension = loader.lazy_for_command(ctx.invoked_with) if loader else None
+                if extension and await loader.ensure_loaded(extension):
+                    await self.bot.invoke(await self.bot.get_context(ctx.message))
+                    return
 
             # Ignore if command has local error handler
             if hasattr(ctx.command, "on_error"):
@@ -66,6 +77,17 @@ async def setup(bot: commands.Bot):
     async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
         try:
             err = getattr(error, "original", error)
+            record_command_error(interaction.command, err, interaction)
+
+            # Slash d'un cog différé : Discord la connaît déjà, l'arbre pas encore
+            if isinstance(err, app_commands.CommandNotFound):
+                loader = get_cog_loader()
+                if loader and loader.pending:
+                    loader.start_lazy()  # tâche unique conservée par le chargeur
+                    await interaction.response.send_message(
+                        "⏳ Cette commande est en cours de chargement, réessaie dans quelques secondes.", ephemeral=True
+                    )
+                    return
 
             # Cooldown
             if isinstance(err, app_commands.CommandOnCooldown):
@@ -1,20 +1,35 @@
 # cogs/systèmes_commands/status.py
 import discord
 from discord.ext import commands
+from utils.logger import get_logger
+from utils.warmup import get_warmup
+
+logger = get_logger(__name__)
 
 class Status(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_ready(self):
+    async def cog_load(self):
+        get_warmup().register("presence", self.set_presence, priority=0)
+
+    def cog_unload(self):
+        get_warmup().unregister("presence")
+
+    async def set_presence(self):
         # Bots cannot set a separate "custom status" like user accounts; we encode the phrase in the activity name.
         activity = discord.Activity(
             type=discord.ActivityType.watching,
             name="Regarde Calbusto et Tokita"
         )
         await self.bot.change_presence(status=discord.Status.online, activity=activity)
-        print("[Status] Activité définie")
+        logger.info("Activité définie")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Reconnexions suivantes : le préchauffage ne tourne qu'une fois, on réapplique l'activité
+        if get_warmup().has_run:
+            await self.set_presence()
 
 async def setup(bot):
     await bot.add_cog(Status(bot))
\ No newline at end of file
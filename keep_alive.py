@@ -1,18 +1,164 @@
 # keep_alive.py
-from flask import Flask
-from threading import Thread
+"""Serveur HTTP de santé et de métriques, sur la boucle d'événements du bot.
+
+- `/`        : réponse statique (pings de maintien en vie)
+- `/healthz` : 200 si la gateway est connectée et que la boucle répond à temps
+- `/readyz`  : 200 une fois le préchauffage terminé
+- `/metrics` : métriques au format texte Prometheus
+
+Démarré dans setup_hook via aiohttp (déjà requis par discord.py) : aucun thread
+supplémentaire.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
 import os
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from discord.ext import commands
+
+from utils.dm_outbox import get_dm_outbox
+from utils.log_sink import get_log_sink
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+from utils.uptime import get_uptime
+from utils.user_cache import get_user_resolver
+from utils.warmup import get_warmup
+
+logger = get_logger(__name__)
+
+LAG_INTERVAL = 1.0
+MAX_LOOP_LAG = 2.0  # secondes de retard tolérées avant /healthz en échec
+
+
+class LoopLagMonitor:
+    """Mesure le retard de la boucle : écart entre le réveil prévu et le réveil réel."""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.monotonic() - expected)
+            self.max_lag = max(self.max_lag, self.lag)
+
+
+def _gauge(lines: List[str], name: str, value: float, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {value}")
+
+
+def _counters(lines: List[str], name: str, stats: Dict[str, int], label: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in stats.items():
+        lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+
+class HealthServer:
+    def __init__(self, bot: commands.Bot, host: str = "0.0.0.0", port: int = 8080):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.lag = LoopLagMonitor()
+        self._runner: Optional[web.AppRunner] = None
+
+    # ------ état ------
+    def gateway_connected(self) -> bool:
+        return not self.bot.is_closed() and self.bot.is_ready() and math.isfinite(self.bot.latency)
+
+    def render_metrics(self) -> str:
+        lines: List[str] = []
+        bot = self.bot
+        latency = bot.latency if math.isfinite(bot.latency) else -1
+        _gauge(lines, "tokibot_up", 1 if self.gateway_connected() else 0, "Gateway connectée")
+        _gauge(lines, "tokibot_gateway_latency_seconds", round(latency, 4), "Latence de la gateway")
+        _gauge(lines, "tokibot_loop_lag_seconds", round(self.lag.lag, 4), "Retard de la boucle d'événements")
+        _gauge(lines, "tokibot_loop_lag_max_seconds", round(self.lag.max_lag, 4), "Retard maximal observé")
+        uptime = get_uptime()
+        _gauge(lines, "tokibot_uptime_seconds", int(uptime.total_seconds()) if uptime else 0, "Temps depuis le premier on_ready")
+        _gauge(lines, "tokibot_guilds", len(bot.guilds), "Serveurs")
+        _gauge(lines, "tokibot_warmup_finished", 1 if get_warmup().finished else 0, "Préchauffage terminé")
+        outbox = get_dm_outbox()
+        _gauge(lines, "tokibot_dm_outbox_pending", outbox.pending, "DM en file")
+        _counters(lines, "tokibot_dm_outbox_total", outbox.stats, "result", "DM par issue")
+        try:
+            _counters(lines, "tokibot_log_sink_total", get_log_sink().stats, "event", "Embeds de log par issue")
+        except RuntimeError:
+            pass  # collecteur de logs pas encore démarré
+        _counters(lines, "tokibot_user_resolver_total", get_user_resolver().stats, "source", "Résolutions d'utilisateurs")
+        return "\n".join(lines) + "\n" + get_metrics().render()
+
+    # ------ routes ------
+    async def home(self, request: web.Request) -> web.Response:
+        return web.Response(text="Bot actif et en ligne !")
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        connected = self.gateway_connected()
+        lag_ok = self.lag.lag < MAX_LOOP_LAG
+        status = 200 if connected and lag_ok else 503
+        return web.json_response(
+            {"gateway": connected, "loop_lag": round(self.lag.lag, 4), "loop_ok": lag_ok}, status=status
+        )
+
+    async def readyz(self, request: web.Request) -> web.Response:
+        ready = get_warmup().finished
+        return web.json_response({"ready": ready}, status=200 if ready else 503)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render_metrics(), content_type="text/plain", charset="utf-8")
+
+    # ------ cycle de vie ------
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/", self.home)
+        app.router.add_get("/healthz", self.healthz)
+        app.router.add_get("/readyz", self.readyz)
+        app.router.add_get("/metrics", self.metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.lag.start()
+        logger.info(f"Serveur de santé à l'écoute sur {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        self.lag.stop()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_server: Optional[HealthServer] = None
 
-app = Flask('')
 
-@app.route('/')
-def home():
-    return "Bot actif et en ligne !"
+async def keep_alive(bot: commands.Bot) -> HealthServer:
+    """Démarre le serveur de santé sur la boucle du bot (à appeler dans setup_hook)."""
+    global _server
+    if _server is None:
+        _server = HealthServer(bot, port=int(os.environ.get("PORT", 8080)))
+        try:
+            await _server.start()
+        except OSError as e:
+            logger.error(f"Impossible de démarrer le serveur de santé: {e}")
+    return _server
 
-def run():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+def get_health_server() -> Optional[HealthServer]:
+    return _server
@@ -1,57 +1,75 @@
+import asyncio
 import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
-from colorama import Fore, Style, init
-from keep_alive import keep_alive
-from utils.logger import get_logger
-from utils.uptime import set_start
 
-keep_alive() 
-# Init colorama (pour Windows)
-init(autoreset=True)
-
-# Charger les variables d'environnement
+# Charger les variables d'environnement avant les modules du projet, qui lisent
+# leurs réglages (TOKIBOT_LOG_*) à l'import : d'où les noqa E402
 load_dotenv()
+
+from keep_alive import keep_alive  # noqa: E402
+from utils.cog_loader import create_cog_loader  # noqa: E402
+from utils.command_metrics import InstrumentedTree, install_command_metrics  # noqa: E402
+from utils.config import flush as flush_json_cache  # noqa: E402
+from utils.config import get_bot_config  # noqa: E402
+from utils.delayed_actions import start_action_queue  # noqa: E402
+from utils.dm_outbox import get_dm_outbox  # noqa: E402
+from utils.log_sink import start_log_sink  # noqa: E402
+from utils.logger import get_logger  # noqa: E402
+from utils.tree_sync import sync_tree  # noqa: E402
+from utils.uptime import set_start  # noqa: E402
+from utils.warmup import get_warmup  # noqa: E402
+
 TOKEN = os.getenv("DISCORD_TOKEN")
 logger = get_logger(__name__)
+# Les logs de discord.py passent par la même file (voir utils/logger.py)
+get_logger("discord")
 
 # Définir les intents
 intents = discord.Intents.all()
 
 # Créer le bot
 allowed = discord.AllowedMentions(everyone=False, roles=False, users=True, replied_user=False)
-bot = commands.Bot(command_prefix="+", intents=intents, help_command=None, allowed_mentions=allowed)
+bot = commands.Bot(
+    command_prefix="+",
+    intents=intents,
+    help_command=None,
+    allowed_mentions=allowed,
+    tree_cls=InstrumentedTree,
+)
+
+async def sync_commands():
+    # Sautée si l'empreinte de l'arbre n'a pas changé depuis la dernière synchronisation
+    await sync_tree(bot)
 
-# Fonction récursive pour charger tous les cogs
-async def load_cogs(bot, path="./cogs", parent="cogs"):
-    for entry in os.listdir(path):
-        full_path = os.path.join(path, entry)
-        if os.path.isdir(full_path):
-            # Si c'est un dossier, on l'appelle récursivement
-            await load_cogs(bot, full_path, f"{parent}.{entry}")
-        elif entry.endswith(".py"):
-            cog_name = entry[:-3]
-            full_cog_path = f"{parent}.{cog_name}"
-            try:
-                await bot.load_extension(full_cog_path)
-                # Afficher le nombre de commandes dans le cog
-                cog_instance = bot.get_cog(cog_name.capitalize())
-                nb_commands = len(cog_instance.get_commands()) if cog_instance else "?"
-                print(f"{Fore.GREEN}[COG] ✅ '{full_cog_path}' chargé avec succès ({nb_commands} commandes){Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}[COG] ❌ Erreur lors du chargement de '{full_cog_path}' : {e}{Style.RESET_ALL}")
+async def load_lazy_cogs():
+    # Tâche partagée avec error_handler ; elle resynchronise l'arbre une fois les cogs chargés
+    await create_cog_loader(bot).start_lazy()
+
+def warmup_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Échec du préchauffage", exc_info=task.exception())
 
 @bot.event
 async def setup_hook():
-    await load_cogs(bot)
-
-    try:
-        synced = await bot.tree.sync()  # Synchronisation globale
-        print(f"{Fore.MAGENTA}[SYNC] ✅ {len(synced)} commandes synchronisées avec Discord{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}[SYNC] ❌ Erreur lors de la synchronisation des commandes : {e}{Style.RESET_ALL}")
-        logger.exception("Erreur lors de la synchronisation des commandes")
+    # Serveur de santé/métriques sur la boucle du bot (remplace le thread Flask)
+    await keep_alive(bot)
+    # Latence, erreurs et cooldowns de chaque commande (voir utils/command_metrics.py)
+    install_command_metrics(bot)
+    # File d'actions différées partagée (avant les cogs, qui y enregistrent leurs handlers)
+    await start_action_queue(bot)
+    # Envoi groupé des embeds de log (salons admin/commandes/signalements)
+    start_log_sink(bot, get_bot_config().get("LOG_WEBHOOKS"))
+    # Workers d'envoi des DM (les commandes n'attendent plus les MP)
+    get_dm_outbox().start()
+    # Cogs du manifeste config/cogs.json ; les cogs différés se chargent après on_ready
+    loader = create_cog_loader(bot)
+    await loader.load_eager()
+    if loader.pending:
+        get_warmup().register("cogs_lazy", load_lazy_cogs, priority=10)
+    else:
+        await sync_commands()
 
 # Quand le bot est prêt
 @bot.event
@@ -61,17 +79,29 @@ async def on_ready():
         set_start()
     except Exception:
         pass
-    print(f"{Fore.CYAN}🤖 Bot connecté en tant que {bot.user}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}🔹 Commandes préfixées : {len(bot.commands)}{Style.RESET_ALL}")
+    logger.info(f"🤖 Bot connecté en tant que {bot.user}")
+    logger.info(f"🔹 Commandes préfixées : {len(bot.commands)}")
     try:
         slash_count = len(bot.tree.get_commands())  # discord.py >=2.x
     except Exception:
         slash_count = 0
-    print(f"{Fore.CYAN}🔹 Commandes slash : {slash_count}{Style.RESET_ALL}")
+    logger.info(f"🔹 Commandes slash : {slash_count}")
+    # Tâches de préchauffage des cogs (une seule fois, sans bloquer on_ready) ; la référence
+    # empêche le ramasse-miettes de collecter la tâche en cours de route
+    if not get_warmup().has_run:
+        bot._warmup_task = asyncio.create_task(get_warmup().run(bot))
+        bot._warmup_task.add_done_callback(warmup_done)
 
 # Lancer le bot
 if not TOKEN or not TOKEN.strip():
-    logger.error("DISCORD_TOKEN manquant dans l'environnement. Ajoutez-le au fichier .env sous la clé DISCORD_TOKEN.")
+    logger.error(
+        "DISCORD_TOKEN manquant dans l'environnement. "
+        "Ajoutez-le au fichier .env sous la clé DISCORD_TOKEN."
+    )
     raise SystemExit(1)
 
-bot.run(TOKEN)
\ No newline at end of file
+try:
+    bot.run(TOKEN, log_handler=None)
+finally:
+    # Écrit les documents JSON encore en attente dans le cache write-behind
+    flush_json_cache()
@@ -0,0 +1,71 @@
+"""Banc d'essai des codecs de persistance (utils/codec.py).
+
+Usage : python -m scripts.bench_codecs [nombre_de_confessions] [répétitions]
+Construit un document au format confessions.json (100 000 confessions par défaut)
+et affiche, pour chaque codec disponible, le temps d'encodage, de décodage et la taille.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils import codec
+
+
+def build_fixture(count: int) -> dict:
+    rng = random.Random(42)
+    words = ["je", "tu", "confesse", "jamais", "toujours", "serveur", "discord", "secret", "😅", "café"]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    confessions = []
+    user_counts = {}
+    for i in range(1, count + 1):
+        author = rng.randrange(10**17, 10**18)
+        user_counts[str(author)] = user_counts.get(str(author), 0) + 1
+        confessions.append({
+            "id": i,
+            "author_id": author,
+            "author_tag": f"user{author % 10000}",
+            "text": " ".join(rng.choice(words) for _ in range(rng.randint(5, 60))),
+            "timestamp": (start + timedelta(seconds=i * 37)).isoformat(),
+            "message_id": rng.randrange(10**18, 2 * 10**18),
+            "channel_id": 1362060484085547018,
+            "thread_id": rng.randrange(10**18, 2 * 10**18) if i % 3 == 0 else None,
+            "reply_to": rng.randint(1, i - 1) if i > 1 and i % 5 == 0 else None,
+            "responses": [],
+        })
+    return {
+        "confessions": confessions,
+        "message_channels": {str(c["message_id"]): c["channel_id"] for c in confessions},
+        "next_id": count + 1,
+        "user_counts": user_counts,
+        "total_count": count,
+    }
+
+
+def bench(name: str, doc: dict, repeat: int) -> tuple:
+    c = codec.get_codec(name)
+    enc = dec = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        payload = c.encode(doc)
+        t1 = time.perf_counter()
+        codec.decode(payload)
+        t2 = time.perf_counter()
+        enc, dec = min(enc, t1 - t0), min(dec, t2 - t1)
+    return enc, dec, len(payload)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    doc = build_fixture(count)
+    print(f"Fixture: {count} confessions, meilleur temps sur {repeat} essai(s)")
+    print(f"orjson: {'oui' if codec.orjson else 'non'} | msgpack: {'oui' if codec.msgpack else 'non'}")
+    print(f"{'codec':<14}{'encode (ms)':>14}{'decode (ms)':>14}{'taille (Mo)':>14}")
+    for name in codec.available_codecs():
+        enc, dec, size = bench(name, doc, repeat)
+        print(f"{name:<14}{enc * 1000:>14.1f}{dec * 1000:>14.1f}{size / 1_048_576:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Cache des bannissements par serveur.
+
+La liste des bans d'un serveur est téléchargée une seule fois, à la première
+recherche, puis tenue à jour par on_member_ban / on_member_unban. Recherche par
+id ou par nom (casefold) sans nouvelle requête.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Set, Tuple, Union
+
+import discord
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _names(user: discord.abc.User) -> Set[str]:
+    return {n.casefold() for n in (user.name, getattr(user, "global_name", None)) if n}
+
+
+class GuildBanCache:
+    def __init__(self):
+        self._bans: Dict[int, Dict[int, discord.abc.User]] = {}
+        self._by_name: Dict[int, Dict[str, Set[int]]] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        # Événements reçus pendant un téléchargement, rejoués une fois la liste installée
+        self._pending: Dict[int, List[Tuple[str, Union[discord.abc.User, int]]]] = {}
+
+    def is_loaded(self, guild_id: int) -> bool:
+        return guild_id in self._bans
+
+    async def ensure(self, guild: discord.Guild) -> None:
+        """Charge les bans du serveur si nécessaire.
+        Un seul téléchargement, même en cas d'appels simultanés.
+        """
+        if guild.id in self._bans:
+            return
+        task = self._loading.get(guild.id)
+        if task is None:
+            task = self._loading[guild.id] = asyncio.create_task(self._load(guild))
+            task.add_done_callback(lambda _: self._loading.pop(guild.id, None))
+        await asyncio.shield(task)
+
+    async def _load(self, guild: discord.Guild) -> None:
+        self._pending[guild.id] = []
+        try:
+            users = [entry.user async for entry in guild.bans(limit=None)]
+        except BaseException:
+            self._pending.pop(guild.id, None)
+            raise
+        events = self._pending.pop(guild.id, None)
+        if events is None:
+            return  # serveur quitté pendant le téléchargement
+        self._bans[guild.id] = {}
+        self._by_name[guild.id] = {}
+        for user in users:
+            self.add(guild.id, user)
+        for kind, value in events:
+            if kind == "add":
+                self.add(guild.id, value)
+            else:
+                self.remove(guild.id, value)
+        logger.info(f"Cache des bans chargé pour {guild.name} ({guild.id}): {len(users)} ban(s)")
+
+    def drop(self, guild_id: int) -> None:
+        self._bans.pop(guild_id, None)
+        self._pending.pop(guild_id, None)
+        self._by_name.pop(guild_id, None)
+
+    # ------ mises à jour (événements) ------
+    def add(self, guild_id: int, user: discord.abc.User) -> None:
+        bans = self._bans.get(guild_id)
+        if bans is None:
+            if guild_id in self._pending:
+                self._pending[guild_id].append(("add", user))
+            return  # pas encore chargé : le téléchargement initial l'inclura
+        self.remove(guild_id, user.id)
+        bans[user.id] = user
+        for name in _names(user):
+            self._by_name[guild_id].setdefault(name, set()).add(user.id)
+
+    def remove(self, guild_id: int, user_id: int) -> None:
+        bans = self._bans.get(guild_id)
+        if bans is None and guild_id in self._pending:
+            self._pending[guild_id].append(("remove", user_id))
+            return
+        user = bans.pop(user_id, None) if bans is not None else None
+        if user is None:
+            return
+        by_name = self._by_name[guild_id]
+        for name in _names(user):
+            ids = by_name.get(name)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del by_name[name]
+
+    # ------ recherche ------
+    async def find(self, guild: discord.Guild, query: str) -> List[discord.abc.User]:
+        """Utilisateurs bannis correspondant à un id ou à un nom exact (plusieurs si ambigu)."""
+        await self.ensure(guild)
+        bans = self._bans[guild.id]
+        try:
+            user = bans.get(int(query))
+            if user is not None:
+                return [user]
+        except ValueError:
+            pass
+        ids = self._by_name[guild.id].get(query.casefold(), ())
+        return [bans[i] for i in sorted(ids)]
+
+    async def count(self, guild: discord.Guild) -> int:
+        await self.ensure(guild)
+        return len(self._bans[guild.id])
+
+
+_cache = GuildBanCache()
+
+
+def get_ban_cache() -> GuildBanCache:
+    return _cache
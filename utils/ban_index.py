@@ -0,0 +1,94 @@
+"""Index des bannissements avec expiration.
+
+Appartenance en O(1) via un dictionnaire user_id -> until, et tas-min sur
+`until` pour retirer les bans expirés par lots, sans parcourir toute la liste.
+Le document persistant garde le format {"banned": [{"user_id", "until"}]}.
+"""
+from __future__ import annotations
+
+import heapq
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class BanIndex:
+    """Bannissements normalisés : un ban est (user_id, until epoch ou None = indéfini)."""
+
+    def __init__(self):
+        self._until: Dict[int, Optional[int]] = {}
+        # (until, user_id) ; les entrées périmées (unban, re-ban) sont ignorées au dépilement
+        self._heap: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.is_banned(user_id)
+
+    # ------ chargement ------
+    def load(self, data: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Remplace l'index par le contenu de confession_bans.json (anciens et nouveaux formats).
+        Retourne True si le document doit être réécrit (entrées legacy ou expirées).
+        """
+        self._until.clear()
+        self._heap.clear()
+        rewrite = False
+        for entry in data.get("banned", []) if isinstance(data, dict) else []:
+            if isinstance(entry, int):
+                # Ancien format : ban indéfini sous forme d'entier
+                self.ban(entry, None)
+                rewrite = True
+                continue
+            try:
+                uid = int(entry["user_id"])
+                until = entry.get("until")
+                self.ban(uid, int(until) if until is not None else None)
+            except (KeyError, TypeError, ValueError):
+                rewrite = True
+        if self.purge_expired(now):
+            rewrite = True
+        return rewrite
+
+    def to_document(self) -> Dict[str, Any]:
+        return {"banned": [{"user_id": uid, "until": until} for uid, until in self.entries()]}
+
+    # ------ mutations ------
+    def ban(self, user_id: int, until: Optional[int] = None) -> None:
+        """Ajoute ou remplace le ban d'un utilisateur."""
+        self._until[int(user_id)] = until
+        if until is not None:
+            heapq.heappush(self._heap, (int(until), int(user_id)))
+
+    def unban(self, user_id: int) -> bool:
+        """Retire le ban. Retourne False si l'utilisateur n'était pas banni."""
+        return self._until.pop(int(user_id), _MISSING) is not _MISSING
+
+    def purge_expired(self, now: Optional[float] = None) -> List[int]:
+        """Retire tous les bans arrivés à échéance. Retourne les user_id retirés."""
+        now = time.time() if now is None else now
+        removed = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            until, uid = heapq.heappop(heap)
+            if self._until.get(uid, _MISSING) == until:
+                del self._until[uid]
+                removed.append(uid)
+        return removed
+
+    # ------ lecture ------
+    def is_banned(self, user_id: int, now: Optional[float] = None) -> bool:
+        if self._heap:
+            self.purge_expired(now)
+        return int(user_id) in self._until
+
+    def until(self, user_id: int) -> Optional[int]:
+        return self._until.get(int(user_id))
+
+    def entries(self) -> List[Tuple[int, Optional[int]]]:
+        """Bans actifs (user_id, until), dans l'ordre d'ajout."""
+        if self._heap:
+            self.purge_expired()
+        return list(self._until.items())
+
+
+_MISSING = object()
@@ -0,0 +1,152 @@
+"""Codecs de sérialisation pour l'état persistant.
+
+- "json"         : JSON indenté (ancien format, lisible, le plus lent et le plus gros)
+- "json-compact" : JSON sans indentation, via orjson s'il est installé (défaut)
+- "msgpack"      : binaire, si le paquet msgpack est installé
+
+Les formats JSON se reconnaissent à leur premier caractère ; les formats
+binaires commencent par un en-tête `\\x00TKB:<nom>\\n`. La lecture détecte donc
+le codec toute seule : un fichier écrit avec un ancien codec reste lisible.
+Le codec d'écriture se choisit avec la variable d'environnement
+TOKIBOT_STATE_CODEC ou set_default_codec().
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optionnel
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optionnel
+    msgpack = None
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_HEADER_PREFIX = b"\x00TKB:"
+DEFAULT_CODEC = "json-compact"
+
+
+class Codec:
+    """Couple encode/décode ; `binary` indique si un en-tête est écrit devant les données."""
+
+    def __init__(
+        self,
+        name: str,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        binary: bool = False,
+    ):
+        self.name = name
+        self.binary = binary
+        self._encode = encode
+        self._decode = decode
+
+    @property
+    def header(self) -> bytes:
+        return _HEADER_PREFIX + self.name.encode("ascii") + b"\n" if self.binary else b""
+
+    def encode(self, obj: Any) -> bytes:
+        return self.header + self._encode(obj)
+
+    def decode(self, data: bytes) -> Any:
+        return self._decode(data[len(self.header):])
+
+
+def _json_indent_encode(obj: Any) -> bytes:
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _json_compact_encode(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            # OPT_NON_STR_KEYS : clés int converties en texte, comme le module json
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # entier hors 64 bits, type exotique... on retombe sur json
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_decode(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def _msgpack_encode(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _msgpack_decode(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_CODECS: Dict[str, Codec] = {
+    "json": Codec("json", _json_indent_encode, _json_decode),
+    "json-compact": Codec("json-compact", _json_compact_encode, _json_decode),
+}
+if msgpack is not None:
+    _CODECS["msgpack"] = Codec("msgpack", _msgpack_encode, _msgpack_decode, binary=True)
+
+# Résolu au premier usage (et non à l'import) : le .env doit déjà être chargé
+_default_name: Optional[str] = None
+
+
+def available_codecs() -> List[str]:
+    return list(_CODECS)
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Codec `name`, ou le codec d'écriture par défaut. Retombe sur json-compact si indisponible."""
+    name = name or default_codec_name()
+    codec = _CODECS.get(name)
+    if codec is None:
+        logger.warning(f"Codec '{name}' indisponible, utilisation de {DEFAULT_CODEC}")
+        codec = _CODECS[DEFAULT_CODEC]
+    return codec
+
+
+def default_codec_name() -> str:
+    global _default_name
+    if _default_name is None:
+        _default_name = os.getenv("TOKIBOT_STATE_CODEC", DEFAULT_CODEC)
+    return _default_name
+
+
+def set_default_codec(name: str) -> None:
+    global _default_name
+    if name not in _CODECS:
+        raise ValueError(f"Codec inconnu ou non installé: {name}")
+    _default_name = name
+
+
+def detect(data: bytes) -> str:
+    """Nom du codec qui a produit `data`.
+    JSON : le format compact n'a jamais de saut de ligne (ils sont échappés dans les
+    chaînes), le format indenté en a dès que le document n'est pas vide.
+    """
+    if data.startswith(_HEADER_PREFIX):
+        end = data.find(b"\n", len(_HEADER_PREFIX))
+        if end == -1:
+            raise ValueError("En-tête de codec tronqué")
+        return data[len(_HEADER_PREFIX):end].decode("ascii")
+    return "json" if b"\n" in data.strip() else "json-compact"
+
+
+def encode(obj: Any, codec: Optional[str] = None) -> bytes:
+    return get_codec(codec).encode(obj)
+
+
+def decode(data: bytes) -> Any:
+    name = detect(data)
+    codec = _CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"Fichier écrit avec le codec '{name}', non installé ici")
+    return codec.decode(data)
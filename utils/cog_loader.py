@@ -0,0 +1,225 @@
+"""Chargement des cogs depuis un manifeste (config/cogs.json).
+
+Chaque entrée : {"name": "cogs.x.y", "lazy": false, "commands": [...]}.
+- les extensions ordinaires sont chargées dans setup_hook, dans l'ordre du
+  manifeste ;
+- les extensions `lazy` sont chargées après le premier on_ready (tâche de
+  préchauffage), ou plus tôt si une de leurs commandes préfixées (`commands`)
+  ou slash est utilisée avant.
+Pour chaque extension on mesure le temps d'import et le temps de setup
+(add_cog, cog_load compris) ; les plus lentes sont journalisées.
+
+Un cog qui enregistre des vues ou DynamicItem persistants ne doit pas être
+`lazy` : avant son chargement, les clics sur ses boutons existants échouent.
+
+Sans manifeste, toutes les extensions de ./cogs sont chargées immédiatement.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from discord.ext import commands
+
+from utils.logger import get_logger
+from utils.tree_sync import sync_tree
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = os.path.join("config", "cogs.json")
+REPORT_SLOWEST = 5
+
+
+class ExtensionEntry:
+    def __init__(self, name: str, lazy: bool = False, triggers: Optional[List[str]] = None):
+        self.name = name
+        self.lazy = lazy
+        self.triggers = [t.lower() for t in (triggers or [])]
+        self.status = "en attente"
+        self.import_time = 0.0
+        self.setup_time = 0.0
+        self.commands = 0
+        self.error: Optional[str] = None
+
+    @property
+    def total_time(self) -> float:
+        return self.import_time + self.setup_time
+
+
+def _discover(path: str = "./cogs", parent: str = "cogs") -> List[ExtensionEntry]:
+    entries = []
+    for entry in sorted(os.listdir(path)):
+        full_path = os.path.join(path, entry)
+        if os.path.isdir(full_path):
+            if not entry.startswith("__"):
+                entries.extend(_discover(full_path, f"{parent}.{entry}"))
+        elif entry.endswith(".py"):
+            entries.append(ExtensionEntry(f"{parent}.{entry[:-3]}"))
+    return entries
+
+
+def read_manifest(path: str = MANIFEST_FILE) -> List[ExtensionEntry]:
+    if not os.path.exists(path):
+        logger.warning(f"Manifeste {path} absent : chargement de toutes les extensions de ./cogs")
+        return _discover()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        ExtensionEntry(e["name"], bool(e.get("lazy", False)), e.get("commands"))
+        for e in data.get("extensions", [])
+    ]
+
+
+class CogLoader:
+    def __init__(self, bot: commands.Bot, manifest: str = MANIFEST_FILE):
+        self.bot = bot
+        self.entries: Dict[str, ExtensionEntry] = {e.name: e for e in read_manifest(manifest)}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._lazy_task: Optional[asyncio.Task] = None
+        # Un chargement à la fois : add_cog est instrumenté pendant le chargement
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> List[str]:
+        """Extensions différées pas encore chargées."""
+        loaded = self.bot.extensions
+        return [e.name for e in self.entries.values() if e.lazy and e.name not in loaded]
+
+    async def _load(self, entry: ExtensionEntry) -> bool:
+        async with self._lock:
+            if entry.name in self.bot.extensions:
+                return True
+            return await self._load_locked(entry)
+
+    async def _load_locked(self, entry: ExtensionEntry) -> bool:
+        # Le setup appelle add_cog (et donc cog_load) : le temps passé dedans est le
+        # temps de setup, le reste de load_extension est l'import du module.
+        original = self.bot.add_cog
+        cogs: List[commands.Cog] = []
+        setup_time = 0.0
+
+        async def timed_add_cog(cog, *args, **kwargs):
+            nonlocal setup_time
+            t0 = time.perf_counter()
+            try:
+                return await original(cog, *args, **kwargs)
+            finally:
+                setup_time += time.perf_counter() - t0
+                cogs.append(cog)
+
+        self.bot.add_cog = timed_add_cog
+        t0 = time.perf_counter()
+        try:
+            await self.bot.load_extension(entry.name)
+            entry.status = "ok"
+        except Exception as e:
+            entry.status = "échec"
+            entry.error = str(e)
+            logger.error(f"[COG] ❌ Erreur lors du chargement de '{entry.name}' : {e}")
+        finally:
+            del self.bot.add_cog  # retire l'attribut d'instance, la méthode de classe reprend
+            total = time.perf_counter() - t0
+        entry.setup_time = setup_time
+        entry.import_time = max(0.0, total - setup_time)
+        entry.commands = sum(len(c.get_commands()) + len(c.get_app_commands()) for c in cogs)
+        if entry.status == "ok":
+            lazy = " (différé)" if entry.lazy else ""
+            logger.info(
+                f"[COG] ✅ '{entry.name}' chargé{lazy} ({entry.commands} commandes, "
+                f"import {entry.import_time * 1000:.0f} ms, setup {entry.setup_time * 1000:.0f} ms)"
+            )
+        return entry.status == "ok"
+
+    async def ensure_loaded(self, name: str) -> bool:
+        """Charge une extension différée (un seul chargement même en cas d'appels simultanés)."""
+        if name in self.bot.extensions:
+            return True
+        task = self._loading.get(name)
+        if task is None:
+            task = self._loading[name] = asyncio.create_task(self._load(self.entries[name]))
+            task.add_done_callback(lambda _: self._loading.pop(name, None))
+        return await asyncio.shield(task)
+
+    async def load_eager(self) -> None:
+        start = time.perf_counter()
+        for entry in self.entries.values():
+            if not entry.lazy:
+                await self._load(entry)
+        self._report(time.perf_counter() - start, lazy=False)
+
+    async def load_lazy(self) -> None:
+        if not self.pending:
+            return
+        start = time.perf_counter()
+        for name in self.pending:
+            await self.ensure_loaded(name)
+        self._report(time.perf_counter() - start, lazy=True)
+
+    def start_lazy(self) -> asyncio.Task:
+        """Charge les cogs différés puis resynchronise l'arbre, en tâche de fond.
+        Une seule tâche en cours partagée par tous les appelants ; après un échec,
+        l'appel suivant relance le chargement des extensions restantes.
+        """
+        if self._lazy_task is None or self._lazy_task.done():
+            self._lazy_task = asyncio.create_task(self._run_lazy())
+            self._lazy_task.add_done_callback(self._lazy_done)
+        return self._lazy_task
+
+    async def _run_lazy(self) -> None:
+        await self.load_lazy()
+        if self.pending:
+            logger.error(
+                f"[COG] ❌ Extension(s) différée(s) non chargée(s) : {', '.join(self.pending)}"
+            )
+        # Sans synchronisation, les commandes slash des cogs différés manqueraient à Discord
+        await sync_tree(self.bot)
+
+    @staticmethod
+    def _lazy_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "[COG] ❌ Échec du chargement des cogs différés", exc_info=task.exception()
+            )
+
+    def lazy_for_command(self, command_name: Optional[str]) -> Optional[str]:
+        """Extension différée non chargée qui fournit la commande préfixée `command_name`."""
+        if not command_name:
+            return None
+        key = command_name.lower()
+        for name in self.pending:
+            if key in self.entries[name].triggers:
+                return name
+        return None
+
+    def _report(self, elapsed: float, lazy: bool) -> None:
+        done = [e for e in self.entries.values() if e.lazy == lazy and e.status != "en attente"]
+        if not done:
+            return
+        slowest = sorted(done, key=lambda e: e.total_time, reverse=True)[:REPORT_SLOWEST]
+        kind = "différées" if lazy else "au démarrage"
+        lines = [
+            f"{len(done)} extension(s) {kind} chargée(s) en {elapsed:.2f}s ; les plus lentes :"
+        ]
+        for e in slowest:
+            lines.append(
+                f"  {e.name:<40} {e.total_time * 1000:7.0f} ms "
+                f"(import {e.import_time * 1000:.0f}, setup {e.setup_time * 1000:.0f}) {e.status}"
+            )
+        logger.info("\n".join(lines))
+
+
+_loader: Optional[CogLoader] = None
+
+
+def create_cog_loader(bot: commands.Bot) -> CogLoader:
+    global _loader
+    if _loader is None:
+        _loader = CogLoader(bot)
+    return _loader
+
+
+def get_cog_loader() -> Optional[CogLoader]:
+    return _loader
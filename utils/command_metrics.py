@@ -0,0 +1,90 @@
+"""Mesure du cycle de vie des commandes (préfixe, slash, hybrides).
+
+- préfixe et hybrides (y compris appelées en slash) : hooks globaux
+  before_invoke / after_invoke du bot ;
+- slash pures et menus contextuels : l'arbre note l'heure de début dans
+  `interaction.extras` (interaction_check), on_app_command_completion et le
+  gestionnaire d'erreurs de l'arbre enregistrent la fin.
+Les erreurs et refus par cooldown sont comptés par record_command_error,
+appelé depuis les gestionnaires d'erreurs globaux.
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional, Union
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.metrics import COMMAND_COOLDOWNS, COMMAND_ERRORS, COMMAND_LATENCY, COMMAND_TOTAL
+
+_START_KEY = "metrics_start"
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras[_START_KEY] = time.perf_counter()
+        return True
+
+
+AnyCommand = Union[commands.Command, app_commands.Command, app_commands.ContextMenu, None]
+_HYBRID = (commands.HybridCommand, commands.HybridGroup, commands.hybrid.HybridAppCommand)
+
+
+def command_kind(command: AnyCommand) -> str:
+    if isinstance(command, _HYBRID):
+        return "hybrid"
+    if isinstance(command, commands.Command):
+        return "prefix"
+    if isinstance(command, app_commands.ContextMenu):
+        return "menu"
+    return "slash"
+
+
+def _observe(kind: str, name: str, start: Optional[float], failed: bool) -> None:
+    if start is not None:
+        COMMAND_LATENCY.observe(time.perf_counter() - start, kind=kind, command=name)
+    COMMAND_TOTAL.inc(kind=kind, command=name, status="error" if failed else "ok")
+
+
+def record_command_error(
+    command, error: BaseException, interaction: Optional[discord.Interaction] = None
+) -> None:
+    """Compte une erreur de commande (classe d'erreur, cooldown).
+
+    Pour une slash pure, enregistre aussi sa durée : aucun hook after_invoke
+    ne la couvre.
+    """
+    if command is None:
+        return  # commande inconnue : pas d'étiquette à créer
+    kind = command_kind(command)
+    name = command.qualified_name
+    if isinstance(error, (commands.CommandOnCooldown, app_commands.CommandOnCooldown)):
+        COMMAND_COOLDOWNS.inc(kind=kind, command=name)
+        return
+    COMMAND_ERRORS.inc(kind=kind, command=name, error=type(error).__name__)
+    if interaction is not None and kind != "hybrid":
+        _observe(kind, name, interaction.extras.pop(_START_KEY, None), True)
+
+
+def install_command_metrics(bot: commands.Bot) -> None:
+    """Branche les hooks de mesure sur le bot (à appeler avant le chargement des cogs)."""
+
+    @bot.before_invoke
+    async def _before(ctx: commands.Context) -> None:
+        ctx.metrics_start = time.perf_counter()
+
+    @bot.after_invoke
+    async def _after(ctx: commands.Context) -> None:
+        if ctx.command is not None:
+            _observe(command_kind(ctx.command), ctx.command.qualified_name,
+                     getattr(ctx, "metrics_start", None), ctx.command_failed)
+
+    async def on_app_command_completion(interaction: discord.Interaction, command) -> None:
+        if command_kind(command) == "hybrid":
+            return  # déjà mesurée par after_invoke
+        start = interaction.extras.pop(_START_KEY, None)
+        _observe(command_kind(command), command.qualified_name, start, False)
+
+    bot.add_listener(on_app_command_completion)
@@ -0,0 +1,574 @@
+"""Stockage SQLite (mode WAL) du système de confessions.
+
+Chaque confession est une ligne indexée : une mise à jour unitaire coûte
+O(log n) au lieu d'un rechargement/réécriture complète de confessions.json.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Colonnes stockées telles quelles ; tout autre champ d'un enregistrement
+# est conservé dans la colonne JSON "extra" pour ne rien perdre à la migration.
+_COLUMNS = (
+    "id",
+    "author_id",
+    "author_tag",
+    "text",
+    "timestamp",
+    "message_id",
+    "channel_id",
+    "thread_id",
+    "reply_to",
+)
+_UPDATABLE = frozenset(_COLUMNS) - {"id"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS confessions (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER,
+    author_tag TEXT,
+    text TEXT NOT NULL DEFAULT '',
+    timestamp TEXT,
+    message_id INTEGER,
+    channel_id INTEGER,
+    thread_id INTEGER,
+    reply_to INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_confessions_message ON confessions(message_id);
+CREATE INDEX IF NOT EXISTS idx_confessions_channel ON confessions(channel_id);
+CREATE INDEX IF NOT EXISTS idx_confessions_thread ON confessions(thread_id);
+CREATE INDEX IF NOT EXISTS idx_confessions_author ON confessions(author_id);
+CREATE TABLE IF NOT EXISTS responses (
+    parent_id INTEGER NOT NULL,
+    response_id INTEGER NOT NULL,
+    PRIMARY KEY (parent_id, response_id)
+);
+CREATE TABLE IF NOT EXISTS message_channels (
+    message_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS message_locations (
+    message_id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    thread_id INTEGER,
+    status INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_locations_status ON message_locations(status);
+CREATE TABLE IF NOT EXISTS user_counts (
+    user_id INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# État d'une entrée de message_locations
+LOCATION_UNVERIFIED = 0  # déduite des données existantes, serveur inconnu
+LOCATION_OK = 1  # connue à la publication ou confirmée par le job de réparation
+LOCATION_MISSING = 2  # message introuvable : plus jamais recherché
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ConfessionStore:
+    """Accès aux confessions, réponses, ids de messages et compteurs par utilisateur."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+    # ------ méta / compteurs ------
+    def _get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key: str, value: Any) -> None:
+        self._conn.execute(
+            "INSERT INTO meta(key, value) VALUES(?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def _bump_counters(self, author_id: Optional[int], delta: int) -> None:
+        total = int(self._get_meta("total_count", "0"))
+        self._set_meta("total_count", max(0, total + delta))
+        if author_id is None:
+            return
+        if delta > 0:
+            self._conn.execute(
+                "INSERT INTO user_counts(user_id, count) VALUES(?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET count = count + excluded.count",
+                (author_id, delta),
+            )
+        else:
+            self._conn.execute(
+                "UPDATE user_counts SET count = MAX(0, count + ?) WHERE user_id = ?",
+                (delta, author_id),
+            )
+
+    def user_count(self, user_id: int) -> int:
+        """Nombre de confessions (réponses incluses) publiées par un utilisateur."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count FROM user_counts WHERE user_id = ?", (int(user_id),)
+            ).fetchone()
+            return int(row["count"]) if row else 0
+
+    def total_count(self) -> int:
+        with self._lock:
+            return int(self._get_meta("total_count", "0"))
+
+    # ------ lecture ------
+    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record: Dict[str, Any] = {}
+        if row["extra"]:
+            try:
+                record.update(json.loads(row["extra"]))
+            except ValueError:
+                pass
+        for col in _COLUMNS:
+            record[col] = row[col]
+        responses = self._conn.execute(
+            "SELECT response_id FROM responses WHERE parent_id = ? ORDER BY rowid",
+            (row["id"],),
+        ).fetchall()
+        record["responses"] = [r["response_id"] for r in responses]
+        return record
+
+    def get(self, confession_id: int) -> Optional[Dict[str, Any]]:
+        """Retourne l'enregistrement d'une confession ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM confessions WHERE id = ?", (int(confession_id),)
+            ).fetchone()
+            return self._row_to_record(row) if row else None
+
+    def get_by_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM confessions WHERE message_id = ?", (int(message_id),)
+            ).fetchone()
+            return self._row_to_record(row) if row else None
+
+    def iter_all(self, published_only: bool = False) -> Iterator[Dict[str, Any]]:
+        """Itère sur les confessions par id croissant, par pages (option : publiées seulement)."""
+        where = "message_id IS NOT NULL AND id > ?" if published_only else "id > ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM confessions WHERE {where} ORDER BY id LIMIT 500",
+                    (last_id,),
+                ).fetchall()
+                records = [self._row_to_record(r) for r in rows]
+            if not records:
+                return
+            yield from records
+            last_id = records[-1]["id"]
+
+    def message_channel(self, message_id: int) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT channel_id FROM message_channels WHERE message_id = ?", (int(message_id),)
+            ).fetchone()
+            return int(row["channel_id"]) if row else None
+
+    # ------ écriture ------
+    def create(
+        self,
+        author_id: int,
+        author_tag: str,
+        text: str,
+        timestamp: str,
+        channel_id: Optional[int] = None,
+        reply_to: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Alloue un id, incrémente les compteurs et insère la confession (une transaction).
+        Si reply_to est fourni, la réponse est aussi liée à son parent.
+        """
+        with self._lock, self._conn:
+            cid = int(self._get_meta("next_id", "1"))
+            self._set_meta("next_id", cid + 1)
+            self._bump_counters(int(author_id), 1)
+            self._conn.execute(
+                "INSERT INTO confessions(id, author_id, author_tag, text, timestamp, "
+                "message_id, channel_id, thread_id, reply_to) "
+                "VALUES(?, ?, ?, ?, ?, NULL, ?, NULL, ?)",
+                (cid, int(author_id), author_tag, text, timestamp, channel_id, reply_to),
+            )
+            if reply_to is not None:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO responses(parent_id, response_id) VALUES(?, ?)",
+                    (int(reply_to), cid),
+                )
+        return {
+            "id": cid,
+            "author_id": int(author_id),
+            "author_tag": author_tag,
+            "text": text,
+            "responses": [],
+            "timestamp": timestamp,
+            "message_id": None,
+            "channel_id": channel_id,
+            "thread_id": None,
+            "reply_to": reply_to,
+        }
+
+    def update(self, confession_id: int, **fields: Any) -> bool:
+        """Met à jour des colonnes d'une confession (message_id, channel_id, thread_id...)."""
+        unknown = set(fields) - _UPDATABLE
+        if unknown:
+            raise ValueError(f"Champs non modifiables: {sorted(unknown)}")
+        if not fields:
+            return True
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                f"UPDATE confessions SET {assignments} WHERE id = ?",
+                (*fields.values(), int(confession_id)),
+            )
+            if cur.rowcount == 0:
+                return False
+            row = self._conn.execute(
+                "SELECT message_id, channel_id FROM confessions WHERE id = ?",
+                (int(confession_id),),
+            ).fetchone()
+            if row["message_id"] and row["channel_id"]:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO message_channels(message_id, channel_id) "
+                    "VALUES(?, ?)",
+                    (row["message_id"], row["channel_id"]),
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO message_locations(message_id, channel_id) VALUES(?, ?)",
+                    (row["message_id"], row["channel_id"]),
+                )
+            if "thread_id" in fields and row["message_id"]:
+                self._conn.execute(
+                    "UPDATE message_locations SET thread_id = ? WHERE message_id = ?",
+                    (fields["thread_id"], row["message_id"]),
+                )
+        return True
+
+    def delete(self, confession_id: int) -> Optional[Dict[str, Any]]:
+        """Retire une confession, décrémente les compteurs et retourne l'ancien enregistrement."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM confessions WHERE id = ?", (int(confession_id),)
+            ).fetchone()
+            if not row:
+                return None
+            record = self._row_to_record(row)
+            self._bump_counters(_to_int(record.get("author_id")), -1)
+            self._conn.execute("DELETE FROM confessions WHERE id = ?", (int(confession_id),))
+            self._conn.execute(
+                "DELETE FROM responses WHERE parent_id = ?", (int(confession_id),)
+            )
+            if record.get("message_id"):
+                self._conn.execute(
+                    "DELETE FROM message_channels WHERE message_id = ?", (record["message_id"],)
+                )
+                self._conn.execute(
+                    "DELETE FROM message_locations WHERE message_id = ?", (record["message_id"],)
+                )
+        return record
+
+    # ------ emplacement des messages publiés ------
+    def set_location(
+        self,
+        message_id: int,
+        guild_id: Optional[int],
+        channel_id: Optional[int],
+        thread_id: Optional[int] = None,
+        status: int = LOCATION_OK,
+        checked_at: Optional[float] = None,
+    ) -> None:
+        """Enregistre où se trouve un message (serveur, salon ou fil qui le contient, fil créé dessus)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO message_locations(message_id, guild_id, channel_id, thread_id, status, checked_at) "
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(message_id) DO UPDATE SET "
+                "guild_id = COALESCE(excluded.guild_id, guild_id), "
+                "channel_id = COALESCE(excluded.channel_id, channel_id), "
+                "thread_id = COALESCE(excluded.thread_id, thread_id), "
+                "status = excluded.status, checked_at = excluded.checked_at",
+                (int(message_id), guild_id, channel_id, thread_id, int(status), checked_at),
+            )
+
+    def location(self, message_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM message_locations WHERE message_id = ?", (int(message_id),)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def backfill_locations(self) -> int:
+        """Complète message_locations depuis message_channels et les confessions publiées.
+        Idempotent ; retourne le nombre d'entrées ajoutées.
+        """
+        with self._lock, self._conn:
+            added = self._conn.execute(
+                "INSERT OR IGNORE INTO message_locations(message_id, channel_id) "
+                "SELECT message_id, channel_id FROM message_channels"
+            ).rowcount
+            added += self._conn.execute(
+                "INSERT OR IGNORE INTO message_locations(message_id, channel_id, thread_id) "
+                "SELECT message_id, channel_id, thread_id FROM confessions "
+                "WHERE message_id IS NOT NULL"
+            ).rowcount
+            # Fils créés après coup sur un message déjà localisé
+            self._conn.execute(
+                "UPDATE message_locations SET thread_id = (SELECT c.thread_id FROM confessions c "
+                "WHERE c.message_id = message_locations.message_id) "
+                "WHERE thread_id IS NULL AND EXISTS (SELECT 1 FROM confessions c "
+                "WHERE c.message_id = message_locations.message_id AND c.thread_id IS NOT NULL)"
+            )
+        return max(0, added)
+
+    def locations_to_repair(self, limit: int) -> List[Dict[str, Any]]:
+        """Messages dont l'emplacement n'est pas confirmé (plus anciens d'abord)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.*, c.id AS confession_id, c.reply_to FROM message_locations l "
+                "JOIN confessions c ON c.message_id = l.message_id "
+                "WHERE l.status = ? ORDER BY l.message_id LIMIT ?",
+                (LOCATION_UNVERIFIED, int(limit)),
+            ).fetchall()
+            return [dict(r) for r in rows]
+
+    def known_location_channels(self) -> List[int]:
+        """Salons où des confessions ont déjà été localisées (candidats pour une recherche)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel_id, COUNT(*) AS n FROM message_locations "
+                "WHERE status = ? AND channel_id IS NOT NULL GROUP BY channel_id ORDER BY n DESC",
+                (LOCATION_OK,),
+            ).fetchall()
+            return [int(r["channel_id"]) for r in rows]
+
+    # ------ instantané complet (ancien format JSON) ------
+    def export_snapshot(self) -> Dict[str, Any]:
+        """Reconstruit l'ancien document confessions.json (coût O(n), réservé aux exports)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM confessions ORDER BY id").fetchall()
+            confessions = [self._row_to_record(r) for r in rows]
+            channels = self._conn.execute("SELECT * FROM message_channels").fetchall()
+            counts = self._conn.execute("SELECT * FROM user_counts").fetchall()
+            return {
+                "confessions": confessions,
+                "message_channels": {str(r["message_id"]): r["channel_id"] for r in channels},
+                "next_id": int(self._get_meta("next_id", "1")),
+                "user_counts": {str(r["user_id"]): r["count"] for r in counts},
+                "total_count": int(self._get_meta("total_count", "0")),
+            }
+
+    def import_snapshot(self, data: Dict[str, Any]) -> int:
+        """Remplace tout le contenu par un document au format confessions.json.
+        Retourne le nombre de confessions importées.
+        """
+        confessions = [c for c in data.get("confessions", []) if isinstance(c, dict)]
+        with self._lock, self._conn:
+            for table in ("confessions", "responses", "message_channels", "user_counts"):
+                self._conn.execute(f"DELETE FROM {table}")
+            max_id = 0
+            for conf in confessions:
+                cid = _to_int(conf.get("id"))
+                if cid is None:
+                    continue
+                max_id = max(max_id, cid)
+                extra = {
+                    k: v for k, v in conf.items() if k not in _COLUMNS and k != "responses"
+                }
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO confessions(id, author_id, author_tag, text, "
+                    "timestamp, message_id, channel_id, thread_id, reply_to, extra) "
+                    "VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        cid,
+                        _to_int(conf.get("author_id")),
+                        conf.get("author_tag"),
+                        conf.get("text") or "",
+                        conf.get("timestamp"),
+                        _to_int(conf.get("message_id")),
+                        _to_int(conf.get("channel_id")),
+                        _to_int(conf.get("thread_id")),
+                        _to_int(conf.get("reply_to")),
+                        json.dumps(extra, ensure_ascii=False) if extra else None,
+                    ),
+                )
+                for rid in conf.get("responses", []) or []:
+                    if _to_int(rid) is not None:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO responses(parent_id, response_id) "
+                            "VALUES(?, ?)",
+                            (cid, _to_int(rid)),
+                        )
+                if _to_int(conf.get("message_id")) and _to_int(conf.get("channel_id")):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO message_channels(message_id, channel_id) "
+                        "VALUES(?, ?)",
+                        (_to_int(conf.get("message_id")), _to_int(conf.get("channel_id"))),
+                    )
+            for mid, chid in (data.get("message_channels") or {}).items():
+                if _to_int(mid) is not None and _to_int(chid) is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO message_channels(message_id, channel_id) "
+                        "VALUES(?, ?)",
+                        (_to_int(mid), _to_int(chid)),
+                    )
+            for uid, count in (data.get("user_counts") or {}).items():
+                if _to_int(uid) is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO user_counts(user_id, count) VALUES(?, ?)",
+                        (_to_int(uid), _to_int(count) or 0),
+                    )
+            next_id = max(_to_int(data.get("next_id")) or 1, max_id + 1)
+            self._set_meta("next_id", next_id)
+            self._set_meta("total_count", _to_int(data.get("total_count")) or len(confessions))
+        return len(confessions)
+
+    def migrate_from_json(self, json_path: str) -> bool:
+        """Migration unique depuis l'ancien confessions.json.
+        Le fichier source est conservé sous <nom>.migrated. Retourne True si migré.
+        """
+        with self._lock:
+            if self._get_meta("migrated_from") is not None or not os.path.exists(json_path):
+                return False
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"Migration impossible depuis {json_path}: {e}")
+                return False
+            if not isinstance(data, dict):
+                logger.warning(f"Structure invalide dans {json_path}, migration ignorée")
+                return False
+            count = self.import_snapshot(data)
+            with self._conn:
+                self._set_meta("migrated_from", json_path)
+        try:
+            os.replace(json_path, f"{json_path}.migrated")
+        except Exception as e:
+            logger.warning(f"Impossible de renommer {json_path} après migration: {e}")
+        logger.info(f"Migration de {count} confession(s) depuis {json_path} vers {self.path}")
+        return True
+
+
+class ConfessionIndex:
+    """Index mémoire des confessions : id -> enregistrement, message_id -> id,
+    thread_id -> id parent et author_id -> ids. Reconstruit au chargement puis
+    tenu à jour à chaque création, mise à jour et suppression.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_message: Dict[int, int] = {}
+        self._by_thread: Dict[int, int] = {}
+        self._by_author: Dict[int, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        self._by_id.clear()
+        self._by_message.clear()
+        self._by_thread.clear()
+        self._by_author.clear()
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        cid = int(record["id"])
+        self._by_id[cid] = record
+        if record.get("message_id"):
+            self._by_message[int(record["message_id"])] = cid
+        if record.get("thread_id"):
+            self._by_thread[int(record["thread_id"])] = cid
+        author_id = _to_int(record.get("author_id"))
+        if author_id is not None:
+            self._by_author.setdefault(author_id, set()).add(cid)
+        parent = self._by_id.get(_to_int(record.get("reply_to")) or 0)
+        if parent is not None and cid not in parent.setdefault("responses", []):
+            parent["responses"].append(cid)
+
+    def update(self, confession_id: int, **fields: Any) -> None:
+        record = self._by_id.get(int(confession_id))
+        if record is None:
+            return
+        if "message_id" in fields and record.get("message_id"):
+            self._by_message.pop(int(record["message_id"]), None)
+        if "thread_id" in fields and record.get("thread_id"):
+            self._by_thread.pop(int(record["thread_id"]), None)
+        record.update(fields)
+        if record.get("message_id"):
+            self._by_message[int(record["message_id"])] = record["id"]
+        if record.get("thread_id"):
+            self._by_thread[int(record["thread_id"])] = record["id"]
+
+    def remove(self, confession_id: int) -> Optional[Dict[str, Any]]:
+        record = self._by_id.pop(int(confession_id), None)
+        if record is None:
+            return None
+        if record.get("message_id"):
+            self._by_message.pop(int(record["message_id"]), None)
+        if record.get("thread_id"):
+            self._by_thread.pop(int(record["thread_id"]), None)
+        ids = self._by_author.get(_to_int(record.get("author_id")) or 0)
+        if ids is not None:
+            ids.discard(record["id"])
+            if not ids:
+                self._by_author.pop(int(record["author_id"]), None)
+        return record
+
+    # ------ recherches O(1) ------
+    def get(self, confession_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(int(confession_id))
+
+    def by_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        cid = self._by_message.get(int(message_id))
+        return self._by_id.get(cid) if cid is not None else None
+
+    def parent_of_thread(self, thread_id: int) -> Optional[Dict[str, Any]]:
+        cid = self._by_thread.get(int(thread_id))
+        return self._by_id.get(cid) if cid is not None else None
+
+    def ids_by_author(self, author_id: int) -> List[int]:
+        return sorted(self._by_author.get(int(author_id), ()))
+
+    def published(self) -> List[Dict[str, Any]]:
+        """Confessions ayant un message publié, par id croissant."""
+        return [self._by_id[cid] for cid in sorted(self._by_message.values())]
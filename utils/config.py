@@ -1,49 +1,182 @@
-import json
+import atexit
+import copy
 import os
 import threading
 from typing import Any, Dict, Optional
 
-_lock = threading.Lock()
+from utils import codec
+from utils.logger import get_logger
+from utils.metrics import STORAGE_LATENCY
+
+logger = get_logger(__name__)
+
+# Write-behind cache: reads are served from memory, writes only mark the document
+# dirty and a background thread writes each dirty document once per interval.
+FLUSH_INTERVAL = 2.0
+
+_lock = threading.Lock()  # protects the in-memory state only, never held during disk I/O
+_path_locks: Dict[str, threading.Lock] = {}  # one per file: I/O on a file never blocks the others
+_cache: Dict[str, Dict[str, Any]] = {}
+_dirty: set = set()
+_stats: Dict[str, int] = {
+    "hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "coalesced": 0,
+    "flushes": 0,
+    "flush_errors": 0,
+}
+_flusher: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _write_file(path: str, data: Dict[str, Any]) -> None:
+    """Atomic durable write: temp file, fsync, then os.replace.
+    Encoded with the default state codec (see utils.codec).
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        payload = codec.encode(data)
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        except Exception:
+            pass
+        raise
+
+
+def _path_lock(path: str) -> threading.Lock:
+    with _lock:
+        lock = _path_locks.get(path)
+        if lock is None:
+            lock = _path_locks[path] = threading.Lock()
+        return lock
 
 
 def ensure_file(path: str, default_content: Dict[str, Any]) -> None:
     """Create file with default JSON if it doesn't exist."""
     if not os.path.exists(path):
-        os.makedirs(os.path.dirname(path), exist_ok=True) if os.path.dirname(path) else None
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(default_content, f, indent=2, ensure_ascii=False)
+        _write_file(path, default_content)
 
 
 def read_json(path: str, default_content: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """Thread-safe JSON read with optional default creation."""
+    """Thread-safe JSON read served from the in-process cache, with optional default creation.
+    Returns a private copy: mutating it has no effect until passed to write_json.
+    """
     with _lock:
-        if default_content is not None:
-            ensure_file(path, default_content)
-        if not os.path.exists(path):
-            return default_content.copy() if default_content is not None else {}
+        cached = _cache.get(path)
+        if cached is not None:
+            _stats["hits"] += 1
+            return copy.deepcopy(cached)
+    with _path_lock(path):
+        with _lock:
+            cached = _cache.get(path)
+            if cached is not None:
+                _stats["hits"] += 1
+                return copy.deepcopy(cached)
+            _stats["misses"] += 1
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            if default_content is not None:
+                ensure_file(path, default_content)
+            if not os.path.exists(path):
+                return copy.deepcopy(default_content) if default_content is not None else {}
+            with open(path, "rb") as f:
+                data = codec.decode(f.read())
         except Exception:
-            return default_content.copy() if default_content is not None else {}
+            return copy.deepcopy(default_content) if default_content is not None else {}
+        with _lock:
+            # A write_json may have landed while we were reading the file
+            data = _cache.setdefault(path, data)
+            return copy.deepcopy(data)
 
 
 def write_json(path: str, data: Dict[str, Any]) -> bool:
-    """Thread-safe atomic JSON write. Returns True on success."""
-    tmp_path = f"{path}.tmp"
-    with _lock:
+    """Thread-safe write-behind JSON write. Returns True once the document is queued.
+    The file itself is replaced atomically by the background flusher or by flush().
+    """
+    with STORAGE_LATENCY.time(op="write_json", file=os.path.basename(path)):
         try:
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            os.replace(tmp_path, path)
-            return True
+            snapshot = copy.deepcopy(data)
         except Exception:
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
+            logger.exception(f"Document non copiable pour {path}")
             return False
+        with _lock:
+            _cache[path] = snapshot
+            _stats["writes"] += 1
+            if path in _dirty:
+                _stats["coalesced"] += 1
+            else:
+                _dirty.add(path)
+    _ensure_flusher()
+    return True
+
+
+def flush(path: Optional[str] = None) -> bool:
+    """Write dirty documents (all, or only `path`) to disk now. Returns False on any failure.
+    Call on shutdown/reboot; also registered with atexit.
+    """
+    with _lock:
+        paths = [path] if path is not None else list(_dirty)
+    ok = True
+    for p in paths:
+        # The per-file lock serializes flushes of one file so an older snapshot never lands last
+        with _path_lock(p):
+            with _lock:
+                if p not in _dirty:
+                    continue
+                _dirty.discard(p)
+                data = _cache[p]
+            try:
+                with STORAGE_LATENCY.time(op="flush", file=os.path.basename(p)):
+                    _write_file(p, data)
+                with _lock:
+                    _stats["flushes"] += 1
+            except Exception as e:
+                ok = False
+                logger.error(f"Échec d'écriture de {p}: {e}")
+                with _lock:
+                    _stats["flush_errors"] += 1
+                    _dirty.add(p)  # retried on the next tick
+    return ok
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Counters of the document cache (hits, misses, writes, coalesced, flushes, dirty...)."""
+    with _lock:
+        stats = dict(_stats)
+        stats["dirty"] = len(_dirty)
+        stats["documents"] = len(_cache)
+    return stats
+
+
+def _flusher_loop() -> None:
+    while not _stop.wait(FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception:
+            logger.exception("Erreur dans le flusher JSON")
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flusher_loop, name="tokibot-json-flusher", daemon=True)
+        _flusher.start()
+
+
+atexit.register(flush)
 
 
 # High-level helpers
@@ -0,0 +1,87 @@
+"""File durable d'actions différées partagée par tous les cogs.
+
+Un seul répartiteur (TimerScheduler) pour les suppressions de messages
+différées, les rebans et débans programmés, etc. Les commandes planifient puis
+rendent la main immédiatement, sans garder de coroutine ni de référence au
+message pendant le délai. La file survit aux redémarrages et chaque action
+peut être annulée par sa clé.
+
+Les cogs enregistrent leurs propres types d'action avec register() ;
+"delete_message" est fourni ici.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+import discord
+
+from utils.logger import get_logger
+from utils.scheduler import Job, TimerScheduler
+
+logger = get_logger(__name__)
+
+ACTIONS_FILE = "delayed_actions.json"
+ACTION_CONCURRENCY = 4
+
+
+class DelayedActionQueue(TimerScheduler):
+    """TimerScheduler lié au bot, avec les actions génériques intégrées."""
+
+    def __init__(self, bot: discord.Client, path: str = ACTIONS_FILE, max_concurrency: int = ACTION_CONCURRENCY):
+        super().__init__(path, max_concurrency=max_concurrency)
+        self.bot = bot
+        self.register("delete_message", self._delete_message)
+
+    async def later(self, kind: str, delay: float, key: str, guild_id: Optional[int] = None, **payload: Any) -> Job:
+        """Planifie l'action `kind` dans `delay` secondes."""
+        return await self.schedule(kind, time.time() + delay, key, guild_id=guild_id, **payload)
+
+    async def delete_message_later(self, message: discord.Message, delay: float) -> Job:
+        """Supprime `message` dans `delay` secondes (seuls les ids sont conservés)."""
+        return await self.later(
+            "delete_message",
+            delay,
+            f"delete_message:{message.channel.id}:{message.id}",
+            guild_id=message.guild.id if message.guild else None,
+            channel_id=message.channel.id,
+            message_id=message.id,
+        )
+
+    async def _delete_message(self, job: Job) -> None:
+        await self.bot.wait_until_ready()
+        payload = job["payload"]
+        # Message partiel : pas de requête de récupération avant la suppression
+        channel = self.bot.get_partial_messageable(payload["channel_id"], guild_id=job["guild_id"])
+        try:
+            await channel.get_partial_message(payload["message_id"]).delete()
+        except (discord.NotFound, discord.Forbidden):
+            pass  # déjà supprimé ou plus accessible
+
+
+_queue: Optional[DelayedActionQueue] = None
+
+
+def get_action_queue() -> DelayedActionQueue:
+    """File partagée ; créée par start_action_queue() dans le setup_hook."""
+    if _queue is None:
+        raise RuntimeError("La file d'actions différées n'est pas démarrée")
+    return _queue
+
+
+async def start_action_queue(bot: discord.Client) -> DelayedActionQueue:
+    """Crée la file, recharge les actions persistées et lance le répartiteur."""
+    global _queue
+    if _queue is None:
+        _queue = DelayedActionQueue(bot)
+        count = await _queue.load()
+        logger.info(f"File d'actions différées: {count} action(s) en attente")
+    _queue.start()
+    return _queue
+
+
+async def stop_action_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
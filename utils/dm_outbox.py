@@ -0,0 +1,214 @@
+"""File d'envoi des messages privés (DM).
+
+Les commandes déposent leurs DM dans une file bornée à priorités ; un petit pool
+de workers les envoie en respectant un débit global (seau à jetons). Un
+utilisateur dont les DM ont renvoyé Forbidden est mémorisé pendant
+CLOSED_TTL secondes : les envois suivants sont ignorés sans requête.
+
+Les DM envoyés juste avant une sanction (ban, kick) peuvent être attendus au
+plus `wait` secondes : une fois le membre hors du serveur, Discord refuse
+souvent le message.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import discord
+
+from utils.logger import get_logger
+from utils.warmup import RestBudget
+
+logger = get_logger(__name__)
+
+LOW, NORMAL, HIGH = 0, 1, 2  # même convention que utils/log_sink : plus grand = servi en premier
+QUEUE_SIZE = 500
+WORKERS = 2
+DM_RATE = 1.0  # DM par seconde, tous workers confondus
+DM_BURST = 5
+CLOSED_TTL = 6 * 3600
+CLOSED_MAX = 10_000  # utilisateurs mémorisés au plus (les plus anciens sont oubliés)
+PRE_SANCTION_WAIT = 1.5
+
+
+class _DMJob:
+    def __init__(
+        self,
+        user: discord.abc.User,
+        content: Optional[str],
+        embed: Optional[discord.Embed],
+        future: asyncio.Future,
+    ):
+        self.user = user
+        self.content = content
+        self.embed = embed
+        self.future = future
+
+
+class DMOutbox:
+    def __init__(
+        self, workers: int = WORKERS, queue_size: int = QUEUE_SIZE, closed_ttl: float = CLOSED_TTL
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.closed_ttl = closed_ttl
+        self.budget = RestBudget(DM_RATE, DM_BURST)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        # user_id -> expiration ; TTL constant, donc ordre d'insertion = ordre d'expiration
+        self._closed: "OrderedDict[int, float]" = OrderedDict()
+        self.stats = {
+            "queued": 0, "sent": 0, "forbidden": 0, "skipped": 0, "dropped": 0, "failed": 0
+        }
+
+    # ------ cycle de vie ------
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue(self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Laisse `timeout` secondes aux DM en file, puis arrête les workers."""
+        if self._queue is not None and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._queue.qsize()} DM abandonné(s) à l'arrêt")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ------ cache négatif ------
+    def dm_closed(self, user_id: int) -> bool:
+        until = self._closed.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._closed[user_id]
+            return False
+        return True
+
+    def _mark_closed(self, user_id: int) -> None:
+        now = time.monotonic()
+        self._closed[user_id] = now + self.closed_ttl
+        self._closed.move_to_end(user_id)
+        # Purge des entrées expirées (en tête) et plafond de taille
+        while self._closed:
+            oldest_id, until = next(iter(self._closed.items()))
+            if until > now and len(self._closed) <= CLOSED_MAX:
+                break
+            del self._closed[oldest_id]
+
+    def forget(self, user_id: int) -> None:
+        self._closed.pop(user_id, None)
+
+    # ------ API ------
+    def enqueue(
+        self,
+        user: discord.abc.User,
+        embed: Optional[discord.Embed] = None,
+        content: Optional[str] = None,
+        priority: int = NORMAL,
+    ) -> asyncio.Future:
+        """Met un DM en file. Le future se résout à True une fois le DM remis, False sinon."""
+        future = asyncio.get_running_loop().create_future()
+        if self.dm_closed(user.id):
+            self.stats["skipped"] += 1
+            future.set_result(False)
+            return future
+        if self._queue is None:
+            self.start()
+        try:
+            # PriorityQueue sert le plus petit : la priorité est inversée
+            job = _DMJob(user, content, embed, future)
+            self._queue.put_nowait((-priority, next(self._seq), job))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning(f"File des DM pleine, DM pour {user.id} abandonné")
+            future.set_result(False)
+            return future
+        self.stats["queued"] += 1
+        return future
+
+    async def send(
+        self,
+        user: discord.abc.User,
+        embed: Optional[discord.Embed] = None,
+        content: Optional[str] = None,
+        priority: int = NORMAL,
+        wait: float = 0.0,
+    ) -> bool:
+        """Met un DM en file ; avec `wait`, attend sa remise au plus `wait` secondes.
+
+        Sans attente, retourne True si le DM a été accepté dans la file.
+        """
+        future = self.enqueue(user, embed, content, priority)
+        if future.done():
+            return future.result()
+        if wait <= 0:
+            return True
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), wait)
+        except asyncio.TimeoutError:
+            return True  # toujours en file, il partira plus tard
+
+    # ------ workers ------
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                job.future.set_result(await self._deliver(job))
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Erreur inattendue lors de l'envoi DM à {job.user.id}: {e}")
+                if not job.future.done():
+                    job.future.set_result(False)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: _DMJob) -> bool:
+        # L'utilisateur a pu être marqué pendant que le DM attendait
+        if self.dm_closed(job.user.id):
+            self.stats["skipped"] += 1
+            return False
+        await self.budget.acquire()
+        try:
+            await job.user.send(content=job.content, embed=job.embed)
+        except discord.Forbidden:
+            self.stats["forbidden"] += 1
+            self._mark_closed(job.user.id)
+            logger.info(f"Impossible d'envoyer un DM à {job.user.id} (DMs fermés)")
+            return False
+        except discord.HTTPException as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Erreur HTTP lors de l'envoi DM à {job.user.id}: {e}")
+            return False
+        self.stats["sent"] += 1
+        return True
+
+
+_outbox = DMOutbox()
+
+
+def get_dm_outbox() -> DMOutbox:
+    return _outbox
+
+
+async def send_dm(
+    user: discord.abc.User,
+    embed: Optional[discord.Embed] = None,
+    content: Optional[str] = None,
+    priority: int = NORMAL,
+    wait: float = 0.0,
+) -> bool:
+    """Raccourci : DM via la file partagée."""
+    return await _outbox.send(user, embed, content, priority, wait)
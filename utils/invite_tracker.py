@@ -0,0 +1,151 @@
+"""Attribution des arrivées aux invitations, tolérante aux vagues de joins.
+
+Instantané par serveur sous forme {code: uses}. Les joins rapprochés partagent
+une seule récupération des invitations, puis sont attribués en comparant les
+compteurs d'utilisation. On n'attend la fenêtre de regroupement que si ce
+premier diff est ambigu (utilisations différentes du nombre de joins). on_invite_create et
+on_invite_delete tiennent l'instantané à jour entre deux récupérations.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COALESCE_WINDOW = 1.5  # secondes d'attente pour regrouper les joins d'une vague ambiguë
+
+
+class InviteTracker:
+    def __init__(self, window: float = COALESCE_WINDOW):
+        self.window = window
+        self._uses: Dict[int, Dict[str, int]] = {}
+        # code -> (auteur de l'invitation, max_uses ; 0 = illimité)
+        self._meta: Dict[int, Dict[str, Tuple[Optional[str], int]]] = {}
+        # Invitations supprimées depuis la dernière récupération (une invitation à usage
+        # unique disparaît au moment même où elle est utilisée)
+        self._vanished: Dict[int, Dict[str, int]] = {}
+        self._pending: Dict[int, List[asyncio.Future]] = {}
+        # La boucle ne garde qu'une référence faible : sans celle-ci, une résolution en
+        # cours pourrait être collectée et ses joins attendraient pour toujours
+        self._tasks: Set[asyncio.Task] = set()
+
+    # ------ instantanés ------
+    def _store(self, guild_id: int, invites: List[discord.Invite]) -> None:
+        self._uses[guild_id] = {i.code: i.uses or 0 for i in invites}
+        self._meta[guild_id] = {
+            i.code: (str(i.inviter) if i.inviter else None, i.max_uses or 0) for i in invites
+        }
+
+    async def snapshot(self, guild: discord.Guild) -> None:
+        """Instantané initial (au démarrage ou à l'arrivée dans un serveur)."""
+        try:
+            self._store(guild.id, await guild.invites())
+        except Exception:
+            # Permissions manquantes ou API indisponible
+            self._store(guild.id, [])
+
+    def on_create(self, invite: discord.Invite) -> None:
+        if invite.guild is None or invite.guild.id not in self._uses:
+            return
+        gid = invite.guild.id
+        self._uses[gid][invite.code] = invite.uses or 0
+        inviter = str(invite.inviter) if invite.inviter else None
+        self._meta[gid][invite.code] = (inviter, invite.max_uses or 0)
+
+    def on_delete(self, invite: discord.Invite) -> None:
+        if invite.guild is None or invite.guild.id not in self._uses:
+            return
+        gid = invite.guild.id
+        uses = self._uses[gid].pop(invite.code, None)
+        if uses is not None:
+            self._vanished.setdefault(gid, {})[invite.code] = uses
+
+    def drop(self, guild_id: int) -> None:
+        for store in (self._uses, self._meta, self._vanished):
+            store.pop(guild_id, None)
+
+    # ------ attribution ------
+    async def attribute(self, member: discord.Member) -> Tuple[List[str], bool]:
+        """(auteurs possibles de l'invitation utilisée par `member`, attribution certaine).
+        Liste vide si inconnu (lien vanity...). Incertaine quand elle ne repose que sur
+        une invitation disparue : épuisée par l'arrivée, ou supprimée à la main.
+        """
+        gid = member.guild.id
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiting = self._pending.setdefault(gid, [])
+        waiting.append(future)
+        if len(waiting) == 1:
+            task = asyncio.create_task(self._resolve(member.guild))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await future
+
+    async def _resolve(self, guild: discord.Guild) -> None:
+        # Le lot reste ouvert jusqu'à la dernière récupération : les joins qui arrivent
+        # entre-temps s'y ajoutent au lieu de lancer une résolution concurrente
+        gid = guild.id
+        inviters: List[str] = []
+        certain = True
+        try:
+            invites = await guild.invites()
+            used, certain = self._used(gid, invites)
+            if used is not None and sum(used.values()) != len(self._pending.get(gid, ())):
+                # Diff ambigu (vague en cours, compteurs pas encore à jour) : on attend
+                await asyncio.sleep(self.window)
+                invites = await guild.invites()
+                used, certain = self._used(gid, invites)
+            inviters = self._commit(gid, invites, used)
+        except Exception as e:
+            logger.warning(f"Attribution des invitations impossible pour {gid}: {e}")
+        for future in self._pending.pop(gid, []):
+            if not future.done():
+                future.set_result((inviters, certain))
+
+    def _used(
+        self, guild_id: int, invites: List[discord.Invite]
+    ) -> Tuple[Optional[Dict[str, int]], bool]:
+        """(utilisations par code depuis l'instantané, certaines), sans modifier l'instantané.
+        None sans instantané de référence.
+        """
+        if guild_id not in self._uses:
+            return None, True
+        old = self._uses[guild_id]
+        meta = self._meta.get(guild_id, {})
+        used: Dict[str, int] = {}
+        for invite in invites:
+            delta = (invite.uses or 0) - old.get(invite.code, 0)
+            if delta > 0:
+                used[invite.code] = delta
+        if used:
+            return used, True
+        # Aucun compteur n'a bougé : une invitation disparue à une utilisation de sa limite
+        # a peut-être été épuisée par ces arrivées... ou supprimée par un modérateur
+        for code, uses in self._vanished.get(guild_id, {}).items():
+            max_uses = meta.get(code, (None, 0))[1]
+            if max_uses and uses + 1 >= max_uses:
+                used[code] = max_uses - uses
+        return used, not used
+
+    def _commit(
+        self, guild_id: int, invites: List[discord.Invite], used: Optional[Dict[str, int]]
+    ) -> List[str]:
+        """Enregistre le nouvel instantané et retourne les auteurs des invitations utilisées."""
+        meta = dict(self._meta.get(guild_id, {}))
+        self._vanished.pop(guild_id, None)
+        self._store(guild_id, invites)
+        if used is None:
+            return []  # pas d'instantané de référence : impossible de comparer
+        # Plusieurs joins par récupération : même auteur pour tous si un seul a progressé,
+        # sinon la liste des auteurs possibles
+        names: List[str] = []
+        for code in sorted(used, key=used.get, reverse=True):
+            name = meta.get(code, (None, 0))[0] or self._meta[guild_id].get(code, (None, 0))[0]
+            if name and name not in names:
+                names.append(name)
+        return names
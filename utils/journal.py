@@ -0,0 +1,264 @@
+"""Journal append-only segmenté (JSONL).
+
+Chaque ajout est une écriture de ligne en O(1) dans le segment actif. Quand le
+segment dépasse `max_segment_bytes`, il est scellé (et compressé en gzip si
+demandé) et un nouveau segment démarre. La lecture se fait du plus récent au
+plus ancien sans charger tout l'historique.
+"""
+from __future__ import annotations
+
+import gzip
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.jsonl(\.gz)?$")
+_INDEX_FILE = "index.json"
+_READ_BLOCK = 64 * 1024
+
+
+def _reverse_lines(path: str) -> Iterator[bytes]:
+    """Lit un fichier texte ligne par ligne en partant de la fin, par blocs."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0:
+            size = min(_READ_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + tail).split(b"\n")
+            tail = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+class ActionJournal:
+    """Journal d'actions persistant découpé en segments JSONL."""
+
+    def __init__(
+        self, directory: str, max_segment_bytes: int = 4 * 1024 * 1024, compress: bool = True
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._handle = None
+        os.makedirs(directory, exist_ok=True)
+        # Nombre de lignes par segment scellé, pour un total sans relecture
+        self._migrations: Dict[str, Dict[str, Any]] = {}
+        self._sealed_counts: Dict[str, int] = self._load_index()
+        self._recover()
+        self._active_seq = self._last_sequence() or 1
+        self._active_count = self._count_lines(self._segment_path(self._active_seq))
+
+    # ------ segments ------
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"segment-{seq:06d}.jsonl")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Segments existants (séquence, chemin), du plus ancien au plus récent."""
+        found = []
+        for name in os.listdir(self.directory):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                found.append((int(m.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _last_sequence(self) -> Optional[int]:
+        segments = self._segments()
+        if not segments:
+            return None
+        seq, path = segments[-1]
+        # Si le dernier segment est déjà scellé, on en ouvre un nouveau
+        sealed = path.endswith(".gz") or os.path.basename(path) in self._sealed_counts
+        return seq + 1 if sealed else seq
+
+    @staticmethod
+    def _count_lines(path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def _load_index(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, _INDEX_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._migrations = dict(data.get("migrations", {}))
+            return {str(k): int(v) for k, v in data.get("sealed", {}).items()}
+        except Exception:
+            return {}
+
+    def _save_index(self) -> None:
+        path = os.path.join(self.directory, _INDEX_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sealed": self._sealed_counts, "migrations": self._migrations}, f)
+        os.replace(tmp, path)
+
+    def _recover(self) -> None:
+        """Termine un scellement interrompu par un arrêt brutal.
+        Le .gz n'apparaît qu'une fois complet (os.replace) : un .jsonl qui a déjà son
+        .gz est un doublon et serait relu deux fois.
+        """
+        changed = False
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".gz.tmp"):
+                os.remove(path)  # compression inachevée, le .jsonl fait foi
+            elif _SEGMENT_RE.match(name) and not name.endswith(".gz"):
+                if os.path.exists(f"{path}.gz"):
+                    logger.warning(f"Segment {name} déjà scellé, copie non compressée supprimée")
+                    os.remove(path)
+        for _, path in self._segments():
+            name = os.path.basename(path)
+            if name.endswith(".gz") and name not in self._sealed_counts:
+                # Scellé, mais l'index n'a pas été enregistré avant l'arrêt
+                with gzip.open(path, "rb") as f:
+                    self._sealed_counts[name] = sum(1 for line in f if line.strip())
+                changed = True
+        if changed:
+            self._save_index()
+
+    def _seal_active(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        path = self._segment_path(self._active_seq)
+        sealed_name = os.path.basename(path)
+        if self.compress:
+            tmp = f"{path}.gz.tmp"
+            try:
+                with open(path, "rb") as src, open(tmp, "wb") as raw:
+                    with gzip.GzipFile(fileobj=raw, mode="wb", filename=sealed_name) as dst:
+                        shutil.copyfileobj(src, dst)
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                # Le .gz n'existe que complet ; un arrêt avant le remove est réparé par _recover
+                os.replace(tmp, f"{path}.gz")
+                os.remove(path)
+                sealed_name += ".gz"
+            except Exception as e:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                logger.warning(f"Compression impossible du segment {path}: {e}")
+        self._sealed_counts[sealed_name] = self._active_count
+        self._save_index()
+        self._active_seq += 1
+        self._active_count = 0
+
+    # ------ écriture ------
+    def append(self, record: Dict[str, Any]) -> bool:
+        """Ajoute une entrée en fin de journal. Retourne False en cas d'erreur."""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            try:
+                if self._handle is None:
+                    self._handle = open(self._segment_path(self._active_seq), "a", encoding="utf-8")
+                self._handle.write(line)
+                self._handle.flush()
+                self._active_count += 1
+                if self._handle.tell() >= self.max_segment_bytes:
+                    self._seal_active()
+                return True
+            except Exception as e:
+                logger.error(f"Erreur lors de l'ajout au journal {self.directory}: {e}")
+                return False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    # ------ lecture ------
+    def count(self) -> int:
+        """Nombre total d'entrées, sans relire les segments scellés."""
+        with self._lock:
+            return self._total()
+
+    def _total(self) -> int:  # appelant détenteur de self._lock
+        return sum(self._sealed_counts.values()) + self._active_count
+
+    def iter_reverse(self) -> Iterator[Dict[str, Any]]:
+        """Itère sur les entrées de la plus récente à la plus ancienne (lecture paresseuse)."""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            segments = self._segments()
+        for _, path in reversed(segments):
+            if path.endswith(".gz"):
+                # Segment scellé : taille bornée par max_segment_bytes
+                with gzip.open(path, "rb") as f:
+                    lines = reversed([line for line in f.read().split(b"\n") if line.strip()])
+            else:
+                lines = _reverse_lines(path)
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # ligne partielle ou corrompue
+
+    def latest(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Les `limit` entrées les plus récentes (toutes si limit est None).
+        La plus récente d'abord.
+        """
+        if limit is None:
+            return list(self.iter_reverse())
+        return list(itertools.islice(self.iter_reverse(), max(0, int(limit))))
+
+    # ------ migration ------
+    def migrate_from_json(self, json_path: str) -> bool:
+        """Importe une seule fois l'ancien fichier {"actions": [...]} (trié par timestamp).
+        Le fichier source est conservé sous <nom>.migrated. Retourne True si migré.
+        Relançable : l'avancement est noté dans l'index, une migration interrompue
+        reprend sans doublon et un renommage raté est simplement retenté.
+        """
+        if not os.path.exists(json_path):
+            return False
+        key = os.path.basename(json_path)
+        state = self._migrations.get(key)
+        if state is None or not state.get("done"):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"Migration impossible depuis {json_path}: {e}")
+                return False
+            actions = data.get("actions", []) if isinstance(data, dict) else []
+            actions = sorted(
+                (a for a in actions if isinstance(a, dict)), key=lambda a: a.get("timestamp") or ""
+            )
+            with self._lock:
+                if state is None:
+                    state = self._migrations[key] = {"start": self._total(), "done": False}
+                    self._save_index()
+                # Entrées déjà importées par une tentative interrompue
+                already = max(0, self._total() - int(state["start"]))
+            for action in actions[already:]:
+                if not self.append(action):
+                    return False
+            with self._lock:
+                state["done"] = True
+                self._save_index()
+            logger.info(
+                f"Migration de {len(actions) - already} action(s) depuis {json_path} "
+                f"vers {self.directory}"
+            )
+        try:
+            os.replace(json_path, f"{json_path}.migrated")
+        except Exception as e:
+            logger.warning(f"Impossible de renommer {json_path} après migration: {e}")
+        return True
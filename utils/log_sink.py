@@ -0,0 +1,222 @@
+"""Envoi groupé des embeds de log (admin, commandes, signalements, modération).
+
+Une file par salon : jusqu'à 10 embeds par message (limite Discord, et 6000
+caractères au total), envoyés dès que le lot est plein ou après
+FLUSH_INTERVAL secondes. Quand une file est pleine, les événements de faible
+priorité sont abandonnés en premier ; les autres attendent une place
+(backpressure) avant d'être abandonnés à leur tour. Un salon peut être servi
+par un webhook (clé LOG_WEBHOOKS de bot_config.json), qui a son propre quota.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import discord
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_EMBEDS = 10
+MAX_CHARS = 6000
+FLUSH_INTERVAL = 2.0
+QUEUE_LIMIT = 200  # embeds en attente par salon
+BACKPRESSURE_TIMEOUT = 5.0
+CLOSE_TIMEOUT = 10.0  # délai laissé aux workers pour vider leur file à l'arrêt
+
+LOW, NORMAL, HIGH = 0, 1, 2  # plus grand = plus important (même convention que utils/dm_outbox)
+
+
+class _ChannelQueue:
+    def __init__(self):
+        self.items: Deque[Tuple[int, discord.Embed]] = deque()
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+        self.space.set()
+        self.worker: Optional[asyncio.Task] = None
+
+
+class LogSink:
+    def __init__(
+        self,
+        bot: discord.Client,
+        webhooks: Optional[Dict[int, str]] = None,
+        flush_interval: float = FLUSH_INTERVAL,
+        queue_limit: int = QUEUE_LIMIT,
+    ):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.queue_limit = queue_limit
+        self._webhook_urls = {int(k): v for k, v in (webhooks or {}).items() if v}
+        self._webhooks: Dict[int, discord.Webhook] = {}
+        self._queues: Dict[int, _ChannelQueue] = {}
+        self._closing = asyncio.Event()
+        self.stats = {"queued": 0, "messages": 0, "embeds": 0, "dropped": 0, "errors": 0}
+
+    # ------ API ------
+    async def send(
+        self, channel_id: Optional[int], embed: discord.Embed, priority: int = NORMAL
+    ) -> bool:
+        """Met un embed en file pour `channel_id`. Retourne False s'il a été abandonné."""
+        if not channel_id:
+            return False
+        q = self._queue(int(channel_id))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BACKPRESSURE_TIMEOUT
+        # Boucle : d'autres appelants réveillés en même temps peuvent reprendre la place libérée
+        while len(q.items) >= self.queue_limit and not self._make_room(q, priority):
+            remaining = deadline - loop.time()
+            if priority <= LOW or remaining <= 0:
+                self.stats["dropped"] += 1
+                if priority > LOW:
+                    logger.warning(
+                        f"File de logs saturée pour le salon {channel_id}, événement abandonné"
+                    )
+                return False
+            # Backpressure : l'appelant attend que le worker libère de la place
+            q.space.clear()
+            try:
+                await asyncio.wait_for(q.space.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass  # le tour suivant constate le délai dépassé
+        q.items.append((priority, embed))
+        self.stats["queued"] += 1
+        q.ready.set()
+        return True
+
+    async def close(self) -> None:
+        """Envoie tout ce qui reste en file puis arrête les workers.
+        Chaque worker termine le lot en cours et vide sa file sans attendre
+        FLUSH_INTERVAL ; au-delà de CLOSE_TIMEOUT il est annulé.
+        """
+        self._closing.set()
+        workers = []
+        for q in self._queues.values():
+            q.ready.set()
+            if q.worker is not None and not q.worker.done():
+                workers.append(q.worker)
+        if workers:
+            _, late = await asyncio.wait(workers, timeout=CLOSE_TIMEOUT)
+            for task in late:
+                task.cancel()
+            if late:
+                logger.warning(f"{len(late)} worker(s) de logs annulé(s) à l'arrêt")
+        # Worker mort en route : ce qui reste en file est envoyé ici
+        for channel_id, q in list(self._queues.items()):
+            if q.worker is None or q.worker.done():
+                while q.items:
+                    await self._deliver(channel_id, self._take_batch(q))
+        self._queues.clear()
+
+    # ------ interne ------
+    def _queue(self, channel_id: int) -> _ChannelQueue:
+        q = self._queues.get(channel_id)
+        if q is None:
+            q = self._queues[channel_id] = _ChannelQueue()
+        if q.worker is None or q.worker.done():
+            q.worker = asyncio.create_task(self._run(channel_id, q))
+        return q
+
+    def _make_room(self, q: _ChannelQueue, priority: int) -> bool:
+        """Retire le plus ancien événement de priorité inférieure, s'il y en a un."""
+        for i, (p, _) in enumerate(q.items):
+            if p < priority:
+                del q.items[i]
+                self.stats["dropped"] += 1
+                return True
+        return False
+
+    def _take_batch(self, q: _ChannelQueue) -> List[discord.Embed]:
+        batch: List[discord.Embed] = []
+        size = 0
+        while q.items and len(batch) < MAX_EMBEDS:
+            embed = q.items[0][1]
+            if batch and size + len(embed) > MAX_CHARS:
+                break
+            q.items.popleft()
+            batch.append(embed)
+            size += len(embed)
+        if len(q.items) < self.queue_limit:
+            q.space.set()
+        return batch
+
+    async def _run(self, channel_id: int, q: _ChannelQueue) -> None:
+        while True:
+            await q.ready.wait()
+            if len(q.items) < MAX_EMBEDS and not self._closing.is_set():
+                # Laisse le lot se remplir un peu, sauf s'il est déjà complet ou à l'arrêt
+                try:
+                    await asyncio.wait_for(self._closing.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._take_batch(q)
+            if not q.items:
+                q.ready.clear()
+            if batch:
+                await self._deliver(channel_id, batch)
+            if self._closing.is_set() and not q.items:
+                return
+
+    async def _deliver(self, channel_id: int, batch: List[discord.Embed]) -> None:
+        if not batch:
+            return
+        try:
+            webhook = self._webhook(channel_id)
+            if webhook is not None:
+                await webhook.send(embeds=batch)
+            else:
+                channel = self.bot.get_channel(channel_id)
+                if channel is None:
+                    logger.warning(f"Salon de logs introuvable: {channel_id}")
+                    self.stats["dropped"] += len(batch)
+                    return
+                await channel.send(embeds=batch)
+            self.stats["messages"] += 1
+            self.stats["embeds"] += len(batch)
+        except discord.HTTPException as e:
+            self.stats["errors"] += 1
+            logger.error(
+                f"Erreur HTTP lors de l'envoi de {len(batch)} log(s) dans {channel_id}: {e}"
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Erreur inattendue lors de l'envoi des logs dans {channel_id}: {e}")
+
+    def _webhook(self, channel_id: int) -> Optional[discord.Webhook]:
+        url = self._webhook_urls.get(channel_id)
+        if url is None:
+            return None
+        webhook = self._webhooks.get(channel_id)
+        if webhook is None:
+            webhook = self._webhooks[channel_id] = discord.Webhook.from_url(url, client=self.bot)
+        return webhook
+
+
+_sink: Optional[LogSink] = None
+
+
+def start_log_sink(bot: discord.Client, webhooks: Optional[Dict[int, str]] = None) -> LogSink:
+    global _sink
+    if _sink is None:
+        _sink = LogSink(bot, webhooks)
+    return _sink
+
+
+def get_log_sink() -> LogSink:
+    if _sink is None:
+        raise RuntimeError("Le collecteur de logs n'est pas démarré")
+    return _sink
+
+
+async def send_log(channel_id: Optional[int], embed: discord.Embed, priority: int = NORMAL) -> bool:
+    """Raccourci : met un embed en file dans le collecteur partagé."""
+    return await get_log_sink().send(channel_id, embed, priority)
+
+
+async def close_log_sink() -> None:
+    global _sink
+    if _sink is not None:
+        await _sink.close()
+        _sink = None
@@ -1,21 +1,186 @@
+import atexit
+import gzip
+import json
 import logging
-from typing import Optional
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
 
 _DEFAULT_LEVEL = logging.INFO
 
+# Non-blocking pipeline: every named logger shares one QueueHandler, so the
+# event loop only pays for putting a record on a queue. A QueueListener thread
+# formats and writes the records to the console, a rotating gzip file and an
+# in-memory ring buffer (dumped by the owner-only +logs command).
+LOG_FILE = os.getenv("TOKIBOT_LOG_FILE", "logs/tokibot.log")  # empty string disables the file sink
+LOG_FORMAT = os.getenv("TOKIBOT_LOG_FORMAT", "text")  # console format: "text" or "json"
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+RING_CAPACITY = 2000
+# Per-logger sampling below WARNING: sustained rate and burst, in records per second
+SAMPLE_RATE = 20.0
+SAMPLE_BURST = 100
+
+_TEXT_FMT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+_DATE_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus exc/suppressed when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Token bucket per logger name for records below WARNING.
+    Dropped records are counted and reported on the next record that passes.
+    """
+
+    def __init__(self, rate: float = SAMPLE_RATE, burst: int = SAMPLE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}  # name -> [tokens, last update]
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        with self._lock:
+            if record.levelno < logging.WARNING:
+                now = time.monotonic()
+                bucket = self._buckets.setdefault(record.name, [float(self.burst), now])
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    self._suppressed[record.name] = self._suppressed.get(record.name, 0) + 1
+                    return False
+                bucket[0] -= 1
+            record.suppressed = self._suppressed.pop(record.name, 0)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now (the record crosses threads),
+        # but keep the traceback in exc_text so each sink formats it its own way.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` formatted records in memory."""
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        super().__init__()
+        self.records: Deque[str] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.records.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+_setup_lock = threading.Lock()
+_queue_handler: Optional[_QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_ring = RingBufferHandler()
+
+
+def _build_handlers() -> List[logging.Handler]:
+    text = logging.Formatter(fmt=_TEXT_FMT, datefmt=_DATE_FMT)
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else text)
+    _ring.setFormatter(text)
+    handlers: List[logging.Handler] = [console, _ring]
+    if LOG_FILE:
+        try:
+            if os.path.dirname(LOG_FILE):
+                os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+            )
+            file_handler.namer = lambda name: name + ".gz"
+            file_handler.rotator = _gzip_rotator
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            sys.stderr.write(f"Log file disabled ({LOG_FILE}): {e}\n")
+    return handlers
+
+
+def _ensure_pipeline() -> _QueueHandler:
+    global _queue_handler, _listener
+    if _queue_handler is not None:
+        return _queue_handler
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            handler = _QueueHandler(log_queue)
+            handler.addFilter(SamplingFilter())
+            _listener = logging.handlers.QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+            _queue_handler = handler
+    return _queue_handler
+
+
+def stop_logging() -> None:
+    """Drain the queue and stop the listener thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def get_logger(name: Optional[str] = None, level: int = _DEFAULT_LEVEL) -> logging.Logger:
-    """Return a configured logger with a simple, consistent format.
+    """Return a logger attached to the shared non-blocking pipeline.
     Safe to call multiple times; handlers won't multiply.
     """
     logger = logging.getLogger(name if name else "tokibot")
     logger.setLevel(level)
 
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        fmt = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
-        datefmt = "%Y-%m-%d %H:%M:%S"
-        handler.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+    handler = _ensure_pipeline()
+    if handler not in logger.handlers:
         logger.addHandler(handler)
 
     return logger
+
+
+def recent_logs(limit: Optional[int] = None) -> List[str]:
+    """The last `limit` records held by the ring buffer (all of them by default)."""
+    records = list(_ring.records)
+    return records[-limit:] if limit else records
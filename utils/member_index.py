@@ -0,0 +1,128 @@
+"""Index des noms de membres par serveur.
+
+Clés en casefold (name, display_name, global_name) -> ids des membres, plus une
+liste triée des clés pour les recherches par préfixe (bisect). L'index d'un
+serveur est construit à la première recherche puis tenu à jour par les
+événements join/leave/update.
+"""
+from __future__ import annotations
+
+import bisect
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import discord
+
+
+class NameMatch(NamedTuple):
+    """Résultat d'une recherche : ids des correspondances exactes, sinon par préfixe."""
+
+    exact: List[int]
+    prefix: List[int]
+
+    @property
+    def unique(self) -> Optional[int]:
+        """L'id si exactement un membre porte ce nom, sinon None."""
+        return self.exact[0] if len(self.exact) == 1 else None
+
+    @property
+    def ambiguous(self) -> bool:
+        return len(self.exact) > 1
+
+
+def _keys(member: discord.Member) -> Tuple[str, ...]:
+    names = {member.name, member.display_name, getattr(member, "global_name", None)}
+    return tuple(sorted(n.casefold() for n in names if n))
+
+
+class MemberNameIndex:
+    def __init__(self):
+        self._names: Dict[int, Dict[str, Set[int]]] = {}
+        self._sorted: Dict[int, List[str]] = {}
+        self._member_keys: Dict[int, Dict[int, Tuple[str, ...]]] = {}
+
+    def is_built(self, guild_id: int) -> bool:
+        return guild_id in self._names
+
+    def build(self, guild: discord.Guild) -> None:
+        """(Re)construit l'index d'un serveur depuis le cache des membres."""
+        self._names[guild.id] = {}
+        self._sorted[guild.id] = []
+        self._member_keys[guild.id] = {}
+        for member in guild.members:
+            self.add(member)
+
+    def drop(self, guild_id: int) -> None:
+        self._names.pop(guild_id, None)
+        self._sorted.pop(guild_id, None)
+        self._member_keys.pop(guild_id, None)
+
+    # ------ mises à jour ------
+    def add(self, member: discord.Member) -> None:
+        gid = member.guild.id
+        if gid not in self._names:
+            return  # serveur pas encore indexé : il le sera à la première recherche
+        self.remove(member)
+        keys = _keys(member)
+        self._member_keys[gid][member.id] = keys
+        names, ordered = self._names[gid], self._sorted[gid]
+        for key in keys:
+            ids = names.get(key)
+            if ids is None:
+                names[key] = {member.id}
+                bisect.insort(ordered, key)
+            else:
+                ids.add(member.id)
+
+    def remove(self, member: discord.abc.Snowflake, guild_id: Optional[int] = None) -> None:
+        gid = guild_id if guild_id is not None else member.guild.id
+        keys = self._member_keys.get(gid, {}).pop(member.id, None)
+        if not keys:
+            return
+        names, ordered = self._names[gid], self._sorted[gid]
+        for key in keys:
+            ids = names.get(key)
+            if ids is None:
+                continue
+            ids.discard(member.id)
+            if not ids:
+                del names[key]
+                pos = bisect.bisect_left(ordered, key)
+                if pos < len(ordered) and ordered[pos] == key:
+                    del ordered[pos]
+
+    def refresh_user(self, user: discord.abc.Snowflake, guilds: Iterable[discord.Guild]) -> None:
+        """Réindexe un utilisateur (changement de pseudo global) dans les serveurs indexés."""
+        for guild in guilds:
+            if guild.id in self._names:
+                member = guild.get_member(user.id)
+                if member is not None:
+                    self.add(member)
+
+    # ------ recherche ------
+    def find(self, guild: discord.Guild, query: str, limit: int = 10) -> NameMatch:
+        """Correspondances exactes (casefold) et, à défaut, jusqu'à `limit` par préfixe."""
+        if guild.id not in self._names:
+            self.build(guild)
+        key = query.casefold()
+        names = self._names[guild.id]
+        exact = sorted(names.get(key, ()))
+        if exact:
+            return NameMatch(exact, [])
+        ordered = self._sorted[guild.id]
+        prefix: List[int] = []
+        seen: Set[int] = set()
+        pos = bisect.bisect_left(ordered, key)
+        while pos < len(ordered) and ordered[pos].startswith(key) and len(prefix) < limit:
+            for mid in sorted(names[ordered[pos]]):
+                if mid not in seen and len(prefix) < limit:
+                    seen.add(mid)
+                    prefix.append(mid)
+            pos += 1
+        return NameMatch([], prefix)
+
+
+_index = MemberNameIndex()
+
+
+def get_member_index() -> MemberNameIndex:
+    return _index
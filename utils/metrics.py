@@ -0,0 +1,251 @@
+"""Registre de métriques interne : compteurs, jauges et histogrammes à paliers fixes.
+
+Chaque métrique est indexée par un jeu d'étiquettes (ex. command="ban").
+Utilisable depuis les threads d'E/S (verrou interne). Rendu au format texte
+Prometheus pour /metrics, et résumé lisible pour /health.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Paliers en secondes, des opérations en mémoire aux appels REST lents
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(names: Sequence[str], values: LabelKey, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = lock
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class _Series:
+    def __init__(self, size: int):
+        self.counts = [0] * size  # dernier palier = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], lock: threading.Lock,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames, lock)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelKey, _Series] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            s = self.series.get(key)
+            if s is None:
+                s = self.series[key] = _Series(len(self.buckets) + 1)
+            s.counts[bisect.bisect_left(self.buckets, value)] += 1
+            s.count += 1
+            s.sum += value
+            s.max = max(s.max, value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, key: LabelKey) -> float:
+        """Estimation par le palier : borne haute du palier contenant le q-ième quantile."""
+        with self._lock:
+            s = self.series.get(key)
+            if s is None or not s.count:
+                return 0.0
+            target = q * s.count
+            seen = 0
+            for i, n in enumerate(s.counts):
+                seen += n
+                if seen >= target:
+                    return self.buckets[i] if i < len(self.buckets) else s.max
+            return s.max
+
+    def snapshot(self) -> Dict[LabelKey, Tuple[int, float, float]]:
+        """{étiquettes: (nombre, somme, max)}"""
+        with self._lock:
+            return {k: (s.count, s.sum, s.max) for k, s in self.series.items()}
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, s in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), s.counts, strict=True):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {round(s.sum, 6)}")
+                lines.append(f"{self.name}_count{labels} {s.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, labelnames, self._lock, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Métrique {name} déjà enregistrée avec un autre type")
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+# Métriques partagées (commandes et stockage)
+COMMAND_LATENCY = _registry.histogram(
+    "tokibot_command_latency_seconds", "Durée d'exécution des commandes", ("kind", "command")
+)
+COMMAND_TOTAL = _registry.counter(
+    "tokibot_command_total", "Commandes exécutées par issue", ("kind", "command", "status")
+)
+COMMAND_ERRORS = _registry.counter(
+    "tokibot_command_errors_total", "Erreurs de commande par classe", ("kind", "command", "error")
+)
+COMMAND_COOLDOWNS = _registry.counter(
+    "tokibot_command_cooldown_total", "Invocations refusées par un cooldown", ("kind", "command")
+)
+STORAGE_LATENCY = _registry.histogram(
+    "tokibot_storage_latency_seconds", "Durée des opérations de stockage JSON", ("op", "file")
+)
+
+
+def _top_series(hist: Histogram, limit: int) -> List[Tuple[LabelKey, int, float, float]]:
+    """Séries triées par temps cumulé décroissant : (étiquettes, nombre, moyenne, p95)."""
+    rows = []
+    for key, (count, total, _) in hist.snapshot().items():
+        if count:
+            rows.append((key, count, total, total / count))
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return [(key, count, avg, hist.quantile(0.95, key)) for key, count, _, avg in rows[:limit]]
+
+
+def command_summary(limit: int = 5) -> List[str]:
+    """Commandes qui cumulent le plus de temps, avec erreurs et refus par cooldown."""
+    errors: Dict[Tuple[str, str], float] = {}
+    with _registry._lock:
+        for (kind, name, _), n in COMMAND_ERRORS.values.items():
+            errors[(kind, name)] = errors.get((kind, name), 0) + n
+        cooldowns = dict(COMMAND_COOLDOWNS.values)
+    lines = []
+    for (kind, name), count, avg, p95 in _top_series(COMMAND_LATENCY, limit):
+        extra = ""
+        if errors.get((kind, name)):
+            extra += f", {int(errors[(kind, name)])} err."
+        if cooldowns.get((kind, name)):
+            extra += f", {int(cooldowns[(kind, name)])} cooldown"
+        lines.append(
+            f"{name} ({kind}) ×{count} moy {avg * 1000:.0f} ms p95 ≤{p95 * 1000:.0f} ms{extra}"
+        )
+    return lines
+
+
+def storage_summary(limit: int = 5) -> List[str]:
+    """Fichiers et opérations de stockage qui cumulent le plus de temps."""
+    return [
+        f"{file} [{op}] ×{count} moy {avg * 1000:.1f} ms p95 ≤{p95 * 1000:.0f} ms"
+        for (op, file), count, avg, p95 in _top_series(STORAGE_LATENCY, limit)
+    ]
+
+
+def error_summary(limit: int = 5) -> List[str]:
+    """Classes d'erreur les plus fréquentes, toutes commandes confondues."""
+    totals: Dict[str, float] = {}
+    with _registry._lock:
+        for (_, _, error), n in COMMAND_ERRORS.values.items():
+            totals[error] = totals.get(error, 0) + n
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [f"{error} ×{int(n)}" for error, n in ranked]
@@ -0,0 +1,54 @@
+"""Couche de persistance asynchrone.
+
+Les lectures/écritures de fichiers s'exécutent dans un exécuteur borné, hors de
+la boucle asyncio, derrière un verrou asyncio par chemin : une grosse sauvegarde
+ne retarde ni les heartbeats de la gateway ni les fichiers sans rapport.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from utils.config import read_json, write_json
+
+T = TypeVar("T")
+
+IO_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="tokibot-io")
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def path_lock(path: str) -> asyncio.Lock:
+    """Verrou asyncio propre à un fichier (créé à la demande)."""
+    lock = _locks.get(path)
+    if lock is None:
+        lock = _locks[path] = asyncio.Lock()
+    return lock
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Exécute une fonction bloquante (fichier, SQLite...) dans l'exécuteur d'E/S."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def read_json_async(
+    path: str, default_content: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Équivalent asynchrone de utils.config.read_json."""
+    async with path_lock(path):
+        return await run_io(read_json, path, default_content)
+
+
+async def write_json_async(path: str, data: Dict[str, Any]) -> bool:
+    """Équivalent asynchrone de utils.config.write_json.
+    Les écritures d'un même fichier sont appliquées dans l'ordre d'appel. La copie
+    du document est prise ici, sur la boucle : un worker qui la prendrait pendant
+    que la boucle modifie encore le dict verrait un état incohérent. L'écriture
+    disque reste faite par le thread de write_json (écriture différée).
+    """
+    async with path_lock(path):
+        return write_json(path, data)
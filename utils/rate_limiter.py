@@ -0,0 +1,109 @@
+"""Limiteur de débit en mémoire (fenêtre glissante) avec quotas par serveur.
+
+Le chemin critique (check) ne fait aucune E/S. L'état peut être exporté
+(snapshot) puis restauré pour survivre à un redémarrage.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+Key = Tuple[int, int]  # (guild_id ou 0, user_id) ; 0 = historique hérité, sans serveur
+
+
+class SlidingWindowLimiter:
+    """Au plus `limit` actions par utilisateur sur les `window` dernières secondes."""
+
+    def __init__(self, limit: int, window: int, idle_ttl: Optional[int] = None):
+        self.default_quota = (int(limit), int(window))
+        # Durée d'inactivité après laquelle un utilisateur est oublié (au moins la fenêtre)
+        self.idle_ttl = idle_ttl
+        self._guild_quotas: Dict[int, Tuple[int, int]] = {}
+        self._hits: Dict[Key, Deque[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    # ------ quotas ------
+    def set_quota(self, guild_id: int, limit: int, window: int) -> None:
+        self._guild_quotas[int(guild_id)] = (max(1, int(limit)), max(1, int(window)))
+
+    def reset_quota(self, guild_id: int) -> None:
+        self._guild_quotas.pop(int(guild_id), None)
+
+    def quota(self, guild_id: Optional[int]) -> Tuple[int, int]:
+        return self._guild_quotas.get(int(guild_id or 0), self.default_quota)
+
+    # ------ chemin critique ------
+    def check(
+        self,
+        user_id: int,
+        guild_id: Optional[int] = None,
+        consume: bool = True,
+        now: Optional[float] = None,
+    ) -> Tuple[bool, int]:
+        """Retourne (autorisé, secondes avant la prochaine place libre).
+        Si consume=False, ne consomme pas de quota (mode aperçu).
+        """
+        now = time.time() if now is None else now
+        limit, window = self.quota(guild_id)
+        key = (int(guild_id or 0), int(user_id))
+        hits = self._hits.get(key)
+        if hits is None and key[0]:
+            # Historique sans serveur (ancien limiteur global) : repris par le premier serveur
+            hits = self._hits.pop((0, key[1]), None)
+            if hits is not None:
+                self._hits[key] = hits
+        if hits is not None:
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+        if hits and len(hits) >= limit:
+            return False, max(1, math.ceil(hits[0] + window - now))
+        if consume:
+            if hits is None:
+                hits = self._hits[key] = deque()
+            hits.append(now)
+        return True, 0
+
+    # ------ entretien ------
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Oublie les utilisateurs sans action récente. Retourne le nombre d'entrées retirées."""
+        now = time.time() if now is None else now
+        stale = []
+        for key, hits in self._hits.items():
+            window = self.quota(key[0])[1]
+            ttl = max(window, self.idle_ttl or 0)
+            if not hits or hits[-1] <= now - ttl:
+                stale.append(key)
+        for key in stale:
+            del self._hits[key]
+        return len(stale)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État sérialisable en JSON (quotas et horodatages encore dans leur fenêtre)."""
+        self.evict_idle()
+        return {
+            "guild_quotas": {
+                str(g): {"limit": q[0], "window": q[1]} for g, q in self._guild_quotas.items()
+            },
+            "hits": {
+                f"{g}:{u}": [round(t, 3) for t in hits] for (g, u), hits in self._hits.items()
+            },
+        }
+
+    def restore(self, data: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Recharge un état produit par snapshot()."""
+        for gid, q in (data.get("guild_quotas") or {}).items():
+            try:
+                self.set_quota(int(gid), int(q["limit"]), int(q["window"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        for raw_key, stamps in (data.get("hits") or {}).items():
+            try:
+                g, u = (int(x) for x in raw_key.split(":", 1))
+                self._hits[(g, u)] = deque(sorted(float(t) for t in stamps))
+            except (TypeError, ValueError):
+                continue
+        self.evict_idle(now)
@@ -0,0 +1,201 @@
+"""Planificateur de tâches différées à base de tas-min.
+
+Une seule tâche asyncio dort jusqu'à la prochaine échéance (pas de scrutation
+périodique). Les tâches sont persistées : après un redémarrage, celles dont
+l'échéance est passée sont exécutées immédiatement. Les rafales d'échéances
+sont traitées en parallèle, dans la limite de `max_concurrency`.
+
+Une tâche est un dictionnaire JSON :
+{"key", "kind", "due", "guild_id", "payload", "attempts"}
+La clé est unique : replanifier une clé remplace la tâche précédente.
+Une tâche dont le type n'a pas (encore) de handler est mise de côté et
+relancée dès que le handler est enregistré.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from utils.logger import get_logger
+from utils.persistence import read_json_async, run_io, write_json_async
+
+logger = get_logger(__name__)
+
+Job = Dict[str, Any]
+Handler = Callable[[Job], Awaitable[None]]
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60  # secondes, multiplié par le nombre d'essais
+
+
+class TimerScheduler:
+    """File persistante de tâches datées, exécutées par des handlers enregistrés par type."""
+
+    def __init__(self, path: str, max_concurrency: int = 5):
+        self.path = path
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str, Job]] = []
+        self._seq = itertools.count()
+        self._handlers: Dict[str, Handler] = {}
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._parked: Dict[str, List[Job]] = {}  # type -> tâches échues sans handler
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+        for job in self._parked.pop(kind, []):
+            if self._jobs.get(job["key"]) is job:
+                self._push(job)
+        self._wakeup.set()
+
+    def unregister(self, kind: str) -> None:
+        self._handlers.pop(kind, None)
+
+    # ------ persistance ------
+    async def load(self) -> int:
+        """Recharge la file depuis le disque. Retourne le nombre de tâches chargées."""
+        data = await read_json_async(self.path, {"jobs": []})
+        for job in data.get("jobs", []) if isinstance(data, dict) else []:
+            try:
+                self._push(self._normalize(job))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Tâche planifiée invalide ignorée dans {self.path}: {job}")
+        self._wakeup.set()
+        return len(self._jobs)
+
+    async def absorb(self, path: str) -> int:
+        """Importe une seule fois les tâches d'une autre file (fichier renommé en <nom>.migrated).
+        Les clés déjà présentes sont conservées. Retourne le nombre de tâches importées.
+        """
+        if not await run_io(os.path.exists, path):
+            return 0
+        data = await read_json_async(path, {"jobs": []})
+        count = 0
+        for job in data.get("jobs", []) if isinstance(data, dict) else []:
+            try:
+                job = self._normalize(job)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if job["key"] not in self._jobs:
+                self._push(job)
+                count += 1
+        await self.save()
+        await run_io(os.replace, path, f"{path}.migrated")
+        self._wakeup.set()
+        return count
+
+    async def save(self) -> bool:
+        return await write_json_async(self.path, {"jobs": list(self._jobs.values())})
+
+    @staticmethod
+    def _normalize(job: Job) -> Job:
+        return {
+            "key": str(job["key"]),
+            "kind": str(job["kind"]),
+            "due": float(job["due"]),
+            "guild_id": int(job["guild_id"]) if job.get("guild_id") else None,
+            "payload": dict(job.get("payload") or {}),
+            "attempts": int(job.get("attempts") or 0),
+        }
+
+    # ------ API ------
+    async def schedule(
+        self, kind: str, due: float, key: str, guild_id: Optional[int] = None, **payload: Any
+    ) -> Job:
+        """Planifie (ou replanifie) la tâche `key` à l'instant epoch `due`."""
+        job = self._normalize({"key": key, "kind": kind, "due": due, "guild_id": guild_id, "payload": payload})
+        self._push(job)
+        await self.save()
+        self._wakeup.set()
+        return job
+
+    async def cancel(self, key: str) -> bool:
+        """Annule une tâche en attente. Retourne False si elle n'existe pas."""
+        if self._jobs.pop(key, None) is None:
+            return False
+        await self.save()
+        return True
+
+    def get(self, key: str) -> Optional[Job]:
+        return self._jobs.get(key)
+
+    def pending(self, kind: Optional[str] = None) -> List[Job]:
+        """Tâches en attente, par échéance croissante."""
+        jobs = [j for j in self._jobs.values() if kind is None or j["kind"] == kind]
+        return sorted(jobs, key=lambda j: j["due"])
+
+    def start(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        for task in list(self._running):
+            task.cancel()
+        await self.save()
+
+    # ------ boucle ------
+    def _push(self, job: Job) -> None:
+        self._jobs[job["key"]] = job
+        # Les entrées remplacées ou annulées restent dans le tas et sont ignorées au dépilement
+        heapq.heappush(self._heap, (job["due"], next(self._seq), job["key"], job))
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key, job = heapq.heappop(self._heap)
+                if self._jobs.get(key) is not job:
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: Job) -> None:
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            # Cog pas encore chargé (ou déchargé) : la tâche reste persistée et attend son handler
+            self._parked.setdefault(job["kind"], []).append(job)
+            return
+        async with self._sem:
+            try:
+                await handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._jobs.get(job["key"]) is not job:
+                    return  # replanifiée ou annulée pendant l'exécution
+                job["attempts"] += 1
+                if job["attempts"] < MAX_ATTEMPTS:
+                    logger.warning(f"Tâche {job['key']} en échec ({e}), nouvel essai planifié")
+                    job["due"] = time.time() + RETRY_DELAY * job["attempts"]
+                    self._push(job)
+                    self._wakeup.set()
+                    await self.save()
+                    return
+                logger.error(f"Tâche {job['key']} abandonnée après {job['attempts']} essai(s): {e}")
+        # Retirée seulement une fois traitée : un arrêt en cours d'exécution la rejoue au démarrage
+        if self._jobs.get(job["key"]) is job:
+            del self._jobs[job["key"]]
+            await self.save()
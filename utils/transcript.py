@@ -0,0 +1,131 @@
+"""Transcriptions de threads écrites au fil de l'eau.
+
+Les messages sont écrits ligne par ligne, au rythme des pages d'historique,
+dans des fichiers temporaires (en mémoire jusqu'à SPOOL_SIZE, sur disque
+au-delà). Chaque partie reste sous la limite d'upload ; s'il en faut
+plusieurs, une version gzip unique est tentée et utilisée si elle tient dans
+la limite. Dès qu'une partie peut déborder sur disque, les écritures (et la
+compression) passent par l'exécuteur d'E/S, hors de la boucle.
+"""
+from __future__ import annotations
+
+import gzip
+import shutil
+from datetime import timezone
+from tempfile import SpooledTemporaryFile
+from typing import List, Optional
+
+import discord
+
+from utils.persistence import run_io
+
+SPOOL_SIZE = 1024 * 1024
+DEFAULT_UPLOAD_LIMIT = 8 * 1024 * 1024
+UPLOAD_MARGIN = 64 * 1024  # place pour le reste de la requête multipart
+HISTORY_BATCH = 100  # messages écrits d'un coup (une page d'historique)
+
+
+def format_message(message: discord.Message) -> str:
+    """Une ligne de transcription, avec pièces jointes et résumé des embeds."""
+    ts = message.created_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    parts = [f"[{ts}] {message.author} ({message.author.id}): {message.content or ''}"]
+    for att in message.attachments:
+        parts.append(f"    [pièce jointe] {att.filename} ({att.size} o) {att.url}")
+    for embed in message.embeds:
+        summary = " - ".join(s for s in (embed.title, (embed.description or "")[:200]) if s)
+        parts.append(f"    [embed] {summary or '(sans texte)'}")
+    return "\n".join(parts)
+
+
+class TranscriptWriter:
+    def __init__(self, basename: str, upload_limit: Optional[int] = None):
+        self.basename = basename
+        self.limit = max(1024, (upload_limit or DEFAULT_UPLOAD_LIMIT) - UPLOAD_MARGIN)
+        self._parts: List[SpooledTemporaryFile] = []
+        self._size = 0
+        self.lines = 0
+        self.total_bytes = 0
+
+    def _new_part(self) -> None:
+        self._parts.append(SpooledTemporaryFile(max_size=SPOOL_SIZE))
+        self._size = 0
+
+    def write(self, line: str) -> None:
+        data = (line + "\n").encode("utf-8")
+        if len(data) > self.limit:
+            # Coupe sur une frontière de caractère : jamais de séquence UTF-8 tronquée
+            head = data[: self.limit - 1].decode("utf-8", "ignore").encode("utf-8")
+            data = head + b"\n"
+        if not self._parts or self._size + len(data) > self.limit:
+            self._new_part()
+        self._parts[-1].write(data)
+        self._size += len(data)
+        self.total_bytes += len(data)
+        self.lines += 1
+
+    def write_lines(self, lines: List[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    async def _flush_batch(self, batch: List[str]) -> None:
+        # En mémoire tant que la partie ne peut pas dépasser SPOOL_SIZE, sinon sur disque
+        pending = sum(len(line) * 4 + 1 for line in batch)  # majorant en octets UTF-8
+        if self._size + pending <= SPOOL_SIZE:
+            self.write_lines(batch)
+        else:
+            await run_io(self.write_lines, batch)
+
+    async def write_history(self, channel: discord.abc.Messageable) -> None:
+        batch: List[str] = []
+        async for message in channel.history(limit=None, oldest_first=True):
+            batch.append(format_message(message))
+            if len(batch) >= HISTORY_BATCH:
+                await self._flush_batch(batch)
+                batch = []
+        if batch:
+            await self._flush_batch(batch)
+
+    def _gzip_all(self) -> Optional[SpooledTemporaryFile]:
+        """Toutes les parties dans un seul .gz, ou None s'il dépasse la limite."""
+        out = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        with gzip.GzipFile(fileobj=out, mode="wb", filename=f"{self.basename}.txt") as gz:
+            for part in self._parts:
+                part.seek(0)
+                shutil.copyfileobj(part, gz)
+        if out.tell() > self.limit:
+            out.close()
+            return None
+        return out
+
+    def files(self) -> List[discord.File]:
+        """Fichiers prêts à l'envoi (à n'appeler qu'une fois l'écriture terminée)."""
+        if not self._parts:
+            self.write("(Aucun message)")
+        if len(self._parts) > 1:
+            packed = self._gzip_all()
+            if packed is not None:
+                for part in self._parts:
+                    part.close()
+                self._parts = [packed]
+                packed.seek(0)
+                return [discord.File(packed, filename=f"{self.basename}.txt.gz")]
+        files = []
+        for i, part in enumerate(self._parts, 1):
+            part.seek(0)
+            suffix = f"_partie{i}" if len(self._parts) > 1 else ""
+            files.append(discord.File(part, filename=f"{self.basename}{suffix}.txt"))
+        return files
+
+    def close(self) -> None:
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+
+async def send_transcript(
+    channel: discord.abc.Messageable, writer: TranscriptWriter, content: str
+) -> None:
+    """Envoie la transcription : une partie par message, la limite s'appliquant à la requête."""
+    files = await run_io(writer.files)  # compression et lectures éventuelles sur disque
+    for i, file in enumerate(files):
+        await channel.send(content=content if i == 0 else None, file=file)
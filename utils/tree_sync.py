@@ -0,0 +1,106 @@
+"""Synchronisation de l'arbre des commandes slash, seulement quand il a changé.
+
+L'empreinte est un SHA-256 de la charge utile que tree.sync() enverrait (plus
+l'id de l'application) ; elle est conservée dans SYNC_STATE_FILE par cible
+(global ou serveur). Au démarrage, si l'empreinte est identique, la
+synchronisation est sautée. `+sync` force une synchronisation.
+
+Mode développement : si DEV_GUILD_IDS (bot_config.json) n'est pas vide, les
+commandes globales sont copiées et synchronisées dans ces serveurs, ce qui est
+instantané, au lieu d'une synchronisation globale.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.config import get_bot_config
+from utils.logger import get_logger
+from utils.persistence import read_json_async, write_json_async
+
+logger = get_logger(__name__)
+
+SYNC_STATE_FILE = "command_sync.json"
+
+
+def dev_guild_ids() -> List[int]:
+    return [int(g) for g in get_bot_config().get("DEV_GUILD_IDS", []) or []]
+
+
+def _payload(
+    tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]
+) -> List[Dict[str, Any]]:
+    payload = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            payload.append(command.to_dict())  # discord.py < 2.4
+    return sorted(payload, key=lambda c: (c.get("type", 1), c["name"]))
+
+
+def tree_fingerprint(bot: commands.Bot, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    body = {"application_id": bot.application_id, "commands": _payload(bot.tree, guild)}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def _sync_target(
+    bot: commands.Bot, state: Dict[str, Any], guild: Optional[discord.abc.Snowflake], force: bool
+) -> Tuple[str, int, float]:
+    """Synchronise une cible. Retourne (décision, nombre de commandes, durée en secondes)."""
+    key = f"guild:{guild.id}" if guild else "global"
+    fingerprint = tree_fingerprint(bot, guild)
+    entry = state.get(key) or {}
+    if not force and entry.get("hash") == fingerprint:
+        return "inchangé", len(_payload(bot.tree, guild)), 0.0
+    t0 = time.perf_counter()
+    synced = await bot.tree.sync(guild=guild)
+    duration = time.perf_counter() - t0
+    state[key] = {"hash": fingerprint, "synced_at": datetime.now(timezone.utc).isoformat()}
+    return "forcé" if force else "synchronisé", len(synced), duration
+
+
+async def sync_tree(
+    bot: commands.Bot, force: bool = False, guild_ids: Optional[List[int]] = None
+) -> List[str]:
+    """Synchronise l'arbre (global, ou serveurs de développement) si son empreinte a changé.
+    Seuls les serveurs de DEV_GUILD_IDS reçoivent une copie des commandes globales.
+
+    Retourne une ligne de résumé par cible ; chaque décision est journalisée.
+    """
+    state = await read_json_async(SYNC_STATE_FILE, {})
+    dev_ids = dev_guild_ids()
+    if guild_ids is None:
+        guild_ids = dev_ids
+    stray = [g for g in guild_ids if g not in dev_ids]
+    if stray:
+        # Les commandes globales y apparaîtraient en double
+        raise ValueError(f"Serveur(s) hors DEV_GUILD_IDS : {stray}")
+    targets: List[Optional[discord.Object]] = [discord.Object(id=g) for g in guild_ids] or [None]
+    lines = []
+    for guild in targets:
+        label = f"serveur {guild.id}" if guild else "global"
+        if guild is not None:
+            bot.tree.copy_global_to(guild=guild)
+        try:
+            decision, count, duration = await _sync_target(bot, state, guild, force)
+        except Exception as e:
+            logger.exception(f"[SYNC] ❌ Erreur lors de la synchronisation ({label})")
+            lines.append(f"❌ {label} : {e}")
+            continue
+        if decision == "inchangé":
+            line = f"{label} : arbre inchangé ({count} commandes), synchronisation sautée"
+        else:
+            line = f"{label} : {count} commandes {decision}es en {duration:.2f}s"
+        logger.info(f"[SYNC] {line}")
+        lines.append(line)
+    await write_json_async(SYNC_STATE_FILE, state)
+    return lines
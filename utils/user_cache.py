@@ -0,0 +1,147 @@
+"""Résolution des utilisateurs par id.
+
+Ordre de recherche : cache du client (`bot.get_user`), puis cache LRU à durée
+de vie limitée, puis `fetch_user`. Les ids manquants d'une liste sont récupérés
+en parallèle avec une concurrence bornée, et deux demandes simultanées pour le
+même id partagent la même requête. Les ids introuvables (NotFound) sont aussi
+mémorisés pour ne pas être redemandés à chaque affichage.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import discord
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+USER_TTL = 3600
+MAX_USERS = 2000
+FETCH_CONCURRENCY = 5
+
+
+class UserResolver:
+    def __init__(
+        self, ttl: float = USER_TTL, max_size: int = MAX_USERS, concurrency: int = FETCH_CONCURRENCY
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache: "OrderedDict[int, Tuple[float, Optional[discord.User]]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"client_hits": 0, "cache_hits": 0, "fetches": 0, "not_found": 0, "errors": 0}
+
+    # ------ cache ------
+    def _cached(self, user_id: int) -> Tuple[bool, Optional[discord.User]]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        expires, user = entry
+        if expires <= time.monotonic():
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, user
+
+    def _store(self, user_id: int, user: Optional[discord.User]) -> None:
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id, None)
+
+    def hit_ratio(self) -> float:
+        hits = self.stats["client_hits"] + self.stats["cache_hits"]
+        total = hits + self.stats["fetches"]
+        return hits / total if total else 0.0
+
+    # ------ résolution ------
+    def _local(
+        self, bot: discord.Client, user_id: int, fetched: bool
+    ) -> Tuple[bool, Optional[discord.User]]:
+        if not fetched:
+            user = bot.get_user(user_id)
+            if user is not None:
+                self.stats["client_hits"] += 1
+                return True, user
+        found, user = self._cached(user_id)
+        if found:
+            self.stats["cache_hits"] += 1
+        return found, user
+
+    async def resolve(
+        self, bot: discord.Client, user_id: int, fetched: bool = False
+    ) -> Optional[discord.User]:
+        """L'utilisateur, ou None s'il est introuvable ou si la requête échoue.
+
+        `fetched=True` ignore le cache du client, dont les objets n'ont pas de
+        bannière : seul un utilisateur issu de fetch_user convient.
+        """
+        user_id = int(user_id)
+        found, user = self._local(bot, user_id, fetched)
+        if found:
+            return user
+        return await self._fetch(bot, user_id)
+
+    async def resolve_many(
+        self, bot: discord.Client, user_ids: Iterable[int]
+    ) -> Dict[int, Optional[discord.User]]:
+        """Résout une liste d'ids : les absents des caches sont récupérés en parallèle."""
+        result: Dict[int, Optional[discord.User]] = {}
+        missing = []
+        for uid in dict.fromkeys(int(u) for u in user_ids):
+            found, user = self._local(bot, uid, False)
+            if found:
+                result[uid] = user
+            else:
+                missing.append(uid)
+        if missing:
+            users = await asyncio.gather(*(self._fetch(bot, uid) for uid in missing))
+            result.update(zip(missing, users, strict=True))
+        logger.debug(
+            f"{len(result)} utilisateur(s) résolu(s), {len(missing)} requête(s) ; "
+            f"taux de succès du cache {self.hit_ratio():.0%}"
+        )
+        return result
+
+    async def _fetch(self, bot: discord.Client, user_id: int) -> Optional[discord.User]:
+        future = self._inflight.get(user_id)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._inflight[user_id] = asyncio.get_running_loop().create_future()
+        try:
+            async with self._semaphore:
+                self.stats["fetches"] += 1
+                try:
+                    user = await bot.fetch_user(user_id)
+                    self._store(user_id, user)
+                except discord.NotFound:
+                    self.stats["not_found"] += 1
+                    user = None
+                    self._store(user_id, None)
+                except Exception as e:
+                    # Erreur passagère : pas mise en cache
+                    self.stats["errors"] += 1
+                    logger.warning(
+                        f"Erreur lors de la récupération de l'utilisateur {user_id}: {e}"
+                    )
+                    user = None
+            future.set_result(user)
+            return user
+        finally:
+            if not future.done():
+                future.set_result(None)
+            self._inflight.pop(user_id, None)
+
+
+_resolver = UserResolver()
+
+
+def get_user_resolver() -> UserResolver:
+    return _resolver
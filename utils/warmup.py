@@ -0,0 +1,245 @@
+"""Orchestrateur des tâches de préchauffage au démarrage.
+
+Les cogs enregistrent leurs tâches (priorité, dépendances, coût REST estimé)
+dans cog_load ; au premier on_ready elles s'exécutent en parallèle, avec une
+concurrence bornée et un budget REST global (seau à jetons). Une tâche
+`per_guild` est déclinée en une instance par serveur. Un rapport de durée par
+tâche est journalisé à la fin : le temps total suit la tâche la plus lente et
+non plus la somme de toutes.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WARMUP_CONCURRENCY = 4
+REST_RATE = 5.0  # requêtes par seconde pour l'ensemble du préchauffage
+REST_BURST = 10
+
+
+class RestBudget:
+    """Seau à jetons partagé : acquire(n) attend que n requêtes soient autorisées."""
+
+    def __init__(self, rate: float = REST_RATE, burst: int = REST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.spent = 0
+
+    async def acquire(self, n: int = 1) -> float:
+        """Consomme n jetons. Retourne le temps passé à attendre (secondes)."""
+        if n <= 0:
+            return 0.0
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n or self._tokens >= self.burst:
+                    self._tokens -= n
+                    self.spent += n
+                    return waited
+                delay = (min(n, self.burst) - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class WarmupTask:
+    """Une tâche de préchauffage et, après exécution, ses mesures."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        priority: int = 100,  # plus petit = plus tôt
+        depends: Tuple[str, ...] = (),
+        rest_cost: int = 0,
+        per_guild: bool = False,
+        guild: Optional[discord.Guild] = None,
+        base: str = "",
+    ):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.depends = depends
+        self.rest_cost = rest_cost
+        self.per_guild = per_guild
+        self.guild = guild
+        self.base = base or name
+        self.status = "en attente"
+        self.started = 0.0
+        self.duration = 0.0
+        self.budget_wait = 0.0
+        self.error: Optional[str] = None
+
+
+class WarmupOrchestrator:
+    def __init__(
+        self, max_concurrency: int = WARMUP_CONCURRENCY, budget: Optional[RestBudget] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.budget = budget or RestBudget()
+        self._registered: Dict[str, WarmupTask] = {}
+        self._ran = False
+        self._finished = False
+        self.report: List[WarmupTask] = []
+
+    def register(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        priority: int = 100,
+        depends: Tuple[str, ...] = (),
+        rest_cost: int = 0,
+        per_guild: bool = False,
+    ) -> None:
+        """Ajoute une tâche. `func()` est appelée sans argument, ou `func(guild)` si per_guild."""
+        self._registered[name] = WarmupTask(
+            name, func, priority, tuple(depends), rest_cost, per_guild
+        )
+
+    def unregister(self, name: str) -> None:
+        self._registered.pop(name, None)
+
+    @property
+    def has_run(self) -> bool:
+        return self._ran
+
+    @property
+    def finished(self) -> bool:
+        """Vrai une fois toutes les tâches terminées (rapport journalisé)."""
+        return self._finished
+
+    def _expand(self, guilds: List[discord.Guild]) -> List[WarmupTask]:
+        tasks = []
+        for spec in self._registered.values():
+            if spec.per_guild:
+                for guild in guilds:
+                    tasks.append(WarmupTask(
+                        f"{spec.name}:{guild.id}", spec.func, spec.priority, spec.depends,
+                        spec.rest_cost, True, guild=guild, base=spec.name,
+                    ))
+            else:
+                tasks.append(WarmupTask(
+                    spec.name, spec.func, spec.priority, spec.depends, spec.rest_cost
+                ))
+        return tasks
+
+    async def run(self, bot: discord.Client) -> List[WarmupTask]:
+        """Exécute une fois toutes les tâches enregistrées et journalise le rapport."""
+        if self._ran:
+            return self.report
+        self._ran = True
+        tasks = self._expand(list(bot.guilds))
+        known = {t.base for t in tasks}
+        # Instances restantes par nom de base : une dépendance est satisfaite
+        # quand elles sont toutes finies
+        remaining: Dict[str, int] = {}
+        for t in tasks:
+            remaining[t.base] = remaining.get(t.base, 0) + 1
+        failed: set = set()
+        for t in tasks:
+            missing = [d for d in t.depends if d not in known]
+            if missing:
+                logger.warning(
+                    f"Préchauffage {t.name}: dépendance(s) inconnue(s) ignorée(s) {missing}"
+                )
+                t.depends = tuple(d for d in t.depends if d in known)
+
+        order = itertools.count()
+        waiting = sorted(tasks, key=lambda t: (t.priority, next(order)))
+        running: Dict[asyncio.Task, WarmupTask] = {}
+        start = time.monotonic()
+
+        async def execute(t: WarmupTask) -> None:
+            t.budget_wait = await self.budget.acquire(t.rest_cost)
+            t.started = time.monotonic() - start
+            t0 = time.monotonic()
+            try:
+                await (t.func(t.guild) if t.per_guild else t.func())
+                t.status = "ok"
+            except Exception as e:
+                t.status = "échec"
+                t.error = str(e)
+                logger.exception(f"Échec de la tâche de préchauffage {t.name}")
+            finally:
+                t.duration = time.monotonic() - t0
+
+        while waiting or running:
+            self._skip_failed(waiting, remaining, failed)
+            # Démarre les tâches prêtes, par priorité, dans la limite de concurrence
+            for t in list(waiting):
+                if len(running) >= self.max_concurrency:
+                    break
+                if all(remaining.get(d, 0) == 0 for d in t.depends):
+                    waiting.remove(t)
+                    running[asyncio.create_task(execute(t))] = t
+            if not running:
+                if waiting:
+                    # Cycle de dépendances : rien ne peut plus démarrer
+                    for t in waiting:
+                        t.status = "bloquée"
+                    break
+                continue
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                self._finish(running.pop(task), remaining, failed)
+
+        self.report = tasks
+        self._finished = True
+        self._log_report(tasks, time.monotonic() - start)
+        return tasks
+
+    def _skip_failed(
+        self, waiting: List[WarmupTask], remaining: Dict[str, int], failed: set
+    ) -> None:
+        """Ignore les tâches dont une dépendance a échoué ou a été ignorée.
+        Répété jusqu'à stabilité : une tâche ignorée peut en entraîner d'autres.
+        """
+        changed = True
+        while changed:
+            changed = False
+            for t in list(waiting):
+                if any(d in failed for d in t.depends):
+                    t.status = "ignorée"
+                    waiting.remove(t)
+                    self._finish(t, remaining, failed)
+                    changed = True
+
+    @staticmethod
+    def _finish(t: WarmupTask, remaining: Dict[str, int], failed: set) -> None:
+        remaining[t.base] -= 1
+        if t.status != "ok":
+            failed.add(t.base)
+
+    def _log_report(self, tasks: List[WarmupTask], total: float) -> None:
+        work = sum(t.duration for t in tasks)
+        lines = [
+            f"Préchauffage terminé en {total:.2f}s ({len(tasks)} tâche(s), {work:.2f}s cumulées, "
+            f"{self.budget.spent} requête(s) REST budgétées)"
+        ]
+        for t in sorted(tasks, key=lambda t: t.started):
+            wait = f", attente budget {t.budget_wait:.2f}s" if t.budget_wait else ""
+            err = f" - {t.error}" if t.error else ""
+            lines.append(
+                f"  {t.name:<32} {t.status:<9} +{t.started:6.2f}s  {t.duration:6.2f}s{wait}{err}"
+            )
+        logger.info("\n".join(lines))
+
+
+_orchestrator = WarmupOrchestrator()
+
+
+def get_warmup() -> WarmupOrchestrator:
+    return _orchestrator